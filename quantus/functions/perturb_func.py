@@ -8,20 +8,21 @@
 
 
 import copy
+import functools
 import random
 import warnings
 from typing import Any, Callable, Sequence, Tuple, Union, Optional
 import cv2
 import numpy as np
-from scipy.sparse import lil_matrix, csc_matrix
-from scipy.sparse.linalg import spsolve
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import splu
 
+from quantus.helpers import asserts
 from quantus.helpers.utils import (
     get_baseline_value,
     blur_at_indices,
     expand_indices,
     get_leftover_shape,
-    offset_coordinates,
 )
 
 
@@ -35,6 +36,10 @@ def perturb_batch(
     """
     Use a perturb function and make perturbation on the full batch.
 
+    If perturb_func (or the function wrapped by a functools.partial) has a batch-native implementation in
+    BATCH_PERTURB_FUNCS and indices is an integer array of flat indices, the whole batch is perturbed in
+    a single call. Otherwise, perturb_func is applied to each instance separately.
+
     Parameters
     ----------
     perturb_func: callable
@@ -60,6 +65,18 @@ def perturb_batch(
     if not inplace:
         arr = arr.copy()
 
+    # Run perturbation on the full batch if possible.
+    batch_perturb_func = _get_batch_perturb_func(perturb_func, indices, **kwargs)
+    if batch_perturb_func is not None:
+        if indices is not None:
+            arr[...] = batch_perturb_func(arr=arr, indices=indices[:, 1:], **kwargs)
+        else:
+            arr[...] = batch_perturb_func(arr=arr, **kwargs)
+
+        if not inplace:
+            return arr
+        return None
+
     # Run perturbation.
     for i in range(len(arr)):
         if indices is not None:
@@ -73,6 +90,56 @@ def perturb_batch(
     return None
 
 
+def _get_batch_perturb_func(
+    perturb_func: Callable, indices: Optional[np.ndarray] = None, **kwargs
+) -> Optional[Callable]:
+    """
+    Get the batch-native implementation of perturb_func, if there is one that supports the given arguments.
+
+    Parameters
+    ----------
+    perturb_func: callable
+        Input perturbation function, possibly wrapped by a functools.partial.
+    indices: np.ndarray, optional
+        The indices passed to perturb_batch.
+    kwargs: optional
+        Keyword arguments passed to perturb_batch.
+
+    Returns
+    -------
+    callable, optional
+        The batch-native perturbation function, with the keyword arguments of a partial bound, or None.
+    """
+    func = perturb_func
+    func_kwargs = {}
+    if isinstance(perturb_func, functools.partial):
+        if perturb_func.args:
+            return None
+        func = perturb_func.func
+        func_kwargs = perturb_func.keywords
+
+    try:
+        batch_func = BATCH_PERTURB_FUNCS.get(func)
+    except TypeError:
+        return None
+    if batch_func is None:
+        return None
+
+    # Only flat integer indices can be expressed as a batch mask.
+    if indices is None:
+        if batch_func is not no_perturbation_batch:
+            return None
+    elif (
+        not isinstance(indices, np.ndarray)
+        or indices.ndim != 2
+        or not np.issubdtype(indices.dtype, np.integer)
+        or "indexed_axes" not in {**func_kwargs, **kwargs}
+    ):
+        return None
+
+    return functools.partial(batch_func, **func_kwargs)
+
+
 def baseline_replacement_by_indices(
     arr: np.array,
     indices: Tuple[slice, ...],  # Alt. Union[int, Sequence[int], Tuple[np.array]],
@@ -450,10 +517,83 @@ def translation_y_direction(
     return arr_perturbed
 
 
+def _noisy_linear_imputation_system(img_shape: Tuple[int, ...], indices: np.ndarray):
+    """
+    Assemble and factorise the equation system of the noisy linear imputation for a given mask.
+
+    The system only depends on the image shape and the imputed indices, not on the values of the
+    array, so all channels are solved with a single factorisation.
+
+    Parameters
+    ----------
+    img_shape: tuple
+        Image shape in (channels, height, width) format.
+    indices: np.ndarray
+        The flat (spatial) indices of the imputed elements.
+
+    Returns
+    -------
+    tuple
+        The factorised left-hand side of the equation system and the sparse matrix, which maps the
+        flattened array values onto the right-hand side.
+    """
+    offsets = np.array(
+        [(1, 1), (0, 1), (-1, 1), (1, -1), (0, -1), (-1, -1), (1, 0), (-1, 0)]
+    )
+    weights = np.array([1 / 12, 1 / 6, 1 / 12, 1 / 12, 1 / 6, 1 / 12, 1 / 6, 1 / 6])
+    nr_pixels = img_shape[1] * img_shape[2]
+    nr_vars = len(indices)
+
+    mask = np.ones(nr_pixels, dtype=bool)
+    mask[indices] = False
+
+    ind_to_var_ids = np.zeros(nr_pixels, dtype=int)
+    ind_to_var_ids[indices] = np.arange(nr_vars)
+
+    # Coordinates of all neighbours of all imputed elements, with shape (nr offsets, nr_vars).
+    x = indices // img_shape[2] + offsets[:, 0:1]
+    y = indices % img_shape[2] + offsets[:, 1:2]
+    valid = ~((x < 0) | (y < 0) | (x >= img_shape[1]) | (y >= img_shape[2]))
+    off_coords = x * img_shape[2] + y
+
+    var_ids = np.broadcast_to(np.arange(nr_vars), valid.shape)
+    weights = np.broadcast_to(weights[:, None], valid.shape)
+    valid_unknown = valid.copy()
+    valid_unknown[valid] = ~mask[off_coords[valid]]
+    valid_known = valid & ~valid_unknown
+
+    # Equation system left-hand side, with the weights of imputed neighbours and the (negative)
+    # sum of weights of all neighbours within the image on the diagonal.
+    a = coo_matrix(
+        (
+            np.concatenate([weights[valid_unknown], -(weights * valid).sum(axis=0)]),
+            (
+                np.concatenate([var_ids[valid_unknown], np.arange(nr_vars)]),
+                np.concatenate(
+                    [ind_to_var_ids[off_coords[valid_unknown]], np.arange(nr_vars)]
+                ),
+            ),
+        ),
+        shape=(nr_vars, nr_vars),
+    ).tocsc()
+
+    # Map of the known neighbours onto the equation system right-hand side.
+    b_map = coo_matrix(
+        (
+            -weights[valid_known],
+            (var_ids[valid_known], off_coords[valid_known]),
+        ),
+        shape=(nr_vars, nr_pixels),
+    ).tocsr()
+
+    return splu(a), b_map
+
+
 def noisy_linear_imputation(
     arr: np.array,
     indices: Union[Sequence[int], Tuple[np.array]],
     noise: float = 0.01,
+    rng: Optional[np.random.Generator] = None,
     **kwargs,
 ) -> np.array:
     """
@@ -461,6 +601,8 @@ def noisy_linear_imputation(
     which elements are not included in the mask.
         Adapted from: https://github.com/tleemann/road_evaluation.
 
+    The equation system is assembled with vectorised sparse matrices, and all channels are solved at once.
+
     Parameters
     ----------
     arr: np.ndarray
@@ -472,6 +614,8 @@ def noisy_linear_imputation(
                   and either include the first or last dimension of array.
     noise: float
         The amount of noise added.
+    rng: np.random.Generator, optional
+        The random number generator used for the noise. If None, the global numpy random state is used.
     kwargs: optional
         Keyword arguments.
 
@@ -480,61 +624,21 @@ def noisy_linear_imputation(
     arr_perturbed: np.ndarray
          The array which some of its indices have been perturbed.
     """
-    offset_weight = [
-        ((1, 1), 1 / 12),
-        ((0, 1), 1 / 6),
-        ((-1, 1), 1 / 12),
-        ((1, -1), 1 / 12),
-        ((0, -1), 1 / 6),
-        ((-1, -1), 1 / 12),
-        ((1, 0), 1 / 6),
-        ((-1, 0), 1 / 6),
-    ]
-    arr_flat = arr.reshape((arr.shape[0], -1))
-
-    mask = np.ones(arr_flat.shape[1])
-    mask[indices] = 0
-
-    ind_to_var_ids = np.zeros(arr_flat.shape[1], dtype=int)
-    ind_to_var_ids[indices] = np.arange(len(indices))
-
-    # Equation system left-hand side.
-    a = lil_matrix((len(indices), len(indices)))
-
-    # Equation system right-hand side.
-    b = np.zeros((len(indices), arr.shape[0]))
-
-    sum_neighbors = np.ones(len(indices))
-
-    for n in offset_weight:
-        offset, weight = n[0], n[1]
-        off_coords, valid = offset_coordinates(indices, offset, arr.shape)
-        valid_ids = np.argwhere(valid == 1).flatten()
-
-        # Add weighted values to vector b.
-        in_off_coord = off_coords[mask[off_coords] == 1]
-        in_off_coord_ids = valid_ids[mask[off_coords] == 1]
-        b[in_off_coord_ids, :] -= weight * arr_flat[:, in_off_coord].T
-
-        # Add weights to a.
-        out_off_coord = off_coords[mask[off_coords] != 1]
-        out_off_coord_ids = valid_ids[mask[off_coords] != 1]
-        variable_ids = ind_to_var_ids[out_off_coord]
-        a[out_off_coord_ids, variable_ids] = weight
-
-        # Reduce weight for invalid coordinates.
-        sum_neighbors[np.argwhere(valid == 0).flatten()] = (
-            sum_neighbors[np.argwhere(valid == 0).flatten()] - weight
-        )
+    indices = np.asarray(indices, dtype=int)
+    arr_flat_copy = np.copy(arr.reshape((arr.shape[0], -1)))
 
-    a[np.arange(len(indices)), np.arange(len(indices))] = -sum_neighbors
+    if len(indices) == 0:
+        return arr_flat_copy.reshape(*arr.shape)
 
     # Solve the system of equations.
-    res = np.transpose(spsolve(csc_matrix(a), b))
+    a_lu, b_map = _noisy_linear_imputation_system(tuple(arr.shape), indices)
+    res = np.transpose(a_lu.solve(np.asarray(b_map @ arr_flat_copy.T, dtype=float)))
 
     # Fill the values with the solution of the system.
-    arr_flat_copy = np.copy(arr.reshape((arr.shape[0], -1)))
-    arr_flat_copy[:, indices] = res + noise * np.random.randn(*res.shape)
+    if rng is None:
+        arr_flat_copy[:, indices] = res + noise * np.random.randn(*res.shape)
+    else:
+        arr_flat_copy[:, indices] = res + noise * rng.standard_normal(res.shape)
 
     return arr_flat_copy.reshape(*arr.shape)
 
@@ -556,3 +660,271 @@ def no_perturbation(arr: np.array, **kwargs) -> np.array:
          Array unperturbed.
     """
     return arr
+
+
+def _batch_indices_mask(
+    arr: np.ndarray, indices: np.ndarray, indexed_axes: Sequence[int]
+) -> np.ndarray:
+    """
+    Create a boolean mask of the batch arr that is True at the flat indices of each instance.
+
+    Parameters
+    ----------
+    arr: np.ndarray
+         Batch of arrays to be perturbed.
+    indices: np.ndarray
+        Flat indices into the indexed axes of each instance, with shape (batch_size, nr_indices).
+    indexed_axes: sequence
+        The dimensions of each instance that are indexed. These need to be consecutive,
+                  and either include the first or last dimension of array.
+
+    Returns
+    -------
+    mask: np.ndarray
+         The mask, broadcastable to the shape of arr.
+    """
+    indexed_axes = np.sort(np.array(indexed_axes))
+    asserts.assert_indexed_axes(arr[0], indexed_axes)
+
+    indexed_shape = [arr.shape[1 + axis] for axis in indexed_axes]
+    mask = np.zeros((len(arr), int(np.prod(indexed_shape))), dtype=bool)
+    mask[np.arange(len(arr))[:, None], indices] = True
+
+    return mask.reshape(
+        [len(arr)]
+        + [
+            arr.shape[1 + axis] if axis in indexed_axes else 1
+            for axis in range(arr.ndim - 1)
+        ]
+    )
+
+
+def _batch_baseline_values(
+    value: Union[float, int, str, np.array],
+    arr: np.ndarray,
+    indexed_axes: Sequence[int],
+    **kwargs,
+) -> np.ndarray:
+    """
+    Get the baseline values of each instance in the batch arr, broadcastable to the shape of arr.
+
+    Parameters
+    ----------
+    value: float, int, str, np.ndarray
+        The baseline value, see get_baseline_value.
+    arr: np.ndarray
+         Batch of arrays to be perturbed.
+    indexed_axes: sequence
+        The dimensions of each instance that are indexed.
+    kwargs: optional
+        Keyword arguments.
+
+    Returns
+    -------
+    baseline_values: np.ndarray
+         The baseline values, with the indexed axes of size one.
+    """
+    baseline_shape = get_leftover_shape(arr[0], indexed_axes)
+
+    # Baselines that are computed from the instance, e.g., "mean", are computed for each instance.
+    if isinstance(value, str):
+        baseline_values = np.stack(
+            [
+                get_baseline_value(
+                    value=value, arr=x, return_shape=tuple(baseline_shape), **kwargs
+                )
+                for x in arr
+            ]
+        )
+    else:
+        baseline_values = get_baseline_value(
+            value=value, arr=arr[0], return_shape=tuple(baseline_shape), **kwargs
+        )[None]
+
+    return np.expand_dims(
+        baseline_values, axis=tuple(np.sort(np.array(indexed_axes)) + 1)
+    )
+
+
+def baseline_replacement_by_indices_batch(
+    arr: np.ndarray,
+    indices: np.ndarray,
+    indexed_axes: Sequence[int],
+    perturb_baseline: Union[float, int, str, np.array],
+    **kwargs,
+) -> np.ndarray:
+    """
+    Replace indices in a batch of arrays by a given baseline, see baseline_replacement_by_indices.
+
+    Parameters
+    ----------
+    arr: np.ndarray
+         Batch of arrays to be perturbed.
+    indices: np.ndarray
+        Flat indices into the indexed axes of each instance, with shape (batch_size, nr_indices).
+    indexed_axes: sequence
+        The dimensions of each instance that are indexed. These need to be consecutive,
+                  and either include the first or last dimension of array.
+    perturb_baseline: float, int, str, np.ndarray
+        The baseline values to replace arr at indices with.
+    kwargs: optional
+        Keyword arguments.
+
+    Returns
+    -------
+    arr_perturbed: np.ndarray
+         The batch of arrays which some of its indices have been perturbed.
+    """
+    mask = _batch_indices_mask(arr, indices, indexed_axes)
+    baseline_values = _batch_baseline_values(
+        perturb_baseline, arr, indexed_axes, **kwargs
+    )
+    return np.where(mask, baseline_values, arr).astype(arr.dtype, copy=False)
+
+
+def baseline_replacement_by_shift_batch(
+    arr: np.ndarray,
+    indices: np.ndarray,
+    indexed_axes: Sequence[int],
+    input_shift: Union[float, int, str, np.array],
+    **kwargs,
+) -> np.ndarray:
+    """
+    Shift values at indices in a batch of arrays, see baseline_replacement_by_shift.
+
+    Parameters
+    ----------
+    arr: np.ndarray
+         Batch of arrays to be perturbed.
+    indices: np.ndarray
+        Flat indices into the indexed axes of each instance, with shape (batch_size, nr_indices).
+    indexed_axes: sequence
+        The dimensions of each instance that are indexed. These need to be consecutive,
+                  and either include the first or last dimension of array.
+    input_shift: float, int, str, np.ndarray
+        Value to shift arr at indices with.
+    kwargs: optional
+        Keyword arguments.
+
+    Returns
+    -------
+    arr_perturbed: np.ndarray
+         The batch of arrays which some of its indices have been perturbed.
+    """
+    mask = _batch_indices_mask(arr, indices, indexed_axes)
+    baseline_values = _batch_baseline_values(input_shift, arr, indexed_axes, **kwargs)
+    return np.where(mask, arr + baseline_values.astype(float), arr).astype(
+        arr.dtype, copy=False
+    )
+
+
+def gaussian_noise_batch(
+    arr: np.ndarray,
+    indices: np.ndarray,
+    indexed_axes: Sequence[int],
+    perturb_mean: float = 0.0,
+    perturb_std: float = 0.01,
+    **kwargs,
+) -> np.ndarray:
+    """
+    Add gaussian noise to a batch of arrays at indices, see gaussian_noise.
+
+    Parameters
+    ----------
+    arr: np.ndarray
+         Batch of arrays to be perturbed.
+    indices: np.ndarray
+        Flat indices into the indexed axes of each instance, with shape (batch_size, nr_indices).
+    indexed_axes: sequence
+        The dimensions of each instance that are indexed.
+        These need to be consecutive, and either include the first or last dimension of array.
+    perturb_mean (float):
+        The mean for gaussian noise.
+    perturb_std (float):
+        The standard deviation for gaussian noise.
+    kwargs: optional
+        Keyword arguments.
+
+    Returns
+    -------
+    arr_perturbed: np.ndarray
+         The batch of arrays which some of its indices have been perturbed.
+    """
+    mask = _batch_indices_mask(arr, indices, indexed_axes)
+    noise = np.random.normal(loc=perturb_mean, scale=perturb_std, size=arr.shape)
+    return np.where(mask, arr + noise, arr).astype(arr.dtype, copy=False)
+
+
+def uniform_noise_batch(
+    arr: np.ndarray,
+    indices: np.ndarray,
+    indexed_axes: Sequence[int],
+    lower_bound: float = 0.02,
+    upper_bound: Union[None, float] = None,
+    **kwargs,
+) -> np.ndarray:
+    """
+    Add uniform noise to a batch of arrays at indices, see uniform_noise.
+
+    Parameters
+    ----------
+    arr: np.ndarray
+         Batch of arrays to be perturbed.
+    indices: np.ndarray
+        Flat indices into the indexed axes of each instance, with shape (batch_size, nr_indices).
+    indexed_axes: sequence
+        The dimensions of each instance that are indexed. These need to be consecutive,
+                  and either include the first or last dimension of array.
+    lower_bound: float
+            The lower bound for uniform sampling.
+    upper_bound: float, optional
+            The upper bound for uniform sampling.
+    kwargs: optional
+        Keyword arguments.
+
+    Returns
+    -------
+    arr_perturbed: np.ndarray
+         The batch of arrays which some of its indices have been perturbed.
+    """
+    mask = _batch_indices_mask(arr, indices, indexed_axes)
+
+    if upper_bound is None:
+        noise = np.random.uniform(low=-lower_bound, high=lower_bound, size=arr.shape)
+    else:
+        assert upper_bound > lower_bound, (
+            "Parameter 'upper_bound' needs to be larger than 'lower_bound', "
+            "but {} <= {}".format(upper_bound, lower_bound)
+        )
+        noise = np.random.uniform(low=lower_bound, high=upper_bound, size=arr.shape)
+
+    return np.where(mask, arr + noise, arr).astype(arr.dtype, copy=False)
+
+
+def no_perturbation_batch(arr: np.ndarray, **kwargs) -> np.ndarray:
+    """
+    Apply no perturbation to a batch of inputs.
+
+    Parameters
+    ----------
+    arr: np.ndarray
+         Batch of arrays to be perturbed.
+    kwargs: optional
+        Keyword arguments.
+
+    Returns
+    -------
+    arr: np.ndarray
+         Batch of arrays unperturbed.
+    """
+    return arr
+
+
+# Batch-native implementations that perturb_batch dispatches to.
+BATCH_PERTURB_FUNCS = {
+    baseline_replacement_by_indices: baseline_replacement_by_indices_batch,
+    baseline_replacement_by_shift: baseline_replacement_by_shift_batch,
+    gaussian_noise: gaussian_noise_batch,
+    uniform_noise: uniform_noise_batch,
+    no_perturbation: no_perturbation_batch,
+}
@@ -7,6 +7,7 @@
 # Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
 
 
+import inspect
 from typing import Callable, Tuple, Sequence, Union
 import numpy as np
 
@@ -267,6 +268,30 @@ def assert_explain_func(explain_func: Callable) -> None:
     )
 
 
+def assert_perturb_func_accepts_rng(perturb_func: Callable) -> None:
+    """
+    Assert that the perturbation function accepts a random number generator as keyword argument 'rng'.
+
+    Parameters
+    ----------
+    perturb_func: callable
+        The perturbation function, assumed to take 'rng' or **kwargs as arguments.
+
+    Returns
+    -------
+    None
+    """
+    parameters = inspect.signature(perturb_func).parameters.values()
+    if not any(
+        parameter.name == "rng" or parameter.kind == inspect.Parameter.VAR_KEYWORD
+        for parameter in parameters
+    ):
+        raise ValueError(
+            "Make sure 'perturb_func' takes a random number generator 'rng' as keyword argument "
+            "(and draws its randomness from it), if 'seed' is set or 'nr_workers' > 1."
+        )
+
+
 def assert_value_smaller_than_input_size(
     x: np.ndarray, value: int, value_name: str
 ) -> None:
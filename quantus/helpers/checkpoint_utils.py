@@ -0,0 +1,168 @@
+"""This module holds the on-disk checkpoint of layer-wise evaluation scores, used by the randomisation metrics."""
+
+# This file is part of Quantus.
+# Quantus is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+# Quantus is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public License along with Quantus. If not, see <https://www.gnu.org/licenses/>.
+# Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
+
+import functools
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def array_digest(arr: Optional[np.ndarray]) -> Optional[str]:
+    """
+    Compute a digest of an array, to recognise the data of an evaluation in its checkpoint configuration.
+
+    Parameters
+    ----------
+    arr: np.ndarray, optional
+        The array to digest.
+
+    Returns
+    -------
+    string, optional
+        The hex digest of the shape, dtype and contents of the array, None if arr is None.
+    """
+    if arr is None:
+        return None
+    arr = np.ascontiguousarray(arr)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((arr.shape, arr.dtype.str)).encode())
+    h.update(arr.data)
+    return h.hexdigest()
+
+
+def describe_config_value(value: Any) -> Any:
+    """
+    Describe a value of a checkpoint configuration with JSON-serialisable values.
+
+    Callables are described by their qualified name (partials also by their arguments), arrays by their
+    digest, and other values that are not JSON-serialisable by their repr, or their type if the repr
+    holds a memory address.
+
+    Parameters
+    ----------
+    value: any
+        The value to describe, e.g., explain_func or explain_func_kwargs.
+
+    Returns
+    -------
+    any
+        The JSON-serialisable description of the value.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return array_digest(value)
+    if isinstance(value, dict):
+        return {str(k): describe_config_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [describe_config_value(v) for v in value]
+    if isinstance(value, functools.partial):
+        return {
+            "func": describe_config_value(value.func),
+            "args": describe_config_value(value.args),
+            "keywords": describe_config_value(value.keywords),
+        }
+    if callable(value) and hasattr(value, "__qualname__"):
+        return f"{getattr(value, '__module__', None)}.{value.__qualname__}"
+    if " at 0x" in repr(value):
+        return f"{type(value).__module__}.{type(value).__qualname__}"
+    return repr(value)
+
+
+class LayerScoresCheckpoint:
+    """
+    Stores the scores of each layer in a directory, such that an interrupted evaluation can be resumed.
+
+    Every key (e.g., a layer name) is saved to its own file, which is replaced atomically on each save.
+    The directory also holds the configuration of the evaluation that wrote it, and resuming with a
+    different configuration raises a ValueError instead of mixing the scores of different runs.
+    """
+
+    config_file_name = "config.json"
+
+    def __init__(self, checkpoint_dir: str, config: Dict[str, Any]):
+        """
+        Parameters
+        ----------
+        checkpoint_dir: string
+            The directory to save the scores to, created if it does not exist.
+        config: dict
+            The configuration of the evaluation, e.g., the seed and the number of instances. Values that are
+            not JSON-serialisable are described by describe_config_value().
+        """
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        config = json.loads(json.dumps(describe_config_value(config)))
+        config_path = os.path.join(checkpoint_dir, self.config_file_name)
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                saved_config = json.load(f)
+            if saved_config != config:
+                raise ValueError(
+                    f"The checkpoint in '{checkpoint_dir}' was saved with the configuration {saved_config}, "
+                    f"which does not match the current configuration {config}. "
+                    "Use a different 'checkpoint_dir' or remove the checkpoint."
+                )
+        else:
+            self._write(config_path, lambda f: f.write(json.dumps(config).encode()))
+
+    def _path(self, key: str) -> str:
+        # Keys that only differ in replaced characters (e.g., "a/b" and "a_b") are told apart by a hash of the key.
+        key_hash = hashlib.blake2b(key.encode(), digest_size=4).hexdigest()
+        file_name = re.sub(r"[^\w.-]", "_", key) + "-" + key_hash + ".npy"
+        return os.path.join(self.checkpoint_dir, file_name)
+
+    @staticmethod
+    def _write(path: str, write_func) -> None:
+        # Write to a temporary file first, so an interruption never leaves a partial file behind.
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            write_func(f)
+        os.replace(tmp_path, path)
+
+    def load(self, key: str) -> List[float]:
+        """
+        Load the scores saved for a key.
+
+        Parameters
+        ----------
+        key: string
+            The key of the scores, e.g., a layer name.
+
+        Returns
+        -------
+        list
+            The saved scores, empty if none were saved.
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return []
+        return np.load(path).tolist()
+
+    def save(self, key: str, scores: Sequence[float]) -> None:
+        """
+        Save the scores of a key, replacing the previously saved scores.
+
+        Parameters
+        ----------
+        key: string
+            The key of the scores, e.g., a layer name.
+        scores: sequence
+            The scores to save.
+        """
+        self._write(
+            self._path(key),
+            lambda f: np.save(f, np.asarray(scores, dtype=np.float64)),
+        )
@@ -116,12 +116,13 @@ class ModelInterface(ABC, Generic[M]):
 
     @abstractmethod
     def get_random_layer_generator(
-        self, order: str = "top_down", seed: int = 42
+        self, order: str = "top_down", seed: int = 42, in_place: bool = False
     ) -> Generator[Tuple[str, M], None, None]:
         """
         In every iteration yields a copy of the model with one additional layer's parameters randomized.
         For cascading randomization, set order (str) to 'top_down'. For independent randomization,
         set it to 'independent'. For bottom-up order, set it to 'bottom_up'.
+        If in_place is set, the model itself is randomized and restored once the generator is exhausted or closed.
         """
         raise NotImplementedError
 
@@ -78,6 +78,10 @@ class PyTorchModel(ModelInterface[nn.Module]):
         )
         self.device = device
 
+        # The prediction-ready models of self.model, built once per softmax configuration.
+        self._softmax_arg_models: Dict[bool, nn.Module] = {}
+        self._softmax_arg_models_source: Optional[nn.Module] = None
+
     @lru_cache(maxsize=None)
     def _get_last_softmax_layer_index(self) -> Optional[int]:
         """
@@ -139,11 +143,37 @@ class PyTorchModel(ModelInterface[nn.Module]):
 
         elif isinstance(self.model, nn.Module):
             pred_model = self.get_softmax_arg_model()
-            return pred_model(torch.Tensor(x).to(self.device), **model_predict_kwargs)
+            return pred_model(self._to_tensor(x), **model_predict_kwargs)
         else:
             raise ValueError("Predictions cant be null")
 
+    def _to_tensor(self, x: npt.ArrayLike) -> torch.Tensor:
+        """
+        Convert the input to a float tensor on the device. Float32 numpy arrays are converted without a copy,
+        if their memory layout allows it.
+        """
+        if (
+            isinstance(x, np.ndarray)
+            and x.dtype == np.float32
+            and x.flags.writeable
+            and all(stride >= 0 for stride in x.strides)
+        ):
+            return torch.from_numpy(x).to(self.device)
+        return torch.Tensor(x).to(self.device)
+
     def get_softmax_arg_model(self) -> torch.nn.Module:
+        """
+        Returns model with last layer adjusted accordingly to softmax argument, see _build_softmax_arg_model().
+        The adjusted model is built once per softmax configuration and reused, until self.model is replaced.
+        """
+        if self._softmax_arg_models_source is not self.model:
+            self._softmax_arg_models.clear()
+            self._softmax_arg_models_source = self.model
+        if self.softmax not in self._softmax_arg_models:
+            self._softmax_arg_models[self.softmax] = self._build_softmax_arg_model()
+        return self._softmax_arg_models[self.softmax]
+
+    def _build_softmax_arg_model(self) -> torch.nn.Module:
         """
         Returns model with last layer adjusted accordingly to softmax argument.
         If the original model has softmax activation as the last layer and softmax=false,
@@ -292,25 +322,36 @@ class PyTorchModel(ModelInterface[nn.Module]):
         return self.model.state_dict()
 
     def get_random_layer_generator(
-        self, order: str = "top_down", seed: int = 42
+        self, order: str = "top_down", seed: int = 42, in_place: bool = False
     ) -> Generator[Tuple[str, nn.Module], None, None]:
         """
         In every iteration yields a copy of the model with one additional layer's parameters randomized.
         For cascading randomization, set order (str) to 'top_down'. For independent randomization,
         set it to 'independent'. For bottom-up order, set it to 'bottom_up'.
 
+        If in_place is set, the layers of the model itself are randomized instead of a copy, and only the
+        original parameters of the randomized layers are kept, which are restored once the generator is
+        exhausted or closed. For independent randomization, each layer is restored before the next one is
+        randomized. The model must not be used otherwise while the generator is running.
+
         Parameters
         ----------
         order: string
             The various ways that a model's weights of a layer can be randomised.
         seed: integer
             The seed of the random layer generator.
+        in_place: boolean
+            Indicates whether to randomise the layers of the model in place, default=False.
 
         Returns
         -------
         layer.name, random_layer_model: string, torch.nn
             The layer name and the model.
         """
+        if in_place:
+            yield from self._get_random_layer_generator_in_place(order=order, seed=seed)
+            return
+
         original_parameters = self.state_dict()
         random_layer_model = deepcopy(self.model)
 
@@ -330,6 +371,58 @@ class PyTorchModel(ModelInterface[nn.Module]):
             module[1].reset_parameters()
             yield module[0], random_layer_model
 
+    def _get_random_layer_generator_in_place(
+        self, order: str, seed: int
+    ) -> Generator[Tuple[str, nn.Module], None, None]:
+        """
+        Implementation of get_random_layer_generator with in_place=True.
+        """
+        modules = [
+            layer
+            for layer in self.model.named_modules()
+            if (hasattr(layer[1], "reset_parameters"))
+        ]
+
+        if order == "top_down":
+            modules = modules[::-1]
+
+        # The original parameters of the randomized layers, which are not restored yet.
+        original_parameters: List[Tuple[nn.Module, Dict[str, torch.Tensor]]] = []
+        try:
+            for module in modules:
+                if order == "independent":
+                    self._restore_parameters(original_parameters)
+                original_parameters.append(
+                    (
+                        module[1],
+                        {
+                            k: v.detach().clone()
+                            for k, v in module[1].state_dict().items()
+                        },
+                    )
+                )
+                torch.manual_seed(seed=seed + 1)
+                module[1].reset_parameters()
+                yield module[0], self.model
+        finally:
+            self._restore_parameters(original_parameters)
+
+    def _restore_parameters(
+        self, original_parameters: List[Tuple[nn.Module, Dict[str, torch.Tensor]]]
+    ):
+        """
+        Load the original parameters of the given modules and empty the list. Modules are restored in reverse
+        order, such that parameters shared by several modules end up in their original state.
+        """
+        with torch.no_grad():
+            while original_parameters:
+                module, parameters = original_parameters.pop()
+                module.load_state_dict(parameters)
+
+        # Adjusted copies of the model may hold randomized parameters.
+        self._softmax_arg_models.clear()
+        self._get_model_with_linear_top.cache_clear()
+
     def sample(
         self,
         mean: float,
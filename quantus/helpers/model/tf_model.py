@@ -8,8 +8,8 @@
 
 from __future__ import annotations
 
-from typing import Dict, Optional, Tuple, List, Union, Generator
-from keras.layers import Dense
+from typing import Callable, Dict, Optional, Tuple, List, Union, Generator
+from keras.layers import Dense, Layer
 from keras import activations
 from keras import Model
 from keras.models import clone_model
@@ -18,6 +18,7 @@ import tensorflow as tf
 from warnings import warn
 from cachetools import cachedmethod, LRUCache
 import operator
+import weakref
 
 from quantus.helpers.model.model_interface import ModelInterface
 from quantus.helpers import utils
@@ -37,6 +38,10 @@ class TensorFlowModel(ModelInterface[Model]):
         "use_multiprocessing",
     ]
 
+    # Inputs of at most this many samples are predicted with a direct call of the compiled forward pass,
+    # unless a smaller batch_size is passed to predict.
+    _direct_call_max_batch_size = 64
+
     def __init__(
         self,
         model: Model,
@@ -75,6 +80,9 @@ class TensorFlowModel(ModelInterface[Model]):
         # In the case model has softmax on top, and we need linear activation, predict also needs to re-build the model.
         # This is computationally expensive, so we save the rebuilt model in cache and reuse it for consecutive calls.
         self.cache = LRUCache(100)
+        # The compiled forward passes used by predict for small inputs, one for each prediction-ready model.
+        # They only hold weak references to the models, such that an entry is dropped with its model.
+        self._forward_functions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
 
     def _get_predict_kwargs(self, **kwargs: Dict[str, ...]) -> Dict[str, ...]:
         """
@@ -176,11 +184,42 @@ class TensorFlowModel(ModelInterface[Model]):
         """
         # Generally, one should always prefer keras predict to __call__.
         # Reference: https://keras.io/getting_started/faq/#whats-the-difference-between-model-methods-predict-and-call.
+        # For small inputs however, the overhead of predict dominates, so the compiled forward pass is called directly.
         predict_kwargs = self._get_predict_kwargs(**kwargs)
         predict_model = self.get_softmax_arg_model()
 
+        if self._use_direct_call(x, predict_kwargs):
+            return self._get_forward_function(predict_model)(x).numpy()
+
         return predict_model.predict(x, **predict_kwargs)
 
+    def _use_direct_call(self, x: np.ndarray, predict_kwargs: Dict[str, ...]) -> bool:
+        """
+        Checks if the input can be predicted with a single direct call of the forward pass, which is the case
+        for a single small array, if no other predict kwargs than verbose and batch_size are used.
+        """
+        if not isinstance(x, np.ndarray) or x.ndim == 0:
+            return False
+        if any(k not in ("verbose", "batch_size") for k in predict_kwargs):
+            return False
+        max_batch_size = predict_kwargs.get(
+            "batch_size", self._direct_call_max_batch_size
+        )
+        return max_batch_size is not None and len(x) <= max_batch_size
+
+    def _get_forward_function(self, predict_model: Model) -> Callable:
+        """
+        Returns the compiled forward pass of the given model in inference mode.
+        It is built once per model and reused during consecutive predict calls.
+        """
+        if predict_model not in self._forward_functions:
+            predict_model_ref = weakref.ref(predict_model)
+            self._forward_functions[predict_model] = tf.function(
+                lambda x: predict_model_ref()(x, training=False),
+                reduce_retracing=True,
+            )
+        return self._forward_functions[predict_model]
+
     def shape_input(
         self,
         x: np.ndarray,
@@ -237,25 +276,36 @@ class TensorFlowModel(ModelInterface[Model]):
         self.model.set_weights(original_parameters)
 
     def get_random_layer_generator(
-        self, order: str = "top_down", seed: int = 42
+        self, order: str = "top_down", seed: int = 42, in_place: bool = False
     ) -> Generator[Tuple[str, Model], None, None]:
         """
         In every iteration yields a copy of the model with one additional layer's parameters randomized.
         For cascading randomization, set order (str) to 'top_down'. For independent randomization,
         set it to 'independent'. For bottom-up order, set it to 'bottom_up'.
 
+        If in_place is set, the layers of the model itself are randomized instead of a copy, and only the
+        original weights of the randomized layers are kept, which are restored once the generator is
+        exhausted or closed. For independent randomization, each layer is restored before the next one is
+        randomized. The model must not be used otherwise while the generator is running.
+
         Parameters
         ----------
         order: string
             The various ways that a model's weights of a layer can be randomised.
         seed: integer
             The seed of the random layer generator.
+        in_place: boolean
+            Indicates whether to randomise the layers of the model in place, default=False.
 
         Returns
         -------
         layer.name, random_layer_model: string, torch.nn
             The layer name and the model.
         """
+        if in_place:
+            yield from self._get_random_layer_generator_in_place(order=order, seed=seed)
+            return
+
         original_parameters = self.state_dict()
         random_layer_model = clone_model(self.model)
 
@@ -276,6 +326,46 @@ class TensorFlowModel(ModelInterface[Model]):
             layer.set_weights([np.random.permutation(w) for w in weights])
             yield layer.name, random_layer_model
 
+    def _get_random_layer_generator_in_place(
+        self, order: str, seed: int
+    ) -> Generator[Tuple[str, Model], None, None]:
+        """
+        Implementation of get_random_layer_generator with in_place=True.
+        """
+        layers = [
+            _layer for _layer in self.model.layers if len(_layer.get_weights()) > 0
+        ]
+
+        if order == "top_down":
+            layers = layers[::-1]
+
+        # The original weights of the randomized layers, which are not restored yet.
+        original_weights: List[Tuple[Layer, List[np.ndarray]]] = []
+        try:
+            for layer in layers:
+                if order == "independent":
+                    self._restore_weights(original_weights)
+                weights = layer.get_weights()
+                original_weights.append((layer, weights))
+                np.random.seed(seed=seed + 1)
+                layer.set_weights([np.random.permutation(w) for w in weights])
+                yield layer.name, self.model
+        finally:
+            self._restore_weights(original_weights)
+
+    def _restore_weights(self, original_weights: List[Tuple[Layer, List[np.ndarray]]]):
+        """
+        Set the original weights of the given layers and empty the list. Layers are restored in reverse
+        order, such that weights shared by several layers end up in their original state.
+        """
+        while original_weights:
+            layer, weights = original_weights.pop()
+            layer.set_weights(weights)
+
+        # Rebuilt models may hold copies of randomized weights.
+        self.cache.clear()
+        self._forward_functions.clear()
+
     @cachedmethod(operator.attrgetter("cache"))
     def _build_hidden_representation_model(
         self, layer_names: Tuple, layer_indices: Tuple
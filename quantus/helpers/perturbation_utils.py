@@ -1,9 +1,24 @@
 from __future__ import annotations
 
 import sys
-from typing import List, TYPE_CHECKING, Callable, Mapping
+import weakref
+from typing import (
+    List,
+    TYPE_CHECKING,
+    Callable,
+    Generator,
+    Iterable,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 import numpy as np
 import functools
+from cachetools import LRUCache
+
+from quantus.helpers import utils, warn
 
 if sys.version_info >= (3, 8):
     from typing import Protocol
@@ -25,6 +40,110 @@ if TYPE_CHECKING:
             ...
 
 
+class PerturbationCheck:
+    """
+    Checks perturbed inputs for being equal to their original input, see warn.warn_perturbation_caused_no_change.
+
+    Comparing every perturbed input to its original input can take a noticeable share of the runtime of
+    perturbation metrics with cheap models, so the inputs that are checked are selected by a policy:
+
+    - "always": Check every perturbed input.
+    - "first_n": Check the first n perturbed inputs only, counted since the last reset().
+    - "sampled": Check a random fraction sample_rate of the perturbed inputs. The sample is drawn from a
+      separate random number generator, such that the perturbations themselves are not affected.
+    - "off": Do not check any perturbed input.
+    """
+
+    policies = ["always", "first_n", "sampled", "off"]
+
+    def __init__(
+        self,
+        policy: str = "always",
+        n: int = 10,
+        sample_rate: float = 0.1,
+        seed: int = 0,
+    ):
+        """
+        Parameters
+        ----------
+        policy: string
+            Indicates which perturbed inputs are checked: "always", "first_n", "sampled" or "off", default="always".
+        n: integer
+            The number of perturbed inputs that are checked if policy="first_n", default=10.
+        sample_rate: float
+            The fraction of perturbed inputs that are checked if policy="sampled", default=0.1.
+        seed: integer
+            The seed of the random number generator used if policy="sampled", default=0.
+        """
+        if policy not in self.policies:
+            raise ValueError(
+                f"The perturbation check policy must be in {self.policies} but is: {policy}."
+            )
+
+        self.policy = policy
+        self.n = n
+        self.sample_rate = sample_rate
+        self.rng = np.random.default_rng(seed)
+        self.nr_checked = 0
+
+    def reset(self) -> None:
+        """Reset the number of checked perturbed inputs, e.g., at the start of an evaluation call."""
+        self.nr_checked = 0
+
+    def _select(self, nr_inputs: int) -> np.ndarray:
+        """Select which of the next nr_inputs perturbed inputs are checked."""
+        if self.policy == "always":
+            selected = np.ones(nr_inputs, dtype=bool)
+        elif self.policy == "first_n":
+            selected = np.arange(nr_inputs) < self.n - self.nr_checked
+        elif self.policy == "sampled":
+            selected = self.rng.random(nr_inputs) < self.sample_rate
+        else:
+            selected = np.zeros(nr_inputs, dtype=bool)
+
+        self.nr_checked += int(selected.sum())
+        return selected
+
+    def __call__(self, x: np.ndarray, x_perturbed: np.ndarray) -> None:
+        """
+        Check a perturbed input, see warn.warn_perturbation_caused_no_change.
+
+        Parameters
+        ----------
+        x: np.ndarray
+             The original input that is considered unperturbed.
+        x_perturbed: np.ndarray
+             The perturbed input.
+        """
+        if self._select(1)[0]:
+            warn.warn_perturbation_caused_no_change(x=x, x_perturbed=x_perturbed)
+
+    def batch(self, x_batch: np.ndarray, x_perturbed_batch: np.ndarray) -> None:
+        """
+        Check a stack of perturbed inputs in a single vectorised comparison, with at most one warning,
+        see warn.warn_perturbation_caused_no_change_batch.
+
+        Parameters
+        ----------
+        x_batch: np.ndarray
+             The original inputs that are considered unperturbed.
+        x_perturbed_batch: np.ndarray
+             The perturbed inputs. Several perturbations of x_batch can be stacked along the batch axis,
+             each is then compared to the original input at the same index modulo the length of x_batch.
+        """
+        selected = self._select(len(x_perturbed_batch))
+        if selected.all():
+            warn.warn_perturbation_caused_no_change_batch(
+                x_batch=x_batch, x_perturbed_batch=x_perturbed_batch
+            )
+        elif selected.any():
+            selected_ids = np.flatnonzero(selected)
+            warn.warn_perturbation_caused_no_change_batch(
+                x_batch=x_batch[selected_ids % len(x_batch)],
+                x_perturbed_batch=x_perturbed_batch[selected_ids],
+            )
+
+
 def make_perturb_func(
     perturb_func: PerturbFunc, perturb_func_kwargs: Mapping[str, ...] | None, **kwargs
 ) -> PerturbFunc | functools.partial:
@@ -41,18 +160,59 @@ def make_perturb_func(
 def make_changed_prediction_indices_func(
     return_nan_when_prediction_changes: bool,
 ) -> Callable[[ModelInterface, np.ndarray, np.ndarray], List[int]]:
-    """A utility function to improve static analysis."""
+    """
+    A utility function to improve static analysis. The returned function caches the predictions on
+    the unperturbed batch, so they are computed once per batch and reused for all perturbation samples.
+    """
     return functools.partial(
         changed_prediction_indices,
         return_nan_when_prediction_changes=return_nan_when_prediction_changes,
+        prediction_cache=LRUCache(maxsize=1),
     )
 
 
+def predict_cached(
+    model: ModelInterface, x: np.ndarray, prediction_cache: MutableMapping
+) -> np.ndarray:
+    """
+    Predict on x, reusing the predictions of a previous call with the same model and input buffer.
+
+    Entries are keyed by the memory buffer of x and only hold weak references to the model and the input,
+    so an entry is reused only while both are alive and the cache does not keep any batch in memory.
+    x must not be modified in place while it is cached.
+
+    Parameters
+    ----------
+    model: ModelInterface
+        The model to predict with.
+    x: np.ndarray
+        The model input.
+    prediction_cache: MutableMapping
+        The cache of predictions, e.g., a cachetools.LRUCache.
+
+    Returns
+    -------
+    np.ndarray
+        The predictions on x.
+    """
+    key = (x.__array_interface__["data"][0], x.shape, x.strides, x.dtype.str)
+    cached = prediction_cache.get(key)
+    if cached is not None and cached[0]() is model and cached[1]() is x:
+        return cached[2]
+
+    y_pred = model.predict(x)
+    prediction_cache[key] = (weakref.ref(model), weakref.ref(x), y_pred)
+    return y_pred
+
+
 def changed_prediction_indices(
     model: ModelInterface,
     x_batch: np.ndarray,
     x_perturbed: np.ndarray,
     return_nan_when_prediction_changes: bool,
+    prediction_cache: Optional[MutableMapping] = None,
+    y_pred: Optional[np.ndarray] = None,
+    y_pred_perturbed: Optional[np.ndarray] = None,
 ) -> List[int]:
     """
     Find indices in batch, for which predicted label has changed after applying perturbation.
@@ -66,7 +226,14 @@ def changed_prediction_indices(
     x_batch:
         Batch of original inputs provided by user.
     x_perturbed:
-        Batch of inputs after applying perturbation.
+        Batch of inputs after applying perturbation. Several perturbations of x_batch can be stacked
+        along the batch axis, the returned indices then refer to x_perturbed.
+    prediction_cache:
+        Optional cache for the predictions on x_batch, see predict_cached.
+    y_pred:
+        Optional predictions on x_batch, if already computed by the caller.
+    y_pred_perturbed:
+        Optional predictions on x_perturbed, if already computed by the caller.
 
     Returns
     -------
@@ -79,7 +246,319 @@ def changed_prediction_indices(
     if not return_nan_when_prediction_changes:
         return []
 
-    labels_before = model.predict(x_batch).argmax(axis=-1)
-    labels_after = model.predict(x_perturbed).argmax(axis=-1)
+    if y_pred is None:
+        if prediction_cache is not None:
+            y_pred = predict_cached(model, x_batch, prediction_cache)
+        else:
+            y_pred = model.predict(x_batch)
+    if y_pred_perturbed is None:
+        y_pred_perturbed = model.predict(x_perturbed)
+
+    labels_before = y_pred.argmax(axis=-1)
+    labels_after = y_pred_perturbed.argmax(axis=-1)
+    if len(labels_after) != len(labels_before):
+        labels_before = np.tile(labels_before, len(labels_after) // len(labels_before))
     changed_idx = np.reshape(np.argwhere(labels_before != labels_after), -1)
     return changed_idx.tolist()
+
+
+def get_ordered_patches(
+    a: np.ndarray,
+    patch_size: int,
+    indexed_axes: Sequence[int],
+    order: str = "morf",
+    max_patches: Optional[int] = None,
+) -> List[Tuple[slice, ...]]:
+    """
+    Order all patches of an attribution map by their summed attribution and remove overlapping patches.
+
+    The attribution map is padded by patch_size - 1 (constant mode) before the patches are created, so that
+    patches of any size can be placed at every position. The returned patch slices therefore refer to the
+    padded input, see utils._pad_array.
+
+    Parameters
+    ----------
+    a: np.ndarray
+        The explanation to be evaluated on an instance-basis.
+    patch_size: integer
+        The patch size for masking.
+    indexed_axes: sequence
+        The dimensions of a that are indexed by the patches.
+    order: string
+        Indicates whether patches are ordered randomly ("random"), according to the
+        most relevant first ("morf"), or least relevant first ("lerf"), default="morf".
+    max_patches: integer, optional
+        The maximum number of non-overlapping patches to return. If None, all are returned.
+
+    Returns
+    -------
+    ordered_patches_no_overlap: list
+        The ordered, non-overlapping patch slices.
+    """
+    # Pad attributions. This is needed to allow for any patch_size.
+    pad_width = patch_size - 1
+    a_pad = utils._pad_array(a, pad_width, mode="constant", padded_axes=indexed_axes)
+
+    # Aggregate attributions over the axes which are not indexed by the patches.
+    indexed_axes = sorted(indexed_axes)
+    a_pad = a_pad.sum(
+        axis=tuple(axis for axis in range(a_pad.ndim) if axis not in indexed_axes)
+    )
+
+    # Sum attributions of all patches at once, using a strided view of the patch windows.
+    # The patch grid holds one entry per top-left coordinate of the unpadded input.
+    grid_shape = tuple(size - 2 * pad_width for size in a_pad.shape)
+    windows = np.lib.stride_tricks.as_strided(
+        a_pad[tuple(slice(pad_width, None) for _ in grid_shape)],
+        shape=grid_shape + (patch_size,) * len(grid_shape),
+        strides=a_pad.strides * 2,
+        writeable=False,
+    )
+    att_sums = windows.sum(axis=tuple(range(len(grid_shape), windows.ndim))).flatten()
+
+    if order == "random":
+        # Order attributions randomly.
+        ordering = np.arange(len(att_sums))
+        np.random.shuffle(ordering)
+
+    elif order == "morf":
+        # Order attributions according to the most relevant first.
+        ordering = np.argsort(att_sums)[::-1]
+
+    elif order == "lerf":
+        # Order attributions according to the least relevant first.
+        ordering = np.argsort(att_sums)
+
+    else:
+        raise ValueError(
+            f"Chosen order must be in ['random', 'morf', 'lerf'] but is: {order}."
+        )
+
+    # Remove overlapping patches. Two patches overlap if their top-left coordinates are closer
+    # than patch_size along every axis, so accepting a patch blocks all top-left coordinates
+    # within that range on the patch grid.
+    blocked_grid = np.zeros(grid_shape, dtype=bool)
+    blocked_flat = blocked_grid.reshape(-1)
+    ordered_patches_no_overlap = []
+    for p in ordering:
+        if blocked_flat[p]:
+            continue
+
+        coords = np.unravel_index(p, grid_shape)
+        blocked_grid[
+            tuple(slice(max(c - patch_size + 1, 0), c + patch_size) for c in coords)
+        ] = True
+        ordered_patches_no_overlap.append(
+            utils.create_patch_slice(
+                patch_size=patch_size,
+                coords=[c + pad_width for c in coords],
+            )
+        )
+
+        if max_patches is not None and len(ordered_patches_no_overlap) >= max_patches:
+            break
+
+    return ordered_patches_no_overlap
+
+
+def generate_cumulative_perturbations(
+    perturb_func: PerturbFunc,
+    arr: np.ndarray,
+    indices_steps: Iterable,
+    indexed_axes: Sequence[int],
+    pad_width: int = 0,
+    perturbation_check: Optional[PerturbationCheck] = None,
+    check_against_previous: bool = False,
+) -> Generator[np.ndarray, None, None]:
+    """
+    Perturb an input cumulatively, i.e., each step perturbs the result of the previous step,
+    and yield the perturbed input after every step.
+
+    Parameters
+    ----------
+    perturb_func: callable
+        Input perturbation function.
+    arr: np.ndarray
+        The (channel first) input to start perturbing from.
+    indices_steps: iterable
+        The indices (or patch slices) to perturb in each step.
+    indexed_axes: sequence
+        The dimensions of arr that are indexed.
+    pad_width: integer
+        If larger than zero, arr is padded (edge mode) by pad_width before every step and unpadded afterwards.
+        This is needed for patch slices from get_ordered_patches().
+    perturbation_check: PerturbationCheck, optional
+        Checks whether a step leaves the input equal to arr. If None, the steps are not checked.
+    check_against_previous: boolean
+        Indicates whether each step is checked against the result of the previous step instead of arr,
+        default=False.
+
+    Returns
+    -------
+    generator
+        The cumulatively perturbed inputs, one per step.
+    """
+    arr_perturbed = arr.copy()
+
+    for indices in indices_steps:
+        arr_prev_perturbed = arr_perturbed
+        if pad_width > 0:
+            # Pad the perturbed input. The mode should probably depend on the used perturb_func?
+            arr_perturbed_pad = utils._pad_array(
+                arr_perturbed, pad_width, mode="edge", padded_axes=indexed_axes
+            )
+            arr_perturbed_pad = perturb_func(
+                arr=arr_perturbed_pad,
+                indices=indices,
+                indexed_axes=indexed_axes,
+            )
+            # Remove padding.
+            arr_perturbed = utils._unpad_array(
+                arr_perturbed_pad, pad_width, padded_axes=indexed_axes
+            )
+        else:
+            arr_perturbed = perturb_func(
+                arr=arr_perturbed,
+                indices=indices,
+                indexed_axes=indexed_axes,
+            )
+
+        if perturbation_check is not None:
+            perturbation_check(
+                x=arr_prev_perturbed if check_against_previous else arr,
+                x_perturbed=arr_perturbed,
+            )
+
+        yield arr_perturbed
+
+
+def generate_rank_perturbations(
+    arr: np.ndarray,
+    rank_map: np.ndarray,
+    fill_values: np.ndarray,
+    nr_steps: int,
+    chunk_size: int,
+    perturbation_check: Optional[PerturbationCheck] = None,
+    check_against_previous: bool = False,
+) -> Generator[np.ndarray, None, None]:
+    """
+    Perturb an input cumulatively by a rank map, i.e., step k replaces all positions with a rank of at most k
+    by their fill value, and yield the perturbed inputs of chunk_size steps at a time, stacked.
+
+    This is equivalent to generate_cumulative_perturbations() with the positions of rank k as the indices of
+    step k, if the value a position is replaced with does not change in later steps. Each chunk is
+    materialised once, with a single broadcast comparison, and can be passed to the model as it is.
+
+    Parameters
+    ----------
+    arr: np.ndarray
+        The (channel first) input to start perturbing from.
+    rank_map: np.ndarray
+        The step in which each position is perturbed, broadcastable to arr.
+    fill_values: np.ndarray
+        The values the positions are replaced with, broadcastable to arr.
+    nr_steps: integer
+        The number of steps.
+    chunk_size: integer
+        The number of steps that are materialised at once.
+    perturbation_check: PerturbationCheck, optional
+        Checks whether a step leaves the input equal to arr, once per chunk. If None, the steps are not checked.
+    check_against_previous: boolean
+        Indicates whether each step is checked against the result of the previous step instead of arr,
+        default=False.
+
+    Returns
+    -------
+    generator
+        The cumulatively perturbed inputs, stacked in chunks of at most chunk_size steps.
+    """
+    arr_prev_perturbed = arr
+    for start in range(0, nr_steps, chunk_size):
+        steps = np.arange(start, min(start + chunk_size, nr_steps))
+        arr_perturbed_chunk = np.where(
+            rank_map[None] <= steps.reshape((-1,) + (1,) * arr.ndim),
+            fill_values[None],
+            arr[None],
+        ).astype(arr.dtype, copy=False)
+
+        if perturbation_check is not None and check_against_previous:
+            perturbation_check.batch(
+                x_batch=arr_prev_perturbed[None],
+                x_perturbed_batch=arr_perturbed_chunk[:1],
+            )
+            if len(arr_perturbed_chunk) > 1:
+                perturbation_check.batch(
+                    x_batch=arr_perturbed_chunk[:-1],
+                    x_perturbed_batch=arr_perturbed_chunk[1:],
+                )
+        elif perturbation_check is not None:
+            perturbation_check.batch(
+                x_batch=arr[None], x_perturbed_batch=arr_perturbed_chunk
+            )
+
+        arr_prev_perturbed = arr_perturbed_chunk[-1]
+        yield arr_perturbed_chunk
+
+
+def predict_on_perturbations(
+    model: ModelInterface,
+    x_perturbed_batch: Iterable[Iterable[np.ndarray]],
+    predict_batch_size: int,
+    stacked: bool = False,
+) -> List[np.ndarray]:
+    """
+    Predict on the perturbed inputs of a batch of instances, in chunks of predict_batch_size inputs.
+
+    The perturbed inputs are consumed lazily, such that no more than predict_batch_size of them
+    are held in memory at once, and the perturbed inputs of different instances share forward passes.
+
+    Parameters
+    ----------
+    model: ModelInterface
+        A ModelInterface that is subject to explanation.
+    x_perturbed_batch: iterable
+        For each instance, an iterable of perturbed (channel first) inputs, e.g., the steps of a perturbation curve.
+    predict_batch_size: integer
+        The maximum number of perturbed inputs passed to the model in a single forward pass.
+    stacked: boolean
+        Indicates whether the iterables yield stacks of perturbed inputs instead of single perturbed inputs.
+        A stack that fills a forward pass on its own is passed to the model without copying it, default=False.
+
+    Returns
+    -------
+    y_pred_batch: list
+        For each instance, an array of shape (nr_perturbations, nr_outputs) with the predictions on its perturbed inputs.
+    """
+    y_pred_batch: List[List[np.ndarray]] = []
+    x_chunk: List[np.ndarray] = []
+    ids_chunk: List[int] = []
+
+    def predict_chunk():
+        x_input = x_chunk[0] if len(x_chunk) == 1 else np.concatenate(x_chunk)
+        x_input = model.shape_input(
+            x_input, x_input.shape, channel_first=True, batched=True
+        )
+        for x_id, y_pred in zip(ids_chunk, model.predict(x_input)):
+            y_pred_batch[x_id].append(y_pred)
+        x_chunk.clear()
+        ids_chunk.clear()
+
+    for x_id, x_perturbed_instance in enumerate(x_perturbed_batch):
+        y_pred_batch.append([])
+        for x_perturbed in x_perturbed_instance:
+            if not stacked:
+                x_perturbed = x_perturbed[None]
+
+            # Split the stack over the forward passes it falls into.
+            while len(x_perturbed) > 0:
+                nr_inputs = min(len(x_perturbed), predict_batch_size - len(ids_chunk))
+                x_chunk.append(x_perturbed[:nr_inputs])
+                ids_chunk.extend([x_id] * nr_inputs)
+                x_perturbed = x_perturbed[nr_inputs:]
+                if len(ids_chunk) == predict_batch_size:
+                    predict_chunk()
+
+    if x_chunk:
+        predict_chunk()
+
+    return [np.array(y_pred) for y_pred in y_pred_batch]
@@ -7,13 +7,20 @@
 # Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
 
 import copy
+import hashlib
+import os
 import re
 from importlib import util
-from typing import Any, Dict, Optional, Sequence, Tuple, Union, List, TypeVar
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union, List, TypeVar
 
 import numpy as np
+import scipy.ndimage
+import scipy.stats
+import skimage
+from cachetools import LRUCache
 from skimage.segmentation import slic, felzenszwalb
 
+from quantus.functions import norm_func, similarity_func
 from quantus.helpers import asserts
 from quantus.helpers.model.model_interface import ModelInterface
 
@@ -25,16 +32,33 @@ if util.find_spec("tensorflow"):
     from quantus.helpers.model.tf_model import TensorFlowModel
 
 
-def get_superpixel_segments(img: np.ndarray, segmentation_method: str) -> np.ndarray:
+# Superpixel segments keyed by the content of the image and the segmentation parameters, see
+# get_superpixel_segments. The cache is bounded by the total size of the segments it holds.
+_superpixel_segments_cache = LRUCache(
+    maxsize=128 * 2**20, getsizeof=lambda segments: segments.nbytes
+)
+
+
+def get_superpixel_segments(
+    img: np.ndarray, segmentation_method: str, cache_dir: Optional[str] = None
+) -> np.ndarray:
     """
     Given an image, return segments or so-called 'super-pixels' segments i.e., an 2D mask with segment labels.
 
+    The segments are cached in memory, keyed by a hash of the image content and the segmentation
+    parameters, so repeated calls on the same image (e.g., when evaluating several explanation
+    methods on one dataset) only segment it once. If cache_dir is given, the segments are also
+    stored on disk and reused across processes.
+
     Parameters
     ----------
     img: np.ndarray
             CxWxH image array.
     segmentation_method: string
         Indicates the segmentation method, i.e. "slic" or "felzenszwalb".
+    cache_dir: string, optional
+        The directory to store the segments in, created if it does not exist. If None, the segments are
+        only cached in memory.
 
     Returns
     -------
@@ -52,12 +76,37 @@ def get_superpixel_segments(img: np.ndarray, segmentation_method: str) -> np.nda
             "'segmentation_method' must be either 'slic' or 'felzenszwalb'."
         )
 
-    if segmentation_method == "slic":
-        return slic(img, start_label=0)
-    elif segmentation_method == "felzenszwalb":
-        return felzenszwalb(
-            img,
-        )
+    img = np.ascontiguousarray(img)
+    img_hash = hashlib.blake2b(img.view(np.uint8), digest_size=16)
+    img_hash.update(
+        repr(
+            (img.shape, img.dtype.str, segmentation_method, skimage.__version__)
+        ).encode()
+    )
+    key = img_hash.hexdigest()
+
+    path = None if cache_dir is None else os.path.join(cache_dir, key + ".npy")
+    segments = _superpixel_segments_cache.get(key)
+    if segments is None and path is not None and os.path.exists(path):
+        segments = np.load(path)
+    elif segments is None:
+        if segmentation_method == "slic":
+            segments = slic(img, start_label=0)
+        elif segmentation_method == "felzenszwalb":
+            segments = felzenszwalb(
+                img,
+            )
+
+    if path is not None and not os.path.exists(path):
+        # Write to a temporary file first, so an interruption never leaves a partial file behind.
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, segments)
+        os.replace(tmp_path, path)
+
+    _superpixel_segments_cache[key] = segments
+    return segments.copy()
 
 
 def get_baseline_value(
@@ -1018,6 +1067,108 @@ def calculate_auc(values: np.array, dx: int = 1):
     return np.trapz(np.array(values), dx=dx)
 
 
+def apply_rowwise(
+    func: Callable, *arrays: np.ndarray, positional: bool = False
+) -> np.ndarray:
+    """
+    Apply a function of 1D arrays, e.g., a norm or similarity function, to each row of 2D arrays.
+
+    The norm functions in quantus.functions.norm_func and the difference, correlation_pearson,
+    correlation_spearman and ssim similarity functions are evaluated on all rows at once,
+    other functions are called row by row.
+
+    Parameters
+    ----------
+    func: callable
+        The function to apply, called as func(a=row) for a single array or func(a=row_a, b=row_b) for two arrays.
+    arrays: np.ndarray
+        One or two 2D arrays with the same number of rows.
+    positional: boolean
+        Indicates whether func is called with the rows as positional arguments instead, i.e., func(row) or
+        func(row_a, row_b), such that the names of its parameters do not matter, default=False.
+
+    Returns
+    -------
+    np.ndarray
+        The stacked results for each row.
+    """
+    if len(arrays) == 1:
+        if func in (norm_func.fro_norm, norm_func.l2_norm):
+            return np.linalg.norm(arrays[0], axis=1)
+        if func is norm_func.linf_norm:
+            return np.linalg.norm(arrays[0], ord=np.inf, axis=1)
+        if positional:
+            return np.array([func(a) for a in arrays[0]])
+        return np.array([func(a=a) for a in arrays[0]])
+
+    a, b = arrays
+    if func is similarity_func.difference:
+        return a - b
+    if func is similarity_func.correlation_pearson and a.shape[1] > 1:
+        return _correlation_pearson_rowwise(a, b)
+    if func is similarity_func.correlation_spearman and a.shape[1] > 1:
+        return _correlation_pearson_rowwise(
+            scipy.stats.rankdata(a, axis=1), scipy.stats.rankdata(b, axis=1)
+        )
+    if func is similarity_func.ssim and a.shape[1] >= _SSIM_WIN_SIZE:
+        return _ssim_rowwise(a, b)
+    if positional:
+        return np.array([func(a_row, b_row) for a_row, b_row in zip(a, b)])
+    return np.array([func(a=a_row, b=b_row) for a_row, b_row in zip(a, b)])
+
+
+def _correlation_pearson_rowwise(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pearson correlation of each pair of rows of a and b, nan for constant rows as in scipy.stats.pearsonr."""
+    constant = np.all(a == a[:, :1], axis=1) | np.all(b == b[:, :1], axis=1)
+    a = a - a.mean(axis=1, keepdims=True, dtype=np.float64)
+    b = b - b.mean(axis=1, keepdims=True, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.einsum("ij,ij->i", a, b) / (
+            np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+        )
+    r[constant] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+# The default window size of skimage.metrics.structural_similarity.
+_SSIM_WIN_SIZE = 7
+
+
+def _ssim_rowwise(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Structural similarity of each pair of rows of a and b, following
+    skimage.metrics.structural_similarity with the data range of each pair, as in similarity_func.ssim.
+    """
+    float_type = np.float32 if a.dtype in (np.float16, np.float32) else np.float64
+    a = a.astype(float_type, copy=False)
+    b = b.astype(float_type, copy=False)
+    data_range = np.abs(
+        np.maximum(a.max(axis=1), b.max(axis=1))
+        - np.minimum(a.min(axis=1), b.min(axis=1))
+    ).astype(np.float64)[:, None]
+
+    def filter_rows(x: np.ndarray) -> np.ndarray:
+        return scipy.ndimage.uniform_filter1d(x, size=_SSIM_WIN_SIZE, axis=1)
+
+    # Sample covariance over the window.
+    cov_norm = _SSIM_WIN_SIZE / (_SSIM_WIN_SIZE - 1)
+    ux, uy = filter_rows(a), filter_rows(b)
+    vx = cov_norm * (filter_rows(a * a) - ux * ux)
+    vy = cov_norm * (filter_rows(b * b) - uy * uy)
+    vxy = cov_norm * (filter_rows(a * b) - ux * uy)
+    c1 = ((0.01 * data_range) ** 2).astype(float_type)
+    c2 = ((0.03 * data_range) ** 2).astype(float_type)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = ((2 * ux * uy + c1) * (2 * vxy + c2)) / (
+            (ux**2 + uy**2 + c1) * (vx + vy + c2)
+        )
+
+    # Ignore the filter radius at the edges.
+    pad = (_SSIM_WIN_SIZE - 1) // 2
+    return s[:, pad : s.shape[1] - pad].mean(axis=1, dtype=np.float64)
+
+
 T = TypeVar("T")
 
 
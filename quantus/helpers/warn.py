@@ -261,6 +261,36 @@ def warn_perturbation_caused_no_change(x: np.ndarray, x_perturbed: np.ndarray) -
         )
 
 
+def warn_perturbation_caused_no_change_batch(
+    x_batch: np.ndarray, x_perturbed_batch: np.ndarray
+) -> None:
+    """
+    Warn once if the perturbation caused no change for any input of a stack of perturbed inputs,
+    see warn_perturbation_caused_no_change. All inputs are compared in a single vectorised reduction.
+
+    Parameters
+    ----------
+    x_batch: np.ndarray
+         The original inputs that are considered unperturbed.
+    x_perturbed_batch: np.ndarray
+         The perturbed inputs. Several perturbations of x_batch can be stacked along the batch axis,
+         each is then compared to the original input at the same index modulo the length of x_batch.
+
+    Returns
+    -------
+    None
+    """
+    x_perturbed_batch = x_perturbed_batch.reshape((-1,) + x_batch.shape)
+    unchanged = np.isclose(x_batch, x_perturbed_batch, equal_nan=True)
+    unchanged = unchanged.reshape(unchanged.shape[:2] + (-1,)).all(axis=-1)
+    if unchanged.any():
+        warnings.warn(
+            "The settings for perturbing input e.g., 'perturb_func' "
+            f"didn't cause change in input for {unchanged.sum()} of {unchanged.size} perturbed inputs. "
+            "Reconsider the parameter settings."
+        )
+
+
 def warn_max_size() -> None:
     """
     Warns if the ratio is smaller than the maximum size, for attribution_localisaiton metric.
@@ -289,22 +289,12 @@ class Completeness(Metric[List[float]]):
         score: boolean
             The evaluation results.
         """
-        x_baseline = self.perturb_func(
-            arr=x, indices=np.arange(0, x.size), indexed_axes=np.arange(0, x.ndim)
-        )
-
-        # Predict on input.
-        x_input = model.shape_input(x, x.shape, channel_first=True)
-        y_pred = float(model.predict(x_input)[:, y])
-
-        # Predict on baseline.
-        x_input = model.shape_input(x_baseline, x.shape, channel_first=True)
-        y_pred_baseline = float(model.predict(x_input)[:, y])
-
-        if np.sum(a) == self.output_func(y_pred - y_pred_baseline):
-            return True
-        else:
-            return False
+        return self.evaluate_batch(
+            model=model,
+            x_batch=np.expand_dims(x, axis=0),
+            y_batch=np.expand_dims(y, axis=0),
+            a_batch=np.expand_dims(a, axis=0),
+        )[0]
 
     def evaluate_batch(
         self,
@@ -336,8 +326,32 @@ class Completeness(Metric[List[float]]):
         scores_batch:
             The evaluation results.
         """
+        # Replace all features of every input by the baseline.
+        x_baseline_batch = np.stack(
+            [
+                self.perturb_func(
+                    arr=x,
+                    indices=np.arange(0, x.size),
+                    indexed_axes=np.arange(0, x.ndim),
+                )
+                for x in x_batch
+            ]
+        )
+
+        # Predict on the inputs and on the baselines, each in a single forward pass.
+        y_pred_batch, y_pred_baseline_batch = [
+            model.predict(
+                model.shape_input(x, x.shape, channel_first=True, batched=True)
+            )[np.arange(len(y_batch)), y_batch]
+            for x in [x_batch, x_baseline_batch]
+        ]
+
+        # Sum the attributions of every instance at once.
+        a_sums = a_batch.reshape(len(a_batch), -1).sum(axis=1)
 
         return [
-            self.evaluate_instance(model=model, x=x, y=y, a=a)
-            for x, y, a in zip(x_batch, y_batch, a_batch)
+            bool(a_sum == self.output_func(float(y_pred) - float(y_pred_baseline)))
+            for a_sum, y_pred, y_pred_baseline in zip(
+                a_sums, y_pred_batch, y_pred_baseline_batch
+            )
         ]
@@ -7,7 +7,7 @@
 # Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
 
 import sys
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Generator, List, Optional
 
 import numpy as np
 
@@ -20,7 +20,10 @@ from quantus.helpers.enums import (
     ScoreDirection,
 )
 from quantus.helpers.model.model_interface import ModelInterface
-from quantus.helpers.perturbation_utils import make_perturb_func
+from quantus.helpers.perturbation_utils import (
+    make_perturb_func,
+    predict_on_perturbations,
+)
 from quantus.metrics.base import Metric
 
 if sys.version_info >= (3, 8):
@@ -73,6 +76,8 @@ class NonSensitivity(Metric[List[float]]):
         perturb_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Callable = np.mean,
+        deterministic_perturbation: Optional[bool] = None,
+        predict_batch_size: int = 64,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -108,6 +113,12 @@ class NonSensitivity(Metric[List[float]]):
             Indicates if an aggregated score should be produced over all instances.
         aggregate_func: callable
             A Callable to aggregate the scores per instance to one float.
+        deterministic_perturbation: boolean, optional
+            Indicates whether perturb_func returns the same perturbed input for the same indices. If so, every
+            perturbed input is predicted once instead of n_samples times. If None, it is inferred from perturb_func,
+            i.e., True for baseline_replacement_by_indices with a baseline other than "uniform", default=None.
+        predict_batch_size: integer
+            The number of perturbed inputs that are passed to the model in a single forward pass, default=64.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
@@ -141,6 +152,15 @@ class NonSensitivity(Metric[List[float]]):
         self.perturb_func = make_perturb_func(
             perturb_func, perturb_func_kwargs, perturb_baseline=perturb_baseline
         )
+        self.predict_batch_size = predict_batch_size
+
+        if deterministic_perturbation is None:
+            baseline = self.perturb_func.keywords.get("perturb_baseline")
+            deterministic_perturbation = (
+                perturb_func is baseline_replacement_by_indices
+                and not (isinstance(baseline, str) and baseline.lower() == "uniform")
+            )
+        self.deterministic_perturbation = deterministic_perturbation
 
         # Asserts and warnings.
         if not self.disable_warnings:
@@ -263,6 +283,52 @@ class NonSensitivity(Metric[List[float]]):
             **kwargs,
         )
 
+    def _generate_perturbed_inputs(
+        self, x: np.ndarray, a: np.ndarray
+    ) -> Generator[np.ndarray, None, None]:
+        """Perturb x by each chunk of features_in_step attributions, once if deterministic, else n_samples times."""
+        nr_samples = 1 if self.deterministic_perturbation else self.n_samples
+        for i_ix, a_ix in enumerate(a[:: self.features_in_step]):
+            a_ix = a[
+                (self.features_in_step * i_ix) : (self.features_in_step * (i_ix + 1))
+            ].astype(int)
+
+            for _ in range(nr_samples):
+                # Perturb input by indices of attributions.
+                yield self.perturb_func(
+                    arr=x,
+                    indices=a_ix,
+                    indexed_axes=self.a_axes,
+                )
+
+    @staticmethod
+    def _streaming_variances(preds: np.ndarray) -> np.ndarray:
+        """
+        Calculate the variance of the first k samples of every chunk for each k, with shape (nr_chunks, nr_samples).
+        The variances are updated sample by sample (Welford), such that equal samples have a variance of exactly zero.
+        """
+        mean = np.zeros(len(preds))
+        sq_sum = np.zeros(len(preds))
+        variances = np.zeros(preds.shape)
+        for k in range(preds.shape[1]):
+            delta = preds[:, k] - mean
+            mean += delta / (k + 1)
+            sq_sum += delta * (preds[:, k] - mean)
+            variances[:, k] = sq_sum / (k + 1)
+        return variances
+
+    def _evaluate_predictions(self, a: np.ndarray, preds: np.ndarray) -> int:
+        """Compare the features without attribution to the features whose perturbation has no variance."""
+        non_features = set(list(np.argwhere(a).flatten() < self.eps))
+
+        if self.deterministic_perturbation:
+            preds = np.repeat(preds, self.n_samples, axis=1)
+        vars = self._streaming_variances(preds).flatten()
+
+        non_features_vars = set(list(np.argwhere(vars).flatten() < self.eps))
+
+        return len(non_features_vars.symmetric_difference(non_features))
+
     def evaluate_instance(
         self,
         model: ModelInterface,
@@ -283,43 +349,18 @@ class NonSensitivity(Metric[List[float]]):
             The output to be evaluated on an instance-basis.
         a: np.ndarray
             The explanation to be evaluated on an instance-basis.
-        s: np.ndarray
-            The segmentation to be evaluated on an instance-basis.
 
         Returns
         -------
         integer:
             The evaluation results.
         """
-        a = a.flatten()
-
-        non_features = set(list(np.argwhere(a).flatten() < self.eps))
-
-        vars = []
-        for i_ix, a_ix in enumerate(a[:: self.features_in_step]):
-            preds = []
-            a_ix = a[
-                (self.features_in_step * i_ix) : (self.features_in_step * (i_ix + 1))
-            ].astype(int)
-
-            for _ in range(self.n_samples):
-                # Perturb input by indices of attributions.
-                x_perturbed = self.perturb_func(
-                    arr=x,
-                    indices=a_ix,
-                    indexed_axes=self.a_axes,
-                )
-
-                # Predict on perturbed input x.
-                x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
-                y_pred_perturbed = float(model.predict(x_input)[:, y])
-
-                preds.append(y_pred_perturbed)
-                vars.append(np.var(preds))
-
-        non_features_vars = set(list(np.argwhere(vars).flatten() < self.eps))
-
-        return len(non_features_vars.symmetric_difference(non_features))
+        return self.evaluate_batch(
+            model=model,
+            x_batch=np.expand_dims(x, axis=0),
+            y_batch=np.expand_dims(y, axis=0),
+            a_batch=np.expand_dims(a, axis=0),
+        )[0]
 
     def custom_preprocess(
         self,
@@ -376,8 +417,23 @@ class NonSensitivity(Metric[List[float]]):
         scores_batch:
              The evaluation results.
         """
+        a_batch = a_batch.reshape(len(a_batch), -1)
+
+        # Predict on the perturbed inputs of all instances in chunks.
+        y_pred_perturb_batch = predict_on_perturbations(
+            model=model,
+            x_perturbed_batch=(
+                self._generate_perturbed_inputs(x, a) for x, a in zip(x_batch, a_batch)
+            ),
+            predict_batch_size=self.predict_batch_size,
+        )
 
         return [
-            self.evaluate_instance(model=model, x=x, y=y, a=a)
-            for x, y, a in zip(x_batch, y_batch, a_batch)
+            self._evaluate_predictions(
+                a=a,
+                preds=y_pred_perturb[:, y].reshape(
+                    -1, 1 if self.deterministic_perturbation else self.n_samples
+                ),
+            )
+            for a, y, y_pred_perturb in zip(a_batch, y_batch, y_pred_perturb_batch)
         ]
@@ -42,6 +42,7 @@ from quantus.helpers.enums import (
     ScoreDirection,
 )
 from quantus.helpers.model.model_interface import ModelInterface
+from quantus.helpers.perturbation_utils import PerturbationCheck
 
 if sys.version_info >= (3, 8):
     from typing import final
@@ -90,6 +91,8 @@ class Metric(Generic[R]):
         default_plot_func: Optional[Callable],
         disable_warnings: bool,
         display_progressbar: bool,
+        perturbation_check: str = "always",
+        perturbation_check_kwargs: Optional[Dict[str, Any]] = None,
         **kwargs,
     ):
         """
@@ -128,6 +131,11 @@ class Metric(Generic[R]):
             Indicates whether the warnings are printed.
         display_progressbar: boolean
             Indicates whether a tqdm-progress-bar is printed.
+        perturbation_check: string
+            Indicates which perturbed inputs are checked for being unchanged by the perturbation, i.e.
+            "always", "first_n", "sampled" or "off", see PerturbationCheck, default="always".
+        perturbation_check_kwargs: dict
+            Keyword arguments to be passed to PerturbationCheck, e.g., n or sample_rate, default={}.
         kwargs: optional
             Keyword arguments.
         """
@@ -158,6 +166,10 @@ class Metric(Generic[R]):
         self._disable_warnings = disable_warnings
         self._display_progressbar = display_progressbar
 
+        self.perturbation_check = PerturbationCheck(
+            policy=perturbation_check, **(perturbation_check_kwargs or {})
+        )
+
         self.a_axes = None
 
         self.evaluation_scores = []
@@ -264,6 +276,9 @@ class Metric(Generic[R]):
         warn.deprecation_warnings(kwargs)
         warn.check_kwargs(kwargs)
 
+        # Count the checked perturbed inputs from the start for every evaluation call.
+        self.perturbation_check.reset()
+
         data: Dict[str, Any] = self.general_preprocess(
             model=model,
             x_batch=x_batch,
@@ -885,6 +900,7 @@ class Metric(Generic[R]):
         model: Union[ModelInterface, keras.Model, nn.Module],
         x_batch: np.ndarray,
         y_batch: np.ndarray,
+        nr_instances: Optional[int] = None,
     ) -> np.ndarray:
         """
         Compute explanations, normalise and take absolute (if was configured so during metric initialization.)
@@ -907,6 +923,10 @@ class Metric(Generic[R]):
             A np.ndarray which contains the input data that are explained.
         y_batch:
             A np.ndarray which contains the output labels that are explained.
+        nr_instances: integer, optional
+            If given, x_batch stacks several groups of nr_instances inputs, e.g., several perturbations of
+            the same batch. The explanations of each group are then normalised separately, as if each group
+            was explained in a separate call.
 
         Returns
         -------
@@ -932,7 +952,15 @@ class Metric(Generic[R]):
 
         # Normalise and take absolute values of the attributions, if configured during metric instantiation.
         if self.normalise:
-            a_batch = self.normalise_func(a_batch)
+            if nr_instances is None:
+                a_batch = self.normalise_func(a_batch)
+            else:
+                a_batch = np.concatenate(
+                    [
+                        self.normalise_func(a_batch[i : i + nr_instances])
+                        for i in range(0, len(a_batch), nr_instances)
+                    ]
+                )
 
         if self.abs:
             a_batch = np.abs(a_batch)
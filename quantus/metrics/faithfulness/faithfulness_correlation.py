@@ -6,7 +6,7 @@
 # You should have received a copy of the GNU Lesser General Public License along with Quantus. If not, see <https://www.gnu.org/licenses/>.
 # Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
 import sys
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Generator, List, Optional
 
 import numpy as np
 
@@ -20,7 +20,10 @@ from quantus.helpers.enums import (
     ScoreDirection,
 )
 from quantus.helpers.model.model_interface import ModelInterface
-from quantus.helpers.perturbation_utils import make_perturb_func
+from quantus.helpers.perturbation_utils import (
+    make_perturb_func,
+    predict_on_perturbations,
+)
 from quantus.metrics.base import Metric
 
 if sys.version_info >= (3, 8):
@@ -79,6 +82,7 @@ class FaithfulnessCorrelation(Metric[List[float]]):
         perturb_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = True,
         aggregate_func: Optional[Callable] = None,
+        predict_batch_size: int = 64,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -115,12 +119,20 @@ class FaithfulnessCorrelation(Metric[List[float]]):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        predict_batch_size: integer
+            The number of perturbed inputs that are passed to the model in a single forward pass, default=64.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
             Indicates whether the warnings are printed, default=False.
         display_progressbar: boolean
             Indicates whether a tqdm-progress-bar is printed, default=False.
+        perturbation_check: string
+            Indicates which of the nr_runs perturbed inputs per instance are checked for being unchanged by the
+            random subset perturbation: "always", "first_n", "sampled" or "off", see PerturbationCheck,
+            default="always".
+        perturbation_check_kwargs: dict
+            Keyword arguments to be passed to PerturbationCheck, e.g., n or sample_rate, default={}.
         kwargs: optional
             Keyword arguments.
         """
@@ -147,6 +159,7 @@ class FaithfulnessCorrelation(Metric[List[float]]):
         self.similarity_func = similarity_func
         self.nr_runs = nr_runs
         self.subset_size = subset_size
+        self.predict_batch_size = predict_batch_size
         self.perturb_func = make_perturb_func(
             perturb_func, perturb_func_kwargs, perturb_baseline=perturb_baseline
         )
@@ -302,38 +315,27 @@ class FaithfulnessCorrelation(Metric[List[float]]):
         float
             The evaluation results.
         """
-        # Flatten the attributions.
-        a = a.flatten()
-
-        # Predict on input.
-        x_input = model.shape_input(x, x.shape, channel_first=True)
-        y_pred = float(model.predict(x_input)[:, y])
-
-        pred_deltas = []
-        att_sums = []
-
-        # For each test data point, execute a couple of runs.
+        return self.evaluate_batch(
+            model=model,
+            x_batch=np.expand_dims(x, axis=0),
+            y_batch=np.expand_dims(y, axis=0),
+            a_batch=np.expand_dims(a, axis=0),
+        )[0]
+
+    def _generate_perturbed_inputs(
+        self, x: np.ndarray, a_size: int, a_ix_runs: np.ndarray
+    ) -> Generator[np.ndarray, None, None]:
+        """Randomly mask x by subset size for every run, storing the subset indices in a_ix_runs."""
         for i_ix in range(self.nr_runs):
-            # Randomly mask by subset size.
-            a_ix = np.random.choice(a.shape[0], self.subset_size, replace=False)
+            a_ix_runs[i_ix] = np.random.choice(a_size, self.subset_size, replace=False)
             x_perturbed = self.perturb_func(
                 arr=x,
-                indices=a_ix,
+                indices=a_ix_runs[i_ix],
                 indexed_axes=self.a_axes,
             )
-            warn.warn_perturbation_caused_no_change(x=x, x_perturbed=x_perturbed)
-
-            # Predict on perturbed input x.
-            x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
-            y_pred_perturb = float(model.predict(x_input)[:, y])
-            pred_deltas.append(float(y_pred - y_pred_perturb))
-
-            # Sum attributions of the random subset.
-            att_sums.append(np.sum(a[a_ix]))
+            self.perturbation_check(x=x, x_perturbed=x_perturbed)
 
-        similarity = self.similarity_func(a=att_sums, b=pred_deltas)
-
-        return similarity
+            yield x_perturbed
 
     def custom_preprocess(self, x_batch: np.ndarray, **kwargs) -> None:
         """
@@ -387,7 +389,39 @@ class FaithfulnessCorrelation(Metric[List[float]]):
         scores_batch:
             The evaluation results.
         """
-        return [
-            self.evaluate_instance(model=model, x=x, y=y, a=a)
-            for x, y, a in zip(x_batch, y_batch, a_batch)
-        ]
+        # Flatten the attributions.
+        a_batch = a_batch.reshape(len(a_batch), -1)
+
+        # Predict on input.
+        x_input = model.shape_input(
+            x_batch, x_batch.shape, channel_first=True, batched=True
+        )
+        y_pred_batch = model.predict(x_input)[np.arange(len(y_batch)), y_batch]
+
+        # The random subsets of every run, one row of indices for each run.
+        a_ix_batch = np.zeros(
+            (len(a_batch), self.nr_runs, self.subset_size), dtype=np.int64
+        )
+
+        # Predict on the perturbed inputs of all runs in chunks.
+        y_pred_perturb_batch = predict_on_perturbations(
+            model=model,
+            x_perturbed_batch=(
+                self._generate_perturbed_inputs(x, a_batch.shape[1], a_ix_runs)
+                for x, a_ix_runs in zip(x_batch, a_ix_batch)
+            ),
+            predict_batch_size=self.predict_batch_size,
+        )
+
+        similarities = []
+        for a, y, y_pred, y_pred_perturb, a_ix_runs in zip(
+            a_batch, y_batch, y_pred_batch, y_pred_perturb_batch, a_ix_batch
+        ):
+            pred_deltas = (y_pred - y_pred_perturb[:, y]).astype(float)
+
+            # Sum attributions of the random subsets.
+            att_sums = a[a_ix_runs].sum(axis=1)
+
+            similarities.append(self.similarity_func(a=att_sums, b=pred_deltas))
+
+        return similarities
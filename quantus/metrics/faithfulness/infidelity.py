@@ -6,7 +6,7 @@
 # You should have received a copy of the GNU Lesser General Public License along with Quantus. If not, see <https://www.gnu.org/licenses/>.
 # Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
 import sys
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple, Union
 
 import numpy as np
 
@@ -20,7 +20,11 @@ from quantus.helpers.enums import (
     ScoreDirection,
 )
 from quantus.helpers.model.model_interface import ModelInterface
-from quantus.helpers.perturbation_utils import make_perturb_func
+from quantus.helpers.perturbation_utils import (
+    generate_cumulative_perturbations,
+    make_perturb_func,
+    predict_on_perturbations,
+)
 from quantus.metrics.base import Metric
 
 if sys.version_info >= (3, 8):
@@ -79,6 +83,7 @@ class Infidelity(Metric[List[float]]):
         perturb_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        predict_batch_size: int = 64,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -116,12 +121,19 @@ class Infidelity(Metric[List[float]]):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        predict_batch_size: integer
+            The number of perturbed inputs that are passed to the model in a single forward pass, default=64.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
             Indicates whether the warnings are printed, default=False.
         display_progressbar: boolean
             Indicates whether a tqdm-progress-bar is printed, default=False.
+        perturbation_check: string
+            Indicates which perturbed inputs are checked for being unchanged by the perturbation of a patch,
+            one of "always", "first_n", "sampled" or "off", see PerturbationCheck, default="always".
+        perturbation_check_kwargs: dict
+            Keyword arguments to be passed to PerturbationCheck, e.g., n or sample_rate, default={}.
         kwargs: optional
             Keyword arguments.
         """
@@ -154,6 +166,7 @@ class Infidelity(Metric[List[float]]):
             perturb_patch_sizes = [4]
         self.perturb_patch_sizes = perturb_patch_sizes
         self.n_perturb_samples = n_perturb_samples
+        self.predict_batch_size = predict_batch_size
         self.nr_channels = None
         self.perturb_func = make_perturb_func(
             perturb_func, perturb_func_kwargs, perturb_baseline=perturb_baseline
@@ -310,72 +323,53 @@ class Infidelity(Metric[List[float]]):
             The evaluation results.
         """
 
-        # Predict on input.
-        x_input = model.shape_input(x, x.shape, channel_first=True)
-        y_pred = float(model.predict(x_input)[:, y])
+        return self.evaluate_batch(
+            model=model,
+            x_batch=np.expand_dims(x, axis=0),
+            y_batch=np.expand_dims(y, axis=0),
+            a_batch=np.expand_dims(a, axis=0),
+        )[0]
+
+    @staticmethod
+    def _get_patch_slices(x: np.ndarray, patch_size: int) -> List[Tuple[slice, ...]]:
+        """Get the slices of all patches of x for the given patch size, in the order of perturbation."""
+        return [
+            utils.create_patch_slice(
+                patch_size=patch_size,
+                coords=[top_left_x, top_left_y],
+            )
+            for top_left_x in range(0, x.shape[1], patch_size)
+            for top_left_y in range(0, x.shape[2], patch_size)
+        ]
 
-        results = []
+    def _generate_perturbed_inputs(
+        self, x: np.ndarray, a: np.ndarray, a_sums: np.ndarray
+    ) -> Generator[np.ndarray, None, None]:
+        """
+        Perturb x patch-wise for every perturbation sample and patch size, storing the
+        attribution-weighted input differences in a_sums.
+        """
+        # The sum of np.dot(np.repeat(a, nr_channels, axis=0), x - x_perturbed) only depends on
+        # the sums of a over its last axis and of x - x_perturbed over its second axis.
+        a_sum_axis = np.repeat(a, repeats=self.nr_channels, axis=0).sum(axis=(0, 1))
 
+        i_ix = 0
         for _ in range(self.n_perturb_samples):
-            sub_results = []
-
             for patch_size in self.perturb_patch_sizes:
-                pred_deltas = np.zeros(
-                    (int(a.shape[1] / patch_size), int(a.shape[2] / patch_size))
-                )
-                a_sums = np.zeros(
-                    (int(a.shape[1] / patch_size), int(a.shape[2] / patch_size))
-                )
-                x_perturbed = x.copy()
-                pad_width = patch_size - 1
-
-                for i_x, top_left_x in enumerate(range(0, x.shape[1], patch_size)):
-                    for i_y, top_left_y in enumerate(range(0, x.shape[2], patch_size)):
-                        # Perturb input patch-wise.
-                        x_perturbed_pad = utils._pad_array(
-                            x_perturbed, pad_width, mode="edge", padded_axes=self.a_axes
-                        )
-                        patch_slice = utils.create_patch_slice(
-                            patch_size=patch_size,
-                            coords=[top_left_x, top_left_y],
-                        )
-
-                        x_perturbed_pad = self.perturb_func(
-                            arr=x_perturbed_pad,
-                            indices=patch_slice,
-                            indexed_axes=self.a_axes,
-                        )
-
-                        # Remove padding.
-                        x_perturbed = utils._unpad_array(
-                            x_perturbed_pad, pad_width, padded_axes=self.a_axes
-                        )
-
-                        # Predict on perturbed input x_perturbed.
-                        x_input = model.shape_input(
-                            x_perturbed, x.shape, channel_first=True
-                        )
-                        warn.warn_perturbation_caused_no_change(
-                            x=x, x_perturbed=x_input
-                        )
-                        y_pred_perturb = float(model.predict(x_input)[:, y])
-
-                        x_diff = x - x_perturbed
-                        a_diff = np.dot(
-                            np.repeat(a, repeats=self.nr_channels, axis=0), x_diff
-                        )
-
-                        pred_deltas[i_x][i_y] = y_pred - y_pred_perturb
-                        a_sums[i_x][i_y] = np.sum(a_diff)
-
-                assert callable(self.loss_func)
-                sub_results.append(
-                    self.loss_func(a=pred_deltas.flatten(), b=a_sums.flatten())
-                )
-
-            results.append(np.mean(sub_results))
-
-        return np.mean(results)
+                for x_perturbed in generate_cumulative_perturbations(
+                    perturb_func=self.perturb_func,
+                    arr=x,
+                    indices_steps=self._get_patch_slices(x, patch_size),
+                    indexed_axes=self.a_axes,
+                    pad_width=patch_size - 1,
+                    perturbation_check=self.perturbation_check,
+                ):
+                    a_sums[i_ix] = np.dot(
+                        a_sum_axis, (x - x_perturbed).sum(axis=(0, 2))
+                    )
+                    i_ix += 1
+
+                    yield x_perturbed
 
     def custom_preprocess(
         self,
@@ -429,8 +423,54 @@ class Infidelity(Metric[List[float]]):
         scores_batch:
             The evaluation results.
         """
+        # Predict on input.
+        x_input = model.shape_input(
+            x_batch, x_batch.shape, channel_first=True, batched=True
+        )
+        y_pred_batch = model.predict(x_input)[np.arange(len(y_batch)), y_batch]
 
-        return [
-            self.evaluate_instance(model=model, x=x, y=y, a=a)
-            for x, y, a in zip(x_batch, y_batch, a_batch)
+        # The number of patch-wise perturbations for each patch size.
+        nr_patches = [
+            len(self._get_patch_slices(x_batch[0], patch_size))
+            for patch_size in self.perturb_patch_sizes
         ]
+        a_sums_batch = np.zeros(
+            (len(x_batch), self.n_perturb_samples * sum(nr_patches))
+        )
+
+        # Predict on the perturbed inputs of all samples and patch sizes in chunks.
+        y_pred_perturb_batch = predict_on_perturbations(
+            model=model,
+            x_perturbed_batch=(
+                self._generate_perturbed_inputs(x, a, a_sums)
+                for x, a, a_sums in zip(x_batch, a_batch, a_sums_batch)
+            ),
+            predict_batch_size=self.predict_batch_size,
+        )
+
+        results_batch = []
+        for y, y_pred, y_pred_perturb, a_sums in zip(
+            y_batch, y_pred_batch, y_pred_perturb_batch, a_sums_batch
+        ):
+            pred_deltas = y_pred - y_pred_perturb[:, y]
+
+            # Split the perturbations by sample and patch size.
+            results = []
+            i_ix = 0
+            for _ in range(self.n_perturb_samples):
+                sub_results = []
+                for nr_patches_size in nr_patches:
+                    assert callable(self.loss_func)
+                    sub_results.append(
+                        self.loss_func(
+                            a=pred_deltas[i_ix : i_ix + nr_patches_size],
+                            b=a_sums[i_ix : i_ix + nr_patches_size],
+                        )
+                    )
+                    i_ix += nr_patches_size
+
+                results.append(np.mean(sub_results))
+
+            results_batch.append(np.mean(results))
+
+        return results_batch
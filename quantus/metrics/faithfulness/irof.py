@@ -19,7 +19,12 @@ from quantus.helpers.enums import (
     ScoreDirection,
 )
 from quantus.helpers.model.model_interface import ModelInterface
-from quantus.helpers.perturbation_utils import make_perturb_func
+from quantus.helpers.perturbation_utils import (
+    generate_cumulative_perturbations,
+    generate_rank_perturbations,
+    make_perturb_func,
+    predict_on_perturbations,
+)
 from quantus.metrics.base import Metric
 
 if sys.version_info >= (3, 8):
@@ -72,6 +77,8 @@ class IROF(Metric[List[float]]):
         perturb_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = True,
         aggregate_func: Optional[Callable] = None,
+        predict_batch_size: int = 64,
+        segmentation_cache_dir: Optional[str] = None,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -103,12 +110,23 @@ class IROF(Metric[List[float]]):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        predict_batch_size: integer
+            The number of perturbed inputs that are passed to the model in a single forward pass, default=64.
+        segmentation_cache_dir: string, optional
+            The directory to store the image segments in, such that they are reused across runs and processes.
+            The segments are always cached in memory, see utils.get_superpixel_segments, default=None.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
             Indicates whether the warnings are printed, default=False.
         display_progressbar: boolean
             Indicates whether a tqdm-progress-bar is printed, default=False.
+        perturbation_check: string
+            Indicates which perturbed inputs are checked for being unchanged by removing a segment, i.e.,
+            "always", "first_n", "sampled" or "off", see PerturbationCheck. Every step is compared to the
+            previous step, default="always".
+        perturbation_check_kwargs: dict
+            Keyword arguments to be passed to PerturbationCheck, e.g., n or sample_rate, default={}.
         kwargs: optional
             Keyword arguments.
         """
@@ -130,11 +148,17 @@ class IROF(Metric[List[float]]):
 
         # Save metric-specific attributes.
         self.segmentation_method = segmentation_method
+        self.predict_batch_size = predict_batch_size
+        self.segmentation_cache_dir = segmentation_cache_dir
         self.nr_channels = None
         self.perturb_func = make_perturb_func(
             perturb_func, perturb_func_kwargs, perturb_baseline=perturb_baseline
         )
 
+        # The baseline replacement of the segments can be computed from a rank map of the segments,
+        # see _get_fill_values.
+        self.rank_perturbation = perturb_func is baseline_replacement_by_indices
+
         # Asserts and warnings.
         if not self.disable_warnings:
             warn.warn_parameterisation(
@@ -284,53 +308,12 @@ class IROF(Metric[List[float]]):
         float
             The evaluation results.
         """
-        # Predict on x.
-        x_input = model.shape_input(x, x.shape, channel_first=True)
-        y_pred = float(model.predict(x_input)[:, y])
-
-        # Segment image.
-        segments = utils.get_superpixel_segments(
-            img=np.moveaxis(x, 0, -1).astype("double"),
-            segmentation_method=self.segmentation_method,
-        )
-        nr_segments = len(np.unique(segments))
-        asserts.assert_nr_segments(nr_segments=nr_segments)
-
-        # Calculate average attribution of each segment.
-        att_segs = np.zeros(nr_segments)
-        for i, s in enumerate(range(nr_segments)):
-            att_segs[i] = np.mean(a[:, segments == s])
-
-        # Sort segments based on the mean attribution (descending order).
-        s_indices = np.argsort(-att_segs)
-
-        preds = []
-        x_prev_perturbed = x
-
-        for i_ix, s_ix in enumerate(s_indices):
-            # Perturb input by indices of attributions.
-            a_ix = np.nonzero((segments == s_ix).flatten())[0]
-
-            x_perturbed = self.perturb_func(
-                arr=x_prev_perturbed,
-                indices=a_ix,
-                indexed_axes=self.a_axes,
-            )
-            warn.warn_perturbation_caused_no_change(
-                x=x_prev_perturbed, x_perturbed=x_perturbed
-            )
-
-            # Predict on perturbed input x.
-            x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
-            y_pred_perturb = float(model.predict(x_input)[:, y])
-
-            # Normalise the scores to be within range [0, 1].
-            preds.append(float(y_pred_perturb / y_pred))
-            x_prev_perturbed = x_perturbed
-
-        # Calculate the area over the curve (AOC) score.
-        aoc = len(preds) - utils.calculate_auc(np.array(preds))
-        return aoc
+        return self.evaluate_batch(
+            model=model,
+            x_batch=np.expand_dims(x, axis=0),
+            y_batch=np.expand_dims(y, axis=0),
+            a_batch=np.expand_dims(a, axis=0),
+        )[0]
 
     def custom_preprocess(
         self,
@@ -397,7 +380,130 @@ class IROF(Metric[List[float]]):
         scores_batch:
             The evaluation results.
         """
-        return [
-            self.evaluate_instance(model=model, x=x, y=y, a=a)
-            for x, y, a in zip(x_batch, y_batch, a_batch)
-        ]
+        # Predict on x.
+        x_input = model.shape_input(
+            x_batch, x_batch.shape, channel_first=True, batched=True
+        )
+        y_pred_batch = model.predict(x_input)
+
+        # Iteratively remove the segments of every input and predict on the perturbed inputs in chunks.
+        x_perturbed_batch = (
+            self._generate_perturbations(x, a) for x, a in zip(x_batch, a_batch)
+        )
+        y_pred_perturb_batch = predict_on_perturbations(
+            model=model,
+            x_perturbed_batch=x_perturbed_batch,
+            predict_batch_size=self.predict_batch_size,
+            stacked=True,
+        )
+
+        scores_batch = []
+        for y_pred, y_pred_perturb, y in zip(
+            y_pred_batch, y_pred_perturb_batch, y_batch
+        ):
+            # Normalise the scores to be within range [0, 1].
+            preds = y_pred_perturb[:, y] / y_pred[y]
+
+            # Calculate the area over the curve (AOC) score.
+            aoc = len(preds) - utils.calculate_auc(preds)
+            scores_batch.append(aoc)
+
+        return scores_batch
+
+    def _generate_perturbations(self, x: np.ndarray, a: np.ndarray):
+        """
+        Remove the segments of the input cumulatively, in the order of their mean attribution (descending),
+        and yield the perturbed inputs in stacks.
+        """
+        segments, s_indices = self._get_segments_order(x, a)
+
+        fill_values = self._get_fill_values(x) if self.rank_perturbation else None
+        if fill_values is None:
+            return (
+                x_perturbed[None]
+                for x_perturbed in generate_cumulative_perturbations(
+                    perturb_func=self.perturb_func,
+                    arr=x,
+                    indices_steps=self._get_indices_steps(segments, s_indices),
+                    indexed_axes=self.a_axes,
+                    perturbation_check=self.perturbation_check,
+                    check_against_previous=True,
+                )
+            )
+
+        # Rank the segments by their order of removal, pixels of unranked segments are never removed.
+        s_ranks = np.full(segments.max() + 1, len(s_indices))
+        s_ranks[s_indices] = np.arange(len(s_indices))
+        rank_map = s_ranks[segments]
+
+        return generate_rank_perturbations(
+            arr=x,
+            rank_map=rank_map.reshape(self._indexed_shape(x)),
+            fill_values=fill_values,
+            nr_steps=len(s_indices),
+            chunk_size=self.predict_batch_size,
+            perturbation_check=self.perturbation_check,
+            check_against_previous=True,
+        )
+
+    def _get_segments_order(self, x: np.ndarray, a: np.ndarray):
+        """Segment the input and order the segments by their mean attribution (descending)."""
+        # Segment image.
+        segments = utils.get_superpixel_segments(
+            img=np.moveaxis(x, 0, -1).astype("double"),
+            segmentation_method=self.segmentation_method,
+            cache_dir=self.segmentation_cache_dir,
+        ).ravel()
+        nr_segments = len(np.unique(segments))
+        asserts.assert_nr_segments(nr_segments=nr_segments)
+
+        # Calculate average attribution of each segment, in a single pass over the pixels.
+        seg_counts = np.bincount(segments)
+        seg_sums = np.bincount(
+            segments,
+            weights=a.reshape(len(a), -1).sum(axis=0),
+            minlength=len(seg_counts),
+        )
+        with np.errstate(invalid="ignore"):
+            att_segs = seg_sums[:nr_segments] / (seg_counts[:nr_segments] * len(a))
+
+        # Sort segments based on the mean attribution (descending order).
+        s_indices = np.argsort(-att_segs)
+
+        return segments, s_indices
+
+    @staticmethod
+    def _get_indices_steps(
+        segments: np.ndarray, s_indices: np.ndarray
+    ) -> List[np.ndarray]:
+        """Get the pixel indices of the segments, in the given order of the segments."""
+        # Group the pixel indices by segment, in ascending order within each segment.
+        seg_indices = np.split(
+            np.argsort(segments, kind="stable"),
+            np.cumsum(np.bincount(segments))[:-1],
+        )
+        return [seg_indices[s_ix] for s_ix in s_indices]
+
+    def _indexed_shape(self, x: np.ndarray) -> List[int]:
+        """The shape of x with all axes that are not indexed by the segments set to 1."""
+        return [size if axis in self.a_axes else 1 for axis, size in enumerate(x.shape)]
+
+    def _get_fill_values(self, x: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Get the values that baseline_replacement_by_indices replaces each pixel with when it is removed,
+        broadcastable to x. Returns None if they depend on more than the input, e.g., for random baselines,
+        or on the input after each step, i.e., for the "mean" baseline, which is computed in the dtype of
+        the perturbed input by baseline_replacement_by_indices.
+        """
+        value = self.perturb_func.keywords["perturb_baseline"]
+        if isinstance(value, str) and value.lower() not in ["black", "white"]:
+            return None
+
+        # Constant baselines, note that the minimum (maximum) of the input is not changed by replacing
+        # pixels with it.
+        baseline_value = utils.get_baseline_value(
+            value=value,
+            arr=x,
+            return_shape=tuple(utils.get_leftover_shape(x, self.a_axes)),
+        )
+        return np.expand_dims(baseline_value, axis=tuple(self.a_axes))
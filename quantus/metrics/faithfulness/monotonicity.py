@@ -19,7 +19,11 @@ from quantus.helpers.enums import (
     ScoreDirection,
 )
 from quantus.helpers.model.model_interface import ModelInterface
-from quantus.helpers.perturbation_utils import make_perturb_func
+from quantus.helpers.perturbation_utils import (
+    generate_cumulative_perturbations,
+    make_perturb_func,
+    predict_on_perturbations,
+)
 from quantus.metrics.base import Metric
 
 if sys.version_info >= (3, 8):
@@ -73,6 +77,7 @@ class Monotonicity(Metric[List[float]]):
         perturb_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        predict_batch_size: int = 64,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -104,6 +109,8 @@ class Monotonicity(Metric[List[float]]):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        predict_batch_size: integer
+            The number of perturbed inputs that are passed to the model in a single forward pass, default=64.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
@@ -131,6 +138,7 @@ class Monotonicity(Metric[List[float]]):
 
         # Save metric-specific attributes.
         self.features_in_step = features_in_step
+        self.predict_batch_size = predict_batch_size
         self.perturb_func = make_perturb_func(
             perturb_func, perturb_func_kwargs, perturb_baseline=perturb_baseline
         )
@@ -281,40 +289,12 @@ class Monotonicity(Metric[List[float]]):
         float
             The evaluation results.
         """
-        # Prepare shapes.
-        a = a.flatten()
-
-        # Get indices of sorted attributions (ascending).
-        a_indices = np.argsort(a)
-
-        n_perturbations = len(range(0, len(a_indices), self.features_in_step))
-        preds = [None for _ in range(n_perturbations)]
-
-        # Copy the input x but fill with baseline values.
-        baseline_value = utils.get_baseline_value(
-            value=self.perturb_func.keywords["perturb_baseline"],  # type: ignore
-            arr=x,
-            return_shape=x.shape,  # TODO. Double-check this over using = (1,).
-        )
-        x_baseline = np.full(x.shape, baseline_value)
-
-        for i_ix, a_ix in enumerate(a_indices[:: self.features_in_step]):
-            # Perturb input by indices of attributions.
-            a_ix = a_indices[
-                (self.features_in_step * i_ix) : (self.features_in_step * (i_ix + 1))
-            ]
-            x_baseline = self.perturb_func(
-                arr=x_baseline,
-                indices=a_ix,
-                indexed_axes=self.a_axes,
-            )
-
-            # Predict on perturbed input x (that was initially filled with a constant 'perturb_baseline' value).
-            x_input = model.shape_input(x_baseline, x.shape, channel_first=True)
-            y_pred_perturb = float(model.predict(x_input)[:, y])
-            preds[i_ix] = y_pred_perturb
-
-        return np.all(np.diff(preds) >= 0)
+        return self.evaluate_batch(
+            model=model,
+            x_batch=np.expand_dims(x, axis=0),
+            y_batch=np.expand_dims(y, axis=0),
+            a_batch=np.expand_dims(a, axis=0),
+        )[0]
 
     def custom_preprocess(
         self,
@@ -371,7 +351,47 @@ class Monotonicity(Metric[List[float]]):
         scores_batch:
             The evaluation results.
         """
+        # Increasingly perturb the inputs, that were initially filled with a constant 'perturb_baseline' value.
+        x_perturbed_batch = (
+            generate_cumulative_perturbations(
+                perturb_func=self.perturb_func,
+                arr=self._get_baseline_input(x),
+                indices_steps=self._get_indices_steps(a),
+                indexed_axes=self.a_axes,
+            )
+            for x, a in zip(x_batch, a_batch)
+        )
+
+        # Predict on the perturbed inputs in chunks.
+        y_pred_perturb_batch = predict_on_perturbations(
+            model=model,
+            x_perturbed_batch=x_perturbed_batch,
+            predict_batch_size=self.predict_batch_size,
+        )
+
+        return [
+            np.all(np.diff(y_pred_perturb[:, y]) >= 0)
+            for y_pred_perturb, y in zip(y_pred_perturb_batch, y_batch)
+        ]
+
+    def _get_baseline_input(self, x: np.ndarray) -> np.ndarray:
+        """Copy the input x but fill with baseline values."""
+        baseline_value = utils.get_baseline_value(
+            value=self.perturb_func.keywords["perturb_baseline"],  # type: ignore
+            arr=x,
+            return_shape=x.shape,  # TODO. Double-check this over using = (1,).
+        )
+        return np.full(x.shape, baseline_value)
+
+    def _get_indices_steps(self, a: np.ndarray) -> List[np.ndarray]:
+        """Split the indices of the sorted attributions (ascending) into steps of features_in_step."""
+        # Prepare shapes.
+        a = a.flatten()
+
+        # Get indices of sorted attributions (ascending).
+        a_indices = np.argsort(a)
+
         return [
-            self.evaluate_instance(model=model, x=x, y=y, a=a)
-            for x, y, a in zip(x_batch, y_batch, a_batch)
+            a_indices[i_ix : i_ix + self.features_in_step]
+            for i_ix in range(0, len(a_indices), self.features_in_step)
         ]
@@ -120,6 +120,12 @@ class MonotonicityCorrelation(Metric[List[float]]):
             Indicates whether the warnings are printed, default=False.
         display_progressbar: boolean
             Indicates whether a tqdm-progress-bar is printed, default=False.
+        perturbation_check: string
+            Indicates which perturbed inputs are checked for being unchanged by the perturbation of a feature
+            group: "always", "first_n", "sampled" or "off", see PerturbationCheck. Checking is typically the
+            dominant cost with many samples and cheap models, default="always".
+        perturbation_check_kwargs: dict
+            Keyword arguments to be passed to PerturbationCheck, e.g., n or sample_rate, default={}.
         kwargs: optional
             Keyword arguments.
         """
@@ -333,7 +339,7 @@ class MonotonicityCorrelation(Metric[List[float]]):
                     indices=a_ix,
                     indexed_axes=self.a_axes,
                 )
-                warn.warn_perturbation_caused_no_change(x=x, x_perturbed=x_perturbed)
+                self.perturbation_check(x=x, x_perturbed=x_perturbed)
 
                 # Predict on perturbed input x.
                 x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
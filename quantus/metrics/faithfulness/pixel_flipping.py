@@ -19,7 +19,11 @@ from quantus.helpers.enums import (
     ScoreDirection,
 )
 from quantus.helpers.model.model_interface import ModelInterface
-from quantus.helpers.perturbation_utils import make_perturb_func
+from quantus.helpers.perturbation_utils import (
+    generate_cumulative_perturbations,
+    make_perturb_func,
+    predict_on_perturbations,
+)
 from quantus.metrics.base import Metric
 
 if sys.version_info >= (3, 8):
@@ -69,6 +73,7 @@ class PixelFlipping(Metric[Union[float, List[float]]]):
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
         return_auc_per_sample: bool = False,
+        predict_batch_size: int = 64,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -102,12 +107,20 @@ class PixelFlipping(Metric[Union[float, List[float]]]):
             Callable that aggregates the scores given an evaluation call.
         return_auc_per_sample: boolean
             Indicates if an AUC score should be computed over the curve and returned.
+        predict_batch_size: integer
+            The number of perturbed inputs that are passed to the model in a single forward pass, default=64.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
             Indicates whether the warnings are printed, default=False.
         display_progressbar: boolean
             Indicates whether a tqdm-progress-bar is printed, default=False.
+        perturbation_check: string
+            Indicates which of the perturbed inputs are checked for being unchanged by flipping the pixels of a
+            step: "always", "first_n", "sampled" or "off", see PerturbationCheck, default="always".
+        perturbation_check_kwargs: dict
+            Keyword arguments to be passed to PerturbationCheck, e.g., {"n": 5} for policy "first_n",
+            default={}.
         kwargs: optional
             Keyword arguments.
         """
@@ -133,6 +146,7 @@ class PixelFlipping(Metric[Union[float, List[float]]]):
         # Save metric-specific attributes.
         self.features_in_step = features_in_step
         self.return_auc_per_sample = return_auc_per_sample
+        self.predict_batch_size = predict_batch_size
         self.perturb_func = make_perturb_func(
             perturb_func, perturb_func_kwargs, perturb_baseline=perturb_baseline
         )
@@ -281,39 +295,12 @@ class PixelFlipping(Metric[Union[float, List[float]]]):
         list
             The evaluation results.
         """
-
-        # Reshape attributions.
-        a = a.flatten()
-
-        # Get indices of sorted attributions (descending).
-        a_indices = np.argsort(-a)
-
-        # Prepare lists.
-        n_perturbations = len(range(0, len(a_indices), self.features_in_step))
-        preds = [None for _ in range(n_perturbations)]
-        x_perturbed = x.copy()
-
-        for i_ix, a_ix in enumerate(a_indices[:: self.features_in_step]):
-            # Perturb input by indices of attributions.
-            a_ix = a_indices[
-                (self.features_in_step * i_ix) : (self.features_in_step * (i_ix + 1))
-            ]
-            x_perturbed = self.perturb_func(
-                arr=x_perturbed,
-                indices=a_ix,
-                indexed_axes=self.a_axes,
-            )
-            warn.warn_perturbation_caused_no_change(x=x, x_perturbed=x_perturbed)
-
-            # Predict on perturbed input x.
-            x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
-            y_pred_perturb = float(model.predict(x_input)[:, y])
-            preds[i_ix] = y_pred_perturb
-
-        if self.return_auc_per_sample:
-            return float(utils.calculate_auc(preds))
-
-        return preds
+        return self.evaluate_batch(
+            model=model,
+            x_batch=np.expand_dims(x, axis=0),
+            y_batch=np.expand_dims(y, axis=0),
+            a_batch=np.expand_dims(a, axis=0),
+        )[0]
 
     def custom_preprocess(
         self,
@@ -377,7 +364,42 @@ class PixelFlipping(Metric[Union[float, List[float]]]):
         scores_batch:
             The evaluation results.
         """
+        x_perturbed_batch = (
+            generate_cumulative_perturbations(
+                perturb_func=self.perturb_func,
+                arr=x,
+                indices_steps=self._get_indices_steps(a),
+                indexed_axes=self.a_axes,
+                perturbation_check=self.perturbation_check,
+            )
+            for x, a in zip(x_batch, a_batch)
+        )
+
+        # Predict on the perturbed inputs of all instances and steps in chunks.
+        y_pred_batch = predict_on_perturbations(
+            model=model,
+            x_perturbed_batch=x_perturbed_batch,
+            predict_batch_size=self.predict_batch_size,
+        )
+        preds_batch = [
+            y_pred_perturb[:, y].tolist()
+            for y_pred_perturb, y in zip(y_pred_batch, y_batch)
+        ]
+
+        if self.return_auc_per_sample:
+            return [float(utils.calculate_auc(preds)) for preds in preds_batch]
+
+        return preds_batch
+
+    def _get_indices_steps(self, a: np.ndarray) -> List[np.ndarray]:
+        """Split the indices of the sorted attributions (descending) into steps of features_in_step."""
+        # Reshape attributions.
+        a = a.flatten()
+
+        # Get indices of sorted attributions (descending).
+        a_indices = np.argsort(-a)
+
         return [
-            self.evaluate_instance(model=model, x=x, y=y, a=a)
-            for x, y, a in zip(x_batch, y_batch, a_batch)
+            a_indices[i_ix : i_ix + self.features_in_step]
+            for i_ix in range(0, len(a_indices), self.features_in_step)
         ]
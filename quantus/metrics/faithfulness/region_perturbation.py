@@ -6,7 +6,6 @@
 # You should have received a copy of the GNU Lesser General Public License along with Quantus. If not, see <https://www.gnu.org/licenses/>.
 # Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
 
-import itertools
 import sys
 from typing import Any, Callable, Dict, List, Optional
 
@@ -21,7 +20,12 @@ from quantus.helpers.enums import (
     ScoreDirection,
 )
 from quantus.helpers.model.model_interface import ModelInterface
-from quantus.helpers.perturbation_utils import make_perturb_func
+from quantus.helpers.perturbation_utils import (
+    generate_cumulative_perturbations,
+    get_ordered_patches,
+    make_perturb_func,
+    predict_on_perturbations,
+)
 from quantus.metrics.base import Metric
 
 if sys.version_info >= (3, 8):
@@ -78,6 +82,7 @@ class RegionPerturbation(Metric[List[float]]):
         perturb_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        predict_batch_size: int = 64,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -114,12 +119,19 @@ class RegionPerturbation(Metric[List[float]]):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        predict_batch_size: integer
+            The number of perturbed inputs that are passed to the model in a single forward pass, default=64.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
             Indicates whether the warnings are printed, default=False.
         display_progressbar: boolean
             Indicates whether a tqdm-progress-bar is printed, default=False.
+        perturbation_check: string
+            Indicates which perturbed inputs are checked for being unchanged by removing a region, one of
+            "always", "first_n", "sampled" or "off", see PerturbationCheck, default="always".
+        perturbation_check_kwargs: dict
+            Keyword arguments to be passed to PerturbationCheck, e.g., sample_rate and seed, default={}.
         kwargs: optional
             Keyword arguments.
         """
@@ -146,6 +158,7 @@ class RegionPerturbation(Metric[List[float]]):
         self.patch_size = patch_size
         self.order = order.lower()
         self.regions_evaluation = regions_evaluation
+        self.predict_batch_size = predict_batch_size
         self.perturb_func = make_perturb_func(
             perturb_func, perturb_func_kwargs, perturb_baseline=perturb_baseline
         )
@@ -305,110 +318,12 @@ class RegionPerturbation(Metric[List[float]]):
             The evaluation results.
         """
 
-        # Predict on input.
-        x_input = model.shape_input(x, x.shape, channel_first=True)
-        y_pred = float(model.predict(x_input)[:, y])
-
-        patches = []
-        x_perturbed = x.copy()
-
-        # Pad input and attributions. This is needed to allow for any patch_size.
-        pad_width = self.patch_size - 1
-        x_pad = utils._pad_array(x, pad_width, mode="constant", padded_axes=self.a_axes)
-        a_pad = utils._pad_array(a, pad_width, mode="constant", padded_axes=self.a_axes)
-
-        # Create patches across whole input shape and aggregate attributions.
-        att_sums = []
-        axis_iterators = [
-            range(pad_width, x_pad.shape[axis] - pad_width) for axis in self.a_axes
-        ]
-        for top_left_coords in itertools.product(*axis_iterators):
-            # Create slice for patch.
-            patch_slice = utils.create_patch_slice(
-                patch_size=self.patch_size,
-                coords=top_left_coords,
-            )
-
-            # Sum attributions for patch.
-            att_sums.append(
-                a_pad[utils.expand_indices(a_pad, patch_slice, self.a_axes)].sum()
-            )
-            patches.append(patch_slice)
-
-        if self.order == "random":
-            # Order attributions randomly.
-            order = np.arange(len(patches))
-            np.random.shuffle(order)
-
-        elif self.order == "morf":
-            # Order attributions according to the most relevant first.
-            order = np.argsort(att_sums)[::-1]
-
-        elif self.order == "lerf":
-            # Order attributions according to the least relevant first.
-            order = np.argsort(att_sums)
-
-        else:
-            raise ValueError(
-                "Chosen order must be in ['random', 'morf', 'lerf'] but is: {self.order}."
-            )
-
-        # Create ordered list of patches.
-        ordered_patches = [patches[p] for p in order]
-
-        # Remove overlapping patches
-        blocked_mask = np.zeros(x_pad.shape, dtype=bool)
-        ordered_patches_no_overlap = []
-        for patch_slice in ordered_patches:
-            patch_mask = np.zeros(x_pad.shape, dtype=bool)
-            patch_mask[
-                utils.expand_indices(patch_mask, patch_slice, self.a_axes)
-            ] = True
-            # patch_mask_exp = utils.expand_indices(patch_mask, patch_slice, self.a_axes)
-            # patch_mask[patch_mask_exp] = True
-            intersected = blocked_mask & patch_mask
-
-            if not intersected.any():
-                ordered_patches_no_overlap.append(patch_slice)
-                blocked_mask = blocked_mask | patch_mask
-
-            if len(ordered_patches_no_overlap) >= self.regions_evaluation:
-                break
-
-        # Warn
-        warn.warn_iterations_exceed_patch_number(
-            self.regions_evaluation, len(ordered_patches_no_overlap)
-        )
-
-        # Increasingly perturb the input and store the decrease in function value.
-        results = [None for _ in range(len(ordered_patches_no_overlap))]
-        for patch_id, patch_slice in enumerate(ordered_patches_no_overlap):
-            # Pad x_perturbed. The mode should probably depend on the used perturb_func?
-            x_perturbed_pad = utils._pad_array(
-                x_perturbed, pad_width, mode="edge", padded_axes=self.a_axes
-            )
-
-            # Perturb.
-            x_perturbed_pad = self.perturb_func(
-                arr=x_perturbed_pad,
-                indices=patch_slice,
-                indexed_axes=self.a_axes,
-            )
-
-            # Remove padding.
-            x_perturbed = utils._unpad_array(
-                x_perturbed_pad, pad_width, padded_axes=self.a_axes
-            )
-
-            warn.warn_perturbation_caused_no_change(x=x, x_perturbed=x_perturbed)
-
-            # Predict on perturbed input x and store the difference from predicting on unperturbed input.
-            x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
-            y_pred_perturb = float(model.predict(x_input)[:, y])
-
-            results[patch_id] = y_pred - y_pred_perturb
-
-        return results
+        return self.evaluate_batch(
+            model=model,
+            x_batch=np.expand_dims(x, axis=0),
+            y_batch=np.expand_dims(y, axis=0),
+            a_batch=np.expand_dims(a, axis=0),
+        )[0]
 
     @property
     def get_auc_score(self):
@@ -447,7 +362,50 @@ class RegionPerturbation(Metric[List[float]]):
         scores_batch:
             The evaluation results.
         """
+        # Predict on input.
+        x_input = model.shape_input(
+            x_batch, x_batch.shape, channel_first=True, batched=True
+        )
+        y_pred_batch = model.predict(x_input)
+
+        # Create ordered list of non-overlapping patches.
+        patches_batch = []
+        for a in a_batch:
+            ordered_patches_no_overlap = get_ordered_patches(
+                a=a,
+                patch_size=self.patch_size,
+                indexed_axes=self.a_axes,
+                order=self.order,
+                max_patches=self.regions_evaluation,
+            )
+
+            # Warn
+            warn.warn_iterations_exceed_patch_number(
+                self.regions_evaluation, len(ordered_patches_no_overlap)
+            )
+            patches_batch.append(ordered_patches_no_overlap)
+
+        # Increasingly perturb the inputs, predict on them in chunks and store the decrease in function value.
+        x_perturbed_batch = (
+            generate_cumulative_perturbations(
+                perturb_func=self.perturb_func,
+                arr=x,
+                indices_steps=patches,
+                indexed_axes=self.a_axes,
+                pad_width=self.patch_size - 1,
+                perturbation_check=self.perturbation_check,
+            )
+            for x, patches in zip(x_batch, patches_batch)
+        )
+        y_pred_perturb_batch = predict_on_perturbations(
+            model=model,
+            x_perturbed_batch=x_perturbed_batch,
+            predict_batch_size=self.predict_batch_size,
+        )
+
         return [
-            self.evaluate_instance(model=model, x=x, y=y, a=a)
-            for x, y, a in zip(x_batch, y_batch, a_batch)
+            (y_pred[y] - y_pred_perturb[:, y]).tolist()
+            for y_pred, y_pred_perturb, y in zip(
+                y_pred_batch, y_pred_perturb_batch, y_batch
+            )
         ]
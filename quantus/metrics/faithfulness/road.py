@@ -6,13 +6,17 @@
 # You should have received a copy of the GNU Lesser General Public License along with Quantus. If not, see <https://www.gnu.org/licenses/>.
 # Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
 
+import collections
+import itertools
 import sys
-from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Tuple
 
 import numpy as np
 
 from quantus.functions.perturb_func import noisy_linear_imputation
-from quantus.helpers import warn
+from quantus.helpers import asserts, warn
 from quantus.helpers.enums import (
     DataType,
     EvaluationCategory,
@@ -20,7 +24,10 @@ from quantus.helpers.enums import (
     ScoreDirection,
 )
 from quantus.helpers.model.model_interface import ModelInterface
-from quantus.helpers.perturbation_utils import make_perturb_func
+from quantus.helpers.perturbation_utils import (
+    make_perturb_func,
+    predict_on_perturbations,
+)
 from quantus.metrics.base import Metric
 
 if sys.version_info >= (3, 8):
@@ -73,6 +80,9 @@ class ROAD(Metric[List[float]]):
         perturb_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        predict_batch_size: int = 64,
+        nr_workers: int = 1,
+        seed: Optional[int] = None,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -101,12 +111,29 @@ class ROAD(Metric[List[float]]):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        predict_batch_size: integer
+            The number of perturbed inputs that are passed to the model in a single forward pass, default=64.
+        nr_workers: integer
+            The number of worker processes that compute the imputations. If 1, the imputations are computed
+            in the main process, otherwise perturb_func must be picklable. The workers are started once per
+            call, default=1.
+        seed: integer, optional
+            The seed of the random number generators of the imputations. Every imputation gets its own
+            generator, so that the results are deterministic regardless of nr_workers. If None and nr_workers=1,
+            the global numpy random state is used, default=None. If seed is set or nr_workers > 1, the
+            generator is passed to perturb_func as keyword argument 'rng', which perturb_func must accept
+            and draw its randomness from.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
             Indicates whether the warnings are printed, default=False.
         display_progressbar: boolean
             Indicates whether a tqdm-progress-bar is printed, default=False.
+        perturbation_check: string
+            Indicates which of the imputed inputs are checked for being unchanged: "always", "first_n",
+            "sampled" or "off", see PerturbationCheck, default="always".
+        perturbation_check_kwargs: dict
+            Keyword arguments to be passed to PerturbationCheck, e.g., n or sample_rate, default={}.
         kwargs: optional
             Keyword arguments.
         """
@@ -132,11 +159,21 @@ class ROAD(Metric[List[float]]):
 
         self.percentages = percentages
         self.a_size = None
+        self.predict_batch_size = predict_batch_size
+        self.nr_workers = nr_workers
+        self.seed = seed
+        self.seed_sequence = None
+        self.imputation_executor: Optional[ProcessPoolExecutor] = None
+        self.imputation_buffers: List[
+            Tuple[shared_memory.SharedMemory, Tuple[int, ...], np.dtype]
+        ] = []
         self.perturb_func = make_perturb_func(
             perturb_func, perturb_func_kwargs, noise=noise
         )
 
         # Asserts and warnings.
+        if self.seed is not None or self.nr_workers > 1:
+            asserts.assert_perturb_func_accepts_rng(self.perturb_func)
         if not self.disable_warnings:
             warn.warn_parameterisation(
                 metric_name=self.__class__.__name__,
@@ -239,22 +276,25 @@ class ROAD(Metric[List[float]]):
             >> metric = Metric(abs=True, normalise=False)
             >> scores = metric(model=model, x_batch=x_batch, y_batch=y_batch, a_batch=a_batch_saliency)
         """
-        return super().__call__(
-            model=model,
-            x_batch=x_batch,
-            y_batch=y_batch,
-            a_batch=a_batch,
-            s_batch=s_batch,
-            custom_batch=None,
-            channel_first=channel_first,
-            explain_func=explain_func,
-            explain_func_kwargs=explain_func_kwargs,
-            softmax=softmax,
-            device=device,
-            model_predict_kwargs=model_predict_kwargs,
-            batch_size=batch_size,
-            **kwargs,
-        )
+        try:
+            return super().__call__(
+                model=model,
+                x_batch=x_batch,
+                y_batch=y_batch,
+                a_batch=a_batch,
+                s_batch=s_batch,
+                custom_batch=None,
+                channel_first=channel_first,
+                explain_func=explain_func,
+                explain_func_kwargs=explain_func_kwargs,
+                softmax=softmax,
+                device=device,
+                model_predict_kwargs=model_predict_kwargs,
+                batch_size=batch_size,
+                **kwargs,
+            )
+        finally:
+            self._stop_imputation_workers()
 
     def evaluate_instance(
         self,
@@ -282,30 +322,133 @@ class ROAD(Metric[List[float]]):
         list:
             The evaluation results.
         """
-        # Order indices.
-        ordered_indices = np.argsort(a, axis=None)[::-1]
-
-        results_instance = np.array([None for _ in self.percentages])
+        return self.evaluate_batch(
+            model=model,
+            x_batch=np.expand_dims(x, axis=0),
+            y_batch=np.expand_dims(y, axis=0),
+            a_batch=np.expand_dims(a, axis=0),
+        )[0]
 
+    def _generate_perturbed_inputs(
+        self,
+        x: np.ndarray,
+        ordered_indices: np.ndarray,
+        seed_sequences: Optional[List[np.random.SeedSequence]] = None,
+    ) -> Generator[np.ndarray, None, None]:
+        """Impute the top-k most important features of x for every percentage."""
         for p_ix, p in enumerate(self.percentages):
             top_k_indices = ordered_indices[: int(self.a_size * p / 100)]
 
+            # Use the random number generator of the imputation, if seeded.
+            perturb_kwargs = {}
+            if seed_sequences is not None:
+                perturb_kwargs["rng"] = np.random.default_rng(seed_sequences[p_ix])
+
             x_perturbed = self.perturb_func(  # type: ignore
                 arr=x,
                 indices=top_k_indices,
+                **perturb_kwargs,
             )
 
-            warn.warn_perturbation_caused_no_change(x=x, x_perturbed=x_perturbed)
+            self.perturbation_check(x=x, x_perturbed=x_perturbed)
 
-            # Predict on perturbed input x and store the difference from predicting on unperturbed input.
-            x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
-            class_pred_perturb = np.argmax(model.predict(x_input))
+            yield x_perturbed
 
-            # Write a boolean into the percentage results.
-            results_instance[p_ix] = int(y == class_pred_perturb)
+    def _generate_perturbed_inputs_in_workers(
+        self,
+        x_batch: np.ndarray,
+        ordered_indices_batch: np.ndarray,
+        seed_sequences_batch: List[List[np.random.SeedSequence]],
+    ) -> Generator[np.ndarray, None, None]:
+        """
+        Impute the top-k most important features of all inputs for every percentage in worker processes.
 
-        # Return list of booleans for each percentage.
-        return results_instance
+        The inputs and ordered indices are copied into the buffers shared with the workers. The imputed
+        inputs are yielded in order, while at most 2 * nr_workers imputations are pending.
+        """
+        executor = self._start_imputation_workers(x_batch, ordered_indices_batch)
+        for (shm, shape, dtype), arr in zip(
+            self.imputation_buffers, (x_batch, ordered_indices_batch)
+        ):
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf)[: len(arr)] = arr
+
+        pending = collections.deque()
+        for x_ix, seed_sequences in enumerate(seed_sequences_batch):
+            for p, seed_sequence in zip(self.percentages, seed_sequences):
+                pending.append(
+                    (
+                        x_ix,
+                        executor.submit(
+                            _impute_in_worker,
+                            x_ix,
+                            int(self.a_size * p / 100),
+                            seed_sequence,
+                        ),
+                    )
+                )
+
+                while len(pending) > 2 * self.nr_workers:
+                    yield self._get_imputation_result(x_batch, *pending.popleft())
+
+        while pending:
+            yield self._get_imputation_result(x_batch, *pending.popleft())
+
+    def _start_imputation_workers(
+        self, x_batch: np.ndarray, ordered_indices_batch: np.ndarray
+    ) -> ProcessPoolExecutor:
+        """
+        Start the imputation worker processes and allocate the buffers shared with them, once per call.
+
+        The buffers are sized by the first batch, which is the largest one. They are only reallocated
+        (and the workers restarted) if a later batch does not fit.
+        """
+        arrs = (x_batch, ordered_indices_batch)
+        if self.imputation_executor is not None and all(
+            shape[1:] == arr.shape[1:] and shape[0] >= len(arr) and dtype == arr.dtype
+            for (_, shape, dtype), arr in zip(self.imputation_buffers, arrs)
+        ):
+            return self.imputation_executor
+
+        self._stop_imputation_workers()
+        for arr in arrs:
+            shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+            self.imputation_buffers.append((shm, arr.shape, arr.dtype))
+
+        self.imputation_executor = ProcessPoolExecutor(
+            max_workers=self.nr_workers,
+            initializer=_init_imputation_worker,
+            initargs=(
+                self.perturb_func,
+                *(
+                    (shm.name, shape, dtype)
+                    for shm, shape, dtype in self.imputation_buffers
+                ),
+            ),
+        )
+        return self.imputation_executor
+
+    def _stop_imputation_workers(self) -> None:
+        """Shut the imputation worker processes down and release the buffers shared with them."""
+        if self.imputation_executor is not None:
+            self.imputation_executor.shutdown()
+            self.imputation_executor = None
+
+        for shm, _, _ in self.imputation_buffers:
+            shm.close()
+            shm.unlink()
+        self.imputation_buffers = []
+
+    def _get_imputation_result(
+        self, x_batch: np.ndarray, x_ix: int, future
+    ) -> np.ndarray:
+        """Wait for the imputation of the input at x_ix to finish and return it."""
+        x_perturbed = future.result()
+        self.perturbation_check(x=x_batch[x_ix], x_perturbed=x_perturbed)
+        return x_perturbed
+
+    def custom_preprocess(self, **kwargs) -> None:
+        """Reset the seed sequence of the imputations, so that every call is seeded identically."""
+        self.seed_sequence = None
 
     def custom_batch_preprocess(self, a_batch: np.ndarray, **kwargs) -> None:
         """ROAD requires `a_size` property to be set to `image_height` * `image_width` of an explanation."""
@@ -365,7 +508,89 @@ class ROAD(Metric[List[float]]):
         scores_batch:
             The evaluation results.
         """
+        # Order indices.
+        ordered_indices_batch = np.argsort(a_batch.reshape(len(a_batch), -1), axis=1)[
+            :, ::-1
+        ]
+
+        # Spawn a seed sequence for every imputation, in the order of the inputs and percentages.
+        seed_sequences_batch: List[Any] = [None] * len(x_batch)
+        if self.seed is not None or self.nr_workers > 1:
+            if self.seed_sequence is None:
+                self.seed_sequence = np.random.SeedSequence(self.seed)
+            seed_sequences_batch = [
+                seed_sequence.spawn(len(self.percentages))
+                for seed_sequence in self.seed_sequence.spawn(len(x_batch))
+            ]
+
+        x_perturbed_batch: Iterable[Iterable[np.ndarray]]
+        if self.nr_workers > 1:
+            # Every input takes its imputations from the stream of imputations computed in the workers.
+            x_perturbed_stream = self._generate_perturbed_inputs_in_workers(
+                x_batch, ordered_indices_batch, seed_sequences_batch
+            )
+            x_perturbed_batch = (
+                itertools.islice(x_perturbed_stream, len(self.percentages))
+                for _ in range(len(x_batch))
+            )
+        else:
+            x_perturbed_batch = (
+                self._generate_perturbed_inputs(x, ordered_indices, seed_sequences)
+                for x, ordered_indices, seed_sequences in zip(
+                    x_batch, ordered_indices_batch, seed_sequences_batch
+                )
+            )
+
+        # Predict on the perturbed inputs of all percentages and instances in chunks.
+        y_pred_perturb_batch = predict_on_perturbations(
+            model=model,
+            x_perturbed_batch=x_perturbed_batch,
+            predict_batch_size=self.predict_batch_size,
+        )
+
+        # Return list of booleans for each percentage.
         return [
-            self.evaluate_instance(model=model, x=x, y=y, a=a)
-            for x, y, a in zip(x_batch, y_batch, a_batch)
+            (y == np.argmax(y_pred_perturb, axis=-1)).astype(int)
+            for y, y_pred_perturb in zip(y_batch, y_pred_perturb_batch)
         ]
+
+
+# The buffers shared with an imputation worker process, set by _init_imputation_worker.
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_imputation_worker(
+    perturb_func: Callable,
+    x_buffer: Tuple[str, Tuple[int, ...], np.dtype],
+    indices_buffer: Tuple[str, Tuple[int, ...], np.dtype],
+) -> None:
+    """Attach an imputation worker process to the shared input and index buffers."""
+    _worker_state["perturb_func"] = perturb_func
+    for key, (name, shape, dtype) in (
+        ("x_batch", x_buffer),
+        ("ordered_indices_batch", indices_buffer),
+    ):
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_state[f"{key}_shm"] = shm
+        _worker_state[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    # Close the handles when the worker exits, the buffers are unlinked by the main process.
+    util.Finalize(None, _close_imputation_worker, exitpriority=0)
+
+
+def _close_imputation_worker() -> None:
+    """Detach an imputation worker process from the shared buffers."""
+    for key in ("x_batch", "ordered_indices_batch"):
+        del _worker_state[key]
+        _worker_state.pop(f"{key}_shm").close()
+
+
+def _impute_in_worker(
+    x_ix: int, nr_indices: int, seed_sequence: np.random.SeedSequence
+) -> np.ndarray:
+    """Impute the nr_indices most important features of the shared input at x_ix."""
+    return _worker_state["perturb_func"](
+        arr=_worker_state["x_batch"][x_ix],
+        indices=_worker_state["ordered_indices_batch"][x_ix, :nr_indices],
+        rng=np.random.default_rng(seed_sequence),
+    )
@@ -6,7 +6,6 @@
 # You should have received a copy of the GNU Lesser General Public License along with Quantus. If not, see <https://www.gnu.org/licenses/>.
 # Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
 
-import itertools
 import sys
 from typing import Any, Callable, Dict, List, Optional
 
@@ -21,7 +20,12 @@ from quantus.helpers.enums import (
     ScoreDirection,
 )
 from quantus.helpers.model.model_interface import ModelInterface
-from quantus.helpers.perturbation_utils import make_perturb_func
+from quantus.helpers.perturbation_utils import (
+    generate_cumulative_perturbations,
+    get_ordered_patches,
+    make_perturb_func,
+    predict_on_perturbations,
+)
 from quantus.metrics.base import Metric
 
 if sys.version_info >= (3, 8):
@@ -76,6 +80,7 @@ class Selectivity(Metric[List[float]]):
         perturb_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        predict_batch_size: int = 64,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -107,12 +112,19 @@ class Selectivity(Metric[List[float]]):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        predict_batch_size: integer
+            The number of perturbed inputs that are passed to the model in a single forward pass, default=64.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
             Indicates whether the warnings are printed, default=False.
         display_progressbar: boolean
             Indicates whether a tqdm-progress-bar is printed, default=False.
+        perturbation_check: string
+            Selects the perturbed inputs that are checked for being unchanged by removing a patch: "always",
+            "first_n", "sampled" or "off", see PerturbationCheck, default="always".
+        perturbation_check_kwargs: dict
+            Keyword arguments to be passed to PerturbationCheck, such as n or sample_rate, default={}.
         kwargs: optional
             Keyword arguments.
         """
@@ -138,6 +150,7 @@ class Selectivity(Metric[List[float]]):
 
         # Save metric-specific attributes.
         self.patch_size = patch_size
+        self.predict_batch_size = predict_batch_size
         self.perturb_func = make_perturb_func(
             perturb_func, perturb_func_kwargs, perturb_baseline=perturb_baseline
         )
@@ -293,80 +306,12 @@ class Selectivity(Metric[List[float]]):
             The evaluation results.
         """
 
-        # Predict on input.
-        x_input = model.shape_input(x, x.shape, channel_first=True)
-        y_pred = float(model.predict(x_input)[:, y])
-
-        patches = []
-        x_perturbed = x.copy()
-
-        # Pad input and attributions. This is needed to allow for any patch_size.
-        pad_width = self.patch_size - 1
-        x_pad = utils._pad_array(x, pad_width, mode="constant", padded_axes=self.a_axes)
-        a_pad = utils._pad_array(a, pad_width, mode="constant", padded_axes=self.a_axes)
-
-        # Get patch indices of sorted attributions (descending).
-        att_sums = []
-        axis_iterators = [
-            range(pad_width, x_pad.shape[axis] - pad_width) for axis in self.a_axes
-        ]
-        for top_left_coords in itertools.product(*axis_iterators):
-            # Create slice for patch.
-            patch_slice = utils.create_patch_slice(
-                patch_size=self.patch_size,
-                coords=top_left_coords,
-            )
-
-            # Sum attributions for patch.
-            att_sums.append(
-                a_pad[utils.expand_indices(a_pad, patch_slice, self.a_axes)].sum()
-            )
-            patches.append(patch_slice)
-
-            # Create ordered list of patches.
-        ordered_patches = [patches[p] for p in np.argsort(att_sums)[::-1]]
-
-        # Remove overlapping patches.
-        blocked_mask = np.zeros(x_pad.shape, dtype=bool)
-        ordered_patches_no_overlap = []
-        for patch_slice in ordered_patches:
-            patch_mask = np.zeros(x_pad.shape, dtype=bool)
-            patch_mask_exp = utils.expand_indices(patch_mask, patch_slice, self.a_axes)
-            patch_mask[patch_mask_exp] = True
-            intersected = blocked_mask & patch_mask
-
-            if not intersected.any():
-                ordered_patches_no_overlap.append(patch_slice)
-                blocked_mask = blocked_mask | patch_mask
-
-        # Increasingly perturb the input and store the decrease in function value.
-        results = np.array([None for _ in range(len(ordered_patches_no_overlap))])
-        for patch_id, patch_slice in enumerate(ordered_patches_no_overlap):
-            # Pad x_perturbed. The mode should depend on the used perturb_func.
-            x_perturbed_pad = utils._pad_array(
-                x_perturbed, pad_width, mode="edge", padded_axes=self.a_axes
-            )
-
-            # Perturb the input.
-            x_perturbed_pad = self.perturb_func(
-                arr=x_perturbed_pad,
-                indices=patch_slice,
-                indexed_axes=self.a_axes,
-            )
-
-            # Remove padding.
-            x_perturbed = utils._unpad_array(
-                x_perturbed_pad, pad_width, padded_axes=self.a_axes
-            )
-            warn.warn_perturbation_caused_no_change(x=x, x_perturbed=x_perturbed)
-
-            # Predict on perturbed input x and store the difference from predicting on unperturbed input.
-            x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
-            y_pred_perturb = float(model.predict(x_input)[:, y])
-
-            results[patch_id] = y_pred_perturb
-
-        return results
+        return self.evaluate_batch(
+            model=model,
+            x_batch=np.expand_dims(x, axis=0),
+            y_batch=np.expand_dims(y, axis=0),
+            a_batch=np.expand_dims(a, axis=0),
+        )[0]
 
     @property
     def get_auc_score(self):
@@ -408,7 +353,31 @@ class Selectivity(Metric[List[float]]):
         scores_batch:
             The evaluation results.
         """
+        # Increasingly perturb the inputs by the ordered, non-overlapping patches.
+        x_perturbed_batch = (
+            generate_cumulative_perturbations(
+                perturb_func=self.perturb_func,
+                arr=x,
+                indices_steps=get_ordered_patches(
+                    a=a,
+                    patch_size=self.patch_size,
+                    indexed_axes=self.a_axes,
+                ),
+                indexed_axes=self.a_axes,
+                pad_width=self.patch_size - 1,
+                perturbation_check=self.perturbation_check,
+            )
+            for x, a in zip(x_batch, a_batch)
+        )
+
+        # Predict on the perturbed inputs in chunks.
+        y_pred_perturb_batch = predict_on_perturbations(
+            model=model,
+            x_perturbed_batch=x_perturbed_batch,
+            predict_batch_size=self.predict_batch_size,
+        )
+
         return [
-            self.evaluate_instance(model=model, x=x, y=y, a=a)
-            for x, y, a in zip(x_batch, y_batch, a_batch)
+            y_pred_perturb[:, y].astype(np.float64)
+            for y_pred_perturb, y in zip(y_pred_perturb_batch, y_batch)
         ]
@@ -118,6 +118,11 @@ class SensitivityN(Metric[List[float]]):
             Indicates whether the warnings are printed, default=False.
         display_progressbar: boolean
             Indicates whether a tqdm-progress-bar is printed, default=False.
+        perturbation_check: string
+            Indicates which perturbed inputs are checked for being unchanged after replacing n features:
+            "always", "first_n", "sampled" or "off", see PerturbationCheck, default="always".
+        perturbation_check_kwargs: dict
+            Keyword arguments to be passed to PerturbationCheck, e.g., n or sample_rate, default={}.
         kwargs: optional
             Keyword arguments.
         """
@@ -325,7 +330,7 @@ class SensitivityN(Metric[List[float]]):
                 indices=a_ix,
                 indexed_axes=self.a_axes,
             )
-            warn.warn_perturbation_caused_no_change(x=x, x_perturbed=x_perturbed)
+            self.perturbation_check(x=x, x_perturbed=x_perturbed)
 
             # Sum attributions.
             att_sums.append(float(a[a_ix].sum()))
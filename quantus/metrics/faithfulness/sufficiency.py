@@ -6,8 +6,18 @@
 # You should have received a copy of the GNU Lesser General Public License along with Quantus. If not, see <https://www.gnu.org/licenses/>.
 # Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
 
+import itertools
 import sys
-from typing import Any, Callable, Dict, List, Optional, no_type_check
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    no_type_check,
+)
 
 import numpy as np
 from scipy.spatial.distance import cdist
@@ -60,6 +70,11 @@ class Sufficiency(Metric[List[float]]):
     score_direction = ScoreDirection.HIGHER
     evaluation_category = EvaluationCategory.FAITHFULNESS
 
+    # The number of distances that are held in memory at once when dataset_level is set.
+    _max_distances_per_chunk = 2**24
+    # The number of distances that are kept from the first to the second pass when dataset_level is set.
+    _max_cached_distances = 2**24
+
     def __init__(
         self,
         threshold: float = 0.6,
@@ -70,6 +85,7 @@ class Sufficiency(Metric[List[float]]):
         normalise_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        dataset_level: bool = False,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -101,6 +117,12 @@ class Sufficiency(Metric[List[float]]):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        dataset_level: boolean
+            Indicates whether each explanation is compared to the explanations of all instances of the call,
+            instead of only the instances of its batch. The distances are then computed in chunks and normalised
+            by their maximum over all instances, so the scores do not depend on batch_size, default=False.
+            Note that normalise_func is then only applied to the attributions: the distances are always
+            normalised by their maximum (as normalise_by_max does), as the full distance matrix is not held in memory.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
@@ -127,6 +149,7 @@ class Sufficiency(Metric[List[float]]):
         # Save metric-specific attributes.
         self.threshold = threshold
         self.distance_func = distance_func
+        self.dataset_level = dataset_level
         self.y_pred_classes = None
 
         # Asserts and warnings.
@@ -288,18 +311,22 @@ class Sufficiency(Metric[List[float]]):
     ) -> Dict[str, np.ndarray]:
         """Compute additional arguments required for Sufficiency evaluation on batch-level."""
 
-        a_batch_flat = a_batch.reshape(a_batch.shape[0], -1)
-        dist_matrix = cdist(a_batch_flat, a_batch_flat, self.distance_func, V=None)
-        dist_matrix = self.normalise_func(dist_matrix)
-        a_sim_matrix = np.zeros_like(dist_matrix)
-        a_sim_matrix[dist_matrix <= self.threshold] = 1
-
         # Predict on input.
         x_input = model.shape_input(
             x_batch, x_batch[0].shape, channel_first=True, batched=True
         )
         y_pred_classes = np.argmax(model.predict(x_input), axis=1).flatten()
 
+        # The distances to all instances are computed in custom_postprocess.
+        if self.dataset_level:
+            return {"y_pred_classes": y_pred_classes}
+
+        a_batch_flat = a_batch.reshape(a_batch.shape[0], -1)
+        dist_matrix = cdist(a_batch_flat, a_batch_flat, self.distance_func, V=None)
+        dist_matrix = self.normalise_func(dist_matrix)
+        a_sim_matrix = np.zeros_like(dist_matrix)
+        a_sim_matrix[dist_matrix <= self.threshold] = 1
+
         return {
             "i_batch": np.arange(x_batch.shape[0]),
             "a_sim_vector_batch": a_sim_matrix,
@@ -309,9 +336,10 @@ class Sufficiency(Metric[List[float]]):
     @no_type_check
     def evaluate_batch(
         self,
-        i_batch: np.ndarray,
-        a_sim_vector_batch: np.ndarray,
+        a_batch: np.ndarray,
         y_pred_classes: np.ndarray,
+        i_batch: Optional[np.ndarray] = None,
+        a_sim_vector_batch: Optional[np.ndarray] = None,
         **kwargs,
     ) -> List[float]:
         """
@@ -320,12 +348,14 @@ class Sufficiency(Metric[List[float]]):
 
         Parameters
         ----------
+        a_batch:
+            Batch of explanations to be evaluated.
+        y_pred_classes:
+            The class predictions of the complete input dataset.
         i_batch:
             The index of the current instance.
         a_sim_vector_batch:
             The custom input to be evaluated on an instance-basis.
-        y_pred_classes:
-            The class predictions of the complete input dataset.
         kwargs:
             Unused.
 
@@ -334,6 +364,12 @@ class Sufficiency(Metric[List[float]]):
         evaluation_scores:
             List of measured sufficiency for each entry in the batch.
         """
+        if self.dataset_level:
+            # Collect explanations and predictions, they are evaluated in custom_postprocess.
+            return [
+                {"a": a.flatten(), "y_pred": y_pred}
+                for a, y_pred in zip(a_batch, y_pred_classes)
+            ]
 
         return [
             self.evaluate_instance(
@@ -341,3 +377,112 @@ class Sufficiency(Metric[List[float]]):
             )
             for i, a_sim_vector in zip(i_batch, a_sim_vector_batch)
         ]
+
+    def custom_postprocess(self, **kwargs) -> None:
+        """
+        Post-process the evaluation results. If dataset_level is set, each explanation is evaluated against
+        the explanations of all instances.
+
+        Parameters
+        ----------
+        kwargs:
+            Unused.
+
+        Returns
+        -------
+        None
+        """
+        if not self.dataset_level:
+            return
+
+        a_flat = np.stack([r["a"] for r in self.evaluation_scores])
+        y_pred_classes = np.array([r["y_pred"] for r in self.evaluation_scores])
+        self.evaluation_scores = self._evaluate_dataset(a_flat, y_pred_classes)
+
+    def _get_distances(
+        self, a_flat: np.ndarray, start: int = 0
+    ) -> Iterator[Tuple[slice, np.ndarray]]:
+        """
+        Compute the distances of all explanations to each other, in chunks of rows.
+
+        Parameters
+        ----------
+        a_flat: np.ndarray
+            The flattened explanations of all instances.
+        start: integer
+            The first row to compute the distances of, default=0.
+
+        Returns
+        -------
+        iterator
+            The slice of rows and their distances to all explanations, for each chunk.
+        """
+        # Statistics that cdist would infer from each chunk are computed over all instances.
+        cdist_kwargs = {}
+        if self.distance_func == "seuclidean":
+            cdist_kwargs["V"] = np.var(a_flat, axis=0, ddof=1)
+        elif self.distance_func == "mahalanobis":
+            cdist_kwargs["VI"] = np.linalg.inv(np.cov(a_flat.T)).T
+
+        chunk_size = max(1, self._max_distances_per_chunk // len(a_flat))
+        for start in range(start, len(a_flat), chunk_size):
+            rows = slice(start, min(start + chunk_size, len(a_flat)))
+            yield rows, cdist(a_flat[rows], a_flat, self.distance_func, **cdist_kwargs)
+
+    def _evaluate_dataset(
+        self, a_flat: np.ndarray, y_pred_classes: np.ndarray
+    ) -> List[float]:
+        """
+        Evaluate the sufficiency of each explanation with respect to the explanations of all instances,
+        without holding the full distance matrix in memory.
+
+        The distances are normalised by their maximum, which is only known after all chunks are computed.
+        Chunks are therefore kept until they are scored, up to _max_cached_distances distances, and only the
+        chunks beyond that are computed a second time.
+
+        Parameters
+        ----------
+        a_flat: np.ndarray
+            The flattened explanations of all instances.
+        y_pred_classes: np.ndarray
+            The class predictions of all instances.
+
+        Returns
+        -------
+        list
+            The sufficiency of each instance.
+        """
+        cached_chunks = []
+        nr_cached_distances, nr_cached_rows = 0, 0
+        max_dist = -np.inf
+        for rows, dist in self._get_distances(a_flat):
+            max_dist = max(max_dist, np.max(dist))
+            if (
+                rows.start == nr_cached_rows
+                and nr_cached_distances + dist.size <= self._max_cached_distances
+            ):
+                cached_chunks.append((rows, dist))
+                nr_cached_distances += dist.size
+                nr_cached_rows = rows.stop
+
+        # The chunks that were not kept are computed again.
+        chunks = itertools.chain(
+            cached_chunks, self._get_distances(a_flat, start=nr_cached_rows)
+        )
+
+        scores = np.zeros(len(a_flat))
+        for rows, dist in chunks:
+            if max_dist != 0:
+                dist = np.divide(dist, max_dist)
+            low_dist = dist <= self.threshold
+            low_dist[np.arange(dist.shape[0]), np.arange(len(a_flat))[rows]] = False
+
+            nr_low_dist = low_dist.sum(axis=1)
+            nr_same_pred = (
+                low_dist & (y_pred_classes[None, :] == y_pred_classes[rows, None])
+            ).sum(axis=1)
+            np.divide(
+                nr_same_pred, nr_low_dist, out=scores[rows], where=nr_low_dist > 0
+            )
+
+        return scores.tolist()
@@ -30,6 +30,7 @@ from quantus.functions.complexity_func import discrete_entropy, entropy
 from quantus.functions.normalise_func import normalise_by_average_second_moment_estimate
 from quantus.functions import n_bins_func
 from quantus.helpers import asserts, warn, utils
+from quantus.helpers.checkpoint_utils import LayerScoresCheckpoint, array_digest
 from quantus.helpers.enums import (
     DataType,
     EvaluationCategory,
@@ -89,12 +90,14 @@ class EfficientMPRT(Metric):
         seed: int = 42,
         compute_extra_scores: bool = False,
         skip_layers: bool = True,
+        randomise_in_place: bool = False,
         abs: bool = False,
         normalise: bool = False,
         normalise_func: Optional[Callable[[np.ndarray], np.ndarray]] = None,
         normalise_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        checkpoint_dir: Optional[str] = None,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -121,6 +124,9 @@ class EfficientMPRT(Metric):
         skip_layers: boolean
             Indicates if explanation similarity should be computed only once; between the
             original and fully randomised model, instead of in a layer-by-layer basis.
+        randomise_in_place: boolean
+            Indicates whether the layers of the model are randomised in place and restored afterwards, instead of
+            randomising a copy of the model, which halves the peak memory for large models, default=False.
         abs: boolean
             Indicates whether absolute operation is applied on the attribution, default=True.
         normalise: boolean
@@ -134,6 +140,10 @@ class EfficientMPRT(Metric):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        checkpoint_dir: string, optional
+            If set, the scores of each layer are saved to this directory after every batch, and an interrupted
+            evaluation with the same configuration (including the data, explain_func and similarity_func) resumes
+            from the saved scores, default=None.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
@@ -182,6 +192,8 @@ class EfficientMPRT(Metric):
         self.seed = seed
         self.compute_extra_scores = compute_extra_scores
         self.skip_layers = skip_layers
+        self.randomise_in_place = randomise_in_place
+        self.checkpoint_dir = checkpoint_dir
 
         # Results are returned/saved as a dictionary not like in the super-class as a list.
         self.evaluation_scores = {}
@@ -331,6 +343,26 @@ class EfficientMPRT(Metric):
         # Results are returned/saved as a dictionary not as a list as in the super-class.
         self.evaluation_scores = {}
 
+        checkpoint = None
+        if self.checkpoint_dir is not None:
+            checkpoint = LayerScoresCheckpoint(
+                self.checkpoint_dir,
+                config={
+                    "metric": self.__class__.__name__,
+                    "layer_order": self.layer_order,
+                    "seed": self.seed,
+                    "skip_layers": self.skip_layers,
+                    "batch_size": batch_size,
+                    "nr_instances": len(x_full_dataset),
+                    "similarity_func": self.similarity_func,
+                    "explain_func": self.explain_func,
+                    "explain_func_kwargs": self.explain_func_kwargs,
+                    "x_batch": array_digest(x_full_dataset),
+                    "y_batch": array_digest(y_full_dataset),
+                    "a_batch": array_digest(a_full_dataset),
+                },
+            )
+
         # Get number of iterations from number of layers.
         n_layers = model.random_layer_generator_length
         pbar = tqdm(
@@ -360,66 +392,49 @@ class EfficientMPRT(Metric):
         self.model_scores_by_layer: Dict[str, List[float]] = {}
 
         with pbar as pbar:
+            # Compute the complexity of explanations and the outputs of the original model. This is done
+            # before the layers are randomised, as they may be randomised in place.
+            self.explanation_scores_by_layer["orig"] = self.evaluate_model(
+                model=model.get_model(),
+                x_full_dataset=x_full_dataset,
+                y_full_dataset=y_full_dataset,
+                a_full_dataset=a_full_dataset,
+                x=x_batch[0],
+                pbar=pbar,
+                checkpoint=checkpoint,
+                checkpoint_key="explanation_orig",
+            )
+            self.model_scores_by_layer["orig"] = self.evaluate_model_outputs(
+                model=model,
+                x_full_dataset=x_full_dataset,
+                checkpoint=checkpoint,
+                checkpoint_key="model_orig",
+            )
+
             for l_ix, (layer_name, random_layer_model) in enumerate(
-                model.get_random_layer_generator(order=self.layer_order, seed=self.seed)
+                model.get_random_layer_generator(
+                    order=self.layer_order,
+                    seed=self.seed,
+                    in_place=self.randomise_in_place,
+                )
             ):
                 pbar.desc = layer_name
 
-                if l_ix == 0:
-                    # Generate explanations on original model in batches.
-                    a_original_generator = self.generate_explanations(
-                        model.get_model(), x_full_dataset, y_full_dataset, batch_size
-                    )
-
-                    # Compute the complexity of explanations of the original model.
-                    self.explanation_scores_by_layer["orig"] = []
-                    for a_batch, a_batch_original in zip(
-                        self.generate_a_batches(a_full_dataset), a_original_generator
-                    ):
-                        for a_instance, a_instance_original in zip(
-                            a_batch, a_batch_original
-                        ):
-                            score = self.evaluate_instance(
-                                model=model,
-                                x=x_batch[0],
-                                y=None,
-                                s=None,
-                                a=a_instance_original,
-                            )
-                            self.explanation_scores_by_layer["orig"].append(score)
-                            pbar.update(1)
-
-                    # Compute the similarity of outputs of the original model.
-                    self.model_scores_by_layer["orig"] = []
-                    y_preds = model.predict(x_full_dataset)
-                    for y_ix, y_pred in enumerate(y_preds):
-                        score = entropy(a=y_pred, x=y_pred)
-                        self.model_scores_by_layer["orig"].append(score)
-
                 # Skip layers if computing delta.
                 if self.skip_layers and (l_ix + 1) < n_layers:
                     continue
 
-                # Generate explanations on perturbed model in batches.
-                a_perturbed_generator = self.generate_explanations(
-                    random_layer_model, x_full_dataset, y_full_dataset, batch_size
-                )
-
                 # Compute the complexity of explanations of the perturbed model.
-                self.explanation_scores_by_layer[layer_name] = []
-                for a_batch, a_batch_perturbed in zip(
-                    self.generate_a_batches(a_full_dataset), a_perturbed_generator
-                ):
-                    for a_instance, a_instance_perturbed in zip(a_batch, a_batch_perturbed):
-                        score = self.evaluate_instance(
-                            model=random_layer_model,
-                            x=None,
-                            y=None,
-                            s=None,
-                            a=a_instance_perturbed,
-                        )
-                        self.explanation_scores_by_layer[layer_name].append(score)
-                        pbar.update(1)
+                self.explanation_scores_by_layer[layer_name] = self.evaluate_model(
+                    model=random_layer_model,
+                    x_full_dataset=x_full_dataset,
+                    y_full_dataset=y_full_dataset,
+                    a_full_dataset=a_full_dataset,
+                    x=None,
+                    pbar=pbar,
+                    checkpoint=checkpoint,
+                    checkpoint_key=f"explanation_{layer_name}",
+                )
 
                 # Wrap the model.
                 random_layer_model_wrapped = utils.get_wrapped_model(
@@ -431,11 +446,12 @@ class EfficientMPRT(Metric):
                 )
 
                 # Predict and save complexity scores of the perturbed model outputs.
-                self.model_scores_by_layer[layer_name] = []
-                y_preds = random_layer_model_wrapped.predict(x_full_dataset)
-                for y_ix, y_pred in enumerate(y_preds):
-                    score = entropy(a=y_pred, x=y_pred)
-                    self.model_scores_by_layer[layer_name].append(score)
+                self.model_scores_by_layer[layer_name] = self.evaluate_model_outputs(
+                    model=random_layer_model_wrapped,
+                    x_full_dataset=x_full_dataset,
+                    checkpoint=checkpoint,
+                    checkpoint_key=f"model_{layer_name}",
+                )
 
         # Save evaluation scores as the relative rise in complexity.
         explanation_scores = list(self.explanation_scores_by_layer.values())
@@ -528,6 +544,119 @@ class EfficientMPRT(Metric):
         # Compute complexity measure.
         return self.complexity_func(a=a, x=x, **self.complexity_func_kwargs)
 
+    def evaluate_model(
+        self,
+        model: ModelInterface,
+        x_full_dataset: np.ndarray,
+        y_full_dataset: np.ndarray,
+        a_full_dataset: np.ndarray,
+        x: Optional[np.ndarray],
+        pbar: tqdm,
+        checkpoint: Optional[LayerScoresCheckpoint] = None,
+        checkpoint_key: str = "",
+    ) -> List[float]:
+        """
+        Generate explanations of the model for the full dataset in batches and compute their complexity.
+        If a checkpoint is given, the scores are saved after every batch and the instances with saved
+        scores are skipped.
+
+        Parameters
+        ----------
+        model: ModelInterface
+            The (randomised) model to generate the explanations with.
+        x_full_dataset: np.ndarray
+            The input data that are explained.
+        y_full_dataset: np.ndarray
+            The output labels that are explained.
+        a_full_dataset: np.ndarray
+            The explanations of the original model, which determine the batches.
+        x: np.ndarray, optional
+            The input passed to the complexity function.
+        pbar: tqdm
+            The progress bar, updated once an instance is evaluated.
+        checkpoint: LayerScoresCheckpoint, optional
+            The checkpoint to resume from and save to.
+        checkpoint_key: string
+            The key of the scores in the checkpoint.
+
+        Returns
+        -------
+        list
+            The evaluation results, one per instance.
+        """
+        scores: List[float] = []
+        if checkpoint is not None:
+            scores = checkpoint.load(checkpoint_key)
+            pbar.update(len(scores))
+
+        # The saved scores cover whole batches, so the remaining batches are unchanged.
+        nr_done = len(scores)
+        if nr_done == len(x_full_dataset):
+            return scores
+
+        for a_batch, a_batch_perturbed in zip(
+            self.generate_a_batches(a_full_dataset[nr_done:]),
+            self.generate_explanations(
+                model,
+                x_full_dataset[nr_done:],
+                y_full_dataset[nr_done:],
+                self.batch_size,
+            ),
+        ):
+            for a_instance_perturbed in a_batch_perturbed:
+                score = self.evaluate_instance(
+                    model=model,
+                    x=x,
+                    y=None,
+                    s=None,
+                    a=a_instance_perturbed,
+                )
+                scores.append(score)
+                pbar.update(1)
+
+            if checkpoint is not None:
+                checkpoint.save(checkpoint_key, scores)
+
+        return scores
+
+    @staticmethod
+    def evaluate_model_outputs(
+        model: ModelInterface,
+        x_full_dataset: np.ndarray,
+        checkpoint: Optional[LayerScoresCheckpoint] = None,
+        checkpoint_key: str = "",
+    ) -> List[float]:
+        """
+        Compute the entropy of the model outputs for the full dataset. If a checkpoint is given,
+        the scores are saved, and loaded instead of recomputed if they are complete.
+
+        Parameters
+        ----------
+        model: ModelInterface
+            The (randomised) model to predict with.
+        x_full_dataset: np.ndarray
+            The input data.
+        checkpoint: LayerScoresCheckpoint, optional
+            The checkpoint to resume from and save to.
+        checkpoint_key: string
+            The key of the scores in the checkpoint.
+
+        Returns
+        -------
+        list
+            The entropy of the model outputs, one per instance.
+        """
+        if checkpoint is not None:
+            scores = checkpoint.load(checkpoint_key)
+            if len(scores) == len(x_full_dataset):
+                return scores
+
+        y_preds = model.predict(x_full_dataset)
+        scores = [entropy(a=y_pred, x=y_pred) for y_pred in y_preds]
+        if checkpoint is not None:
+            checkpoint.save(checkpoint_key, scores)
+        return scores
+
     def custom_preprocess(
         self,
         model: ModelInterface,
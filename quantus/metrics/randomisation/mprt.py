@@ -8,6 +8,7 @@
 
 import sys
 import warnings
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from typing import (
     Any,
     Callable,
@@ -27,7 +28,8 @@ from tqdm.auto import tqdm
 from sklearn.utils import gen_batches
 
 from quantus.functions.similarity_func import correlation_spearman
-from quantus.helpers import asserts, warn
+from quantus.helpers import asserts, utils, warn
+from quantus.helpers.checkpoint_utils import LayerScoresCheckpoint, array_digest
 from quantus.helpers.enums import (
     DataType,
     EvaluationCategory,
@@ -82,12 +84,14 @@ class MPRT(Metric):
         return_average_correlation: bool = False,
         return_last_correlation: bool = False,
         skip_layers: bool = False,
+        randomise_in_place: bool = False,
         abs: bool = True,
         normalise: bool = True,
         normalise_func: Optional[Callable[[np.ndarray], np.ndarray]] = None,
         normalise_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        checkpoint_dir: Optional[str] = None,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -113,6 +117,9 @@ class MPRT(Metric):
         skip_layers: boolean
             Indicates if explanation similarity should be computed only once; between the
             original and fully randomised model, instead of in a layer-by-layer basis.
+        randomise_in_place: boolean
+            Indicates whether the layers of the model are randomised in place and restored afterwards, instead of
+            randomising a copy of the model, which halves the peak memory for large models, default=False.
         abs: boolean
             Indicates whether absolute operation is applied on the attribution, default=True.
         normalise: boolean
@@ -126,6 +133,10 @@ class MPRT(Metric):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        checkpoint_dir: string, optional
+            If set, the scores of each layer are saved to this directory after every batch, and an interrupted
+            evaluation with the same configuration (including the data, explain_func and similarity_func) resumes
+            from the saved scores, default=None.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
@@ -167,6 +178,8 @@ class MPRT(Metric):
         self.return_average_correlation = return_average_correlation
         self.return_last_correlation = return_last_correlation
         self.skip_layers = skip_layers
+        self.randomise_in_place = randomise_in_place
+        self.checkpoint_dir = checkpoint_dir
 
         # Results are returned/saved as a dictionary not like in the super-class as a list.
         self.evaluation_scores = {}
@@ -318,6 +331,26 @@ class MPRT(Metric):
         # Results are returned/saved as a dictionary not as a list as in the super-class.
         self.evaluation_scores = {}
 
+        checkpoint = None
+        if self.checkpoint_dir is not None:
+            checkpoint = LayerScoresCheckpoint(
+                self.checkpoint_dir,
+                config={
+                    "metric": self.__class__.__name__,
+                    "layer_order": self.layer_order,
+                    "seed": self.seed,
+                    "skip_layers": self.skip_layers,
+                    "batch_size": batch_size,
+                    "nr_instances": len(x_full_dataset),
+                    "similarity_func": self.similarity_func,
+                    "explain_func": self.explain_func,
+                    "explain_func_kwargs": self.explain_func_kwargs,
+                    "x_batch": array_digest(x_full_dataset),
+                    "y_batch": array_digest(y_full_dataset),
+                    "a_batch": array_digest(a_full_dataset),
+                },
+            )
+
         # Get number of iterations from number of layers.
         n_layers = model.random_layer_generator_length
         pbar = tqdm(
@@ -327,67 +360,45 @@ class MPRT(Metric):
             # Set property to False, so we display only 1 pbar.
             self._display_progressbar = False
 
-        with pbar as pbar:
+        # Similarities are computed in a background thread, while the next batch is explained.
+        with pbar as pbar, ThreadPoolExecutor(max_workers=1) as executor:
+            # Compute the similarity of explanations of the original model. This is done before the
+            # layers are randomised, as they may be randomised in place.
+            self.evaluation_scores["original"] = self.evaluate_model(
+                model=model.get_model(),
+                x_full_dataset=x_full_dataset,
+                y_full_dataset=y_full_dataset,
+                a_full_dataset=a_full_dataset,
+                executor=executor,
+                pbar=pbar,
+                checkpoint=checkpoint,
+                checkpoint_key="original",
+            )
+
             for l_ix, (layer_name, random_layer_model) in enumerate(
-                model.get_random_layer_generator(order=self.layer_order, seed=self.seed)
+                model.get_random_layer_generator(
+                    order=self.layer_order,
+                    seed=self.seed,
+                    in_place=self.randomise_in_place,
+                )
             ):
                 pbar.desc = layer_name
 
-                if l_ix == 0:
-
-                    # Generate explanations on original model in batches.
-                    a_original_generator = self.generate_explanations(
-                        model.get_model(), x_full_dataset, y_full_dataset, batch_size
-                    )
-
-                    # Compute the similarity of explanations of the original model.
-                    self.evaluation_scores["original"] = []
-                    for a_batch, a_batch_original in zip(
-                        self.generate_a_batches(a_full_dataset), a_original_generator
-                    ):
-                        for a_instance, a_instance_original in zip(
-                            a_batch, a_batch_original
-                        ):
-                            score = self.evaluate_instance(
-                                model=model,
-                                x=None,
-                                y=None,
-                                s=None,
-                                a=a_instance,
-                                a_perturbed=a_instance_original,
-                            )
-                            # Save similarity scores in a result dictionary.
-                            self.evaluation_scores["original"].append(score)
-                            pbar.update(1)
-
                 # Skip layers if computing delta.
                 if self.skip_layers and (l_ix + 1) < n_layers:
                     continue
 
-                self.evaluation_scores[layer_name] = []
-
-                # Generate explanations on perturbed model in batches.
-                a_perturbed_generator = self.generate_explanations(
-                    random_layer_model, x_full_dataset, y_full_dataset, batch_size
-                )
-
                 # Compute the similarity of explanations of the perturbed model.
-                for a_batch, a_batch_perturbed in zip(
-                    self.generate_a_batches(a_full_dataset), a_perturbed_generator
-                ):
-                    for a_instance, a_instance_perturbed in zip(
-                        a_batch, a_batch_perturbed
-                    ):
-                        score = self.evaluate_instance(
-                            model=random_layer_model,
-                            x=None,
-                            y=None,
-                            s=None,
-                            a=a_instance,
-                            a_perturbed=a_instance_perturbed,
-                        )
-                        self.evaluation_scores[layer_name].append(score)
-                        pbar.update(1)
+                self.evaluation_scores[layer_name] = self.evaluate_model(
+                    model=random_layer_model,
+                    x_full_dataset=x_full_dataset,
+                    y_full_dataset=y_full_dataset,
+                    a_full_dataset=a_full_dataset,
+                    executor=executor,
+                    pbar=pbar,
+                    checkpoint=checkpoint,
+                    checkpoint_key=layer_name,
+                )
 
         if self.return_average_correlation:
             self.evaluation_scores = self.recompute_average_correlation_per_sample()
@@ -482,6 +493,109 @@ class MPRT(Metric):
         # Compute similarity measure.
         return self.similarity_func(a_perturbed.flatten(), a.flatten())
 
+    def evaluate_similarities(
+        self, a_batch: np.ndarray, a_batch_perturbed: np.ndarray
+    ) -> List[float]:
+        """
+        Compute the similarity of each explanation to its perturbed explanation, for a batch at once.
+
+        Parameters
+        ----------
+        a_batch: np.ndarray
+            The batch of explanations.
+        a_batch_perturbed: np.ndarray
+            The batch of perturbed explanations.
+
+        Returns
+        -------
+        list
+            The evaluation results, one per instance.
+        """
+        return utils.apply_rowwise(
+            self.similarity_func,
+            a_batch_perturbed.reshape(len(a_batch_perturbed), -1),
+            a_batch.reshape(len(a_batch), -1),
+            positional=True,
+        ).tolist()
+
+    def evaluate_model(
+        self,
+        model: ModelInterface,
+        x_full_dataset: np.ndarray,
+        y_full_dataset: np.ndarray,
+        a_full_dataset: np.ndarray,
+        executor: Executor,
+        pbar: tqdm,
+        checkpoint: Optional[LayerScoresCheckpoint] = None,
+        checkpoint_key: str = "",
+    ) -> List[float]:
+        """
+        Generate explanations of the model for the full dataset in batches and compare them to the explanations
+        in a_full_dataset. The similarities of each batch are computed by the executor, while the next
+        batch is explained. If a checkpoint is given, the scores are saved after every batch and the
+        instances with saved scores are skipped.
+
+        Parameters
+        ----------
+        model: ModelInterface
+            The (randomised) model to generate the explanations with.
+        x_full_dataset: np.ndarray
+            The input data that are explained.
+        y_full_dataset: np.ndarray
+            The output labels that are explained.
+        a_full_dataset: np.ndarray
+            The explanations to compare to.
+        executor: Executor
+            The executor computing the similarities.
+        pbar: tqdm
+            The progress bar, updated once a batch is evaluated.
+        checkpoint: LayerScoresCheckpoint, optional
+            The checkpoint to resume from and save to.
+        checkpoint_key: string
+            The key of the scores in the checkpoint.
+
+        Returns
+        -------
+        list
+            The evaluation results, one per instance.
+        """
+        scores: List[float] = []
+        if checkpoint is not None:
+            scores = checkpoint.load(checkpoint_key)
+            pbar.update(len(scores))
+        pending: Optional[Future] = None
+
+        def collect_pending():
+            batch_scores = pending.result()
+            scores.extend(batch_scores)
+            if checkpoint is not None:
+                checkpoint.save(checkpoint_key, scores)
+            pbar.update(len(batch_scores))
+
+        # The saved scores cover whole batches, so the remaining batches are unchanged.
+        nr_done = len(scores)
+        if nr_done == len(x_full_dataset):
+            return scores
+
+        for a_batch, a_batch_perturbed in zip(
+            self.generate_a_batches(a_full_dataset[nr_done:]),
+            self.generate_explanations(
+                model,
+                x_full_dataset[nr_done:],
+                y_full_dataset[nr_done:],
+                self.batch_size,
+            ),
+        ):
+            if pending is not None:
+                collect_pending()
+            pending = executor.submit(
+                self.evaluate_similarities, a_batch, a_batch_perturbed
+            )
+
+        if pending is not None:
+            collect_pending()
+        return scores
+
     def custom_preprocess(
         self,
         model: ModelInterface,
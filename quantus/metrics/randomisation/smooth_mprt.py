@@ -31,6 +31,7 @@ from scipy import stats
 from quantus.functions.similarity_func import correlation_spearman
 from quantus.functions.normalise_func import normalise_by_average_second_moment_estimate
 from quantus.helpers import asserts, warn, utils
+from quantus.helpers.checkpoint_utils import LayerScoresCheckpoint, array_digest
 from quantus.helpers.enums import (
     DataType,
     EvaluationCategory,
@@ -86,12 +87,15 @@ class SmoothMPRT(Metric):
         return_average_correlation: bool = False,
         return_last_correlation: bool = False,
         skip_layers: bool = False,
+        randomise_in_place: bool = False,
         abs: bool = True,
         normalise: bool = True,
         normalise_func: Optional[Callable[[np.ndarray], np.ndarray]] = None,
         normalise_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        checkpoint_dir: Optional[str] = None,
+        explain_batch_size: Optional[int] = None,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -125,6 +129,9 @@ class SmoothMPRT(Metric):
         skip_layers: boolean
             Indicates if explanation similarity should be computed only once; between the
             original and fully randomised model, instead of in a layer-by-layer basis.
+        randomise_in_place: boolean
+            Indicates whether the layers of the model are randomised in place and restored afterwards, instead of
+            randomising a copy of the model, which halves the peak memory for large models, default=False.
         abs: boolean
             Indicates whether absolute operation is applied on the attribution, default=True.
         normalise: boolean
@@ -138,6 +145,14 @@ class SmoothMPRT(Metric):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        checkpoint_dir: string, optional
+            If set, the scores of each layer are saved to this directory after every batch, and an interrupted
+            evaluation with the same configuration (including the data, explain_func and similarity_func) resumes
+            from the saved scores, default=None.
+        explain_batch_size: integer, optional
+            The maximum number of noisy inputs that are explained in a single call. If set, several noise
+            samples are stacked along the batch axis up to this number. If None, every noise sample
+            is explained separately, default=None.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
@@ -181,6 +196,9 @@ class SmoothMPRT(Metric):
         self.return_average_correlation = return_average_correlation
         self.return_last_correlation = return_last_correlation
         self.skip_layers = skip_layers
+        self.randomise_in_place = randomise_in_place
+        self.checkpoint_dir = checkpoint_dir
+        self.explain_batch_size = explain_batch_size
 
         # Results are returned/saved as a dictionary not like in the super-class as a list.
         self.evaluation_scores = {}
@@ -338,6 +356,28 @@ class SmoothMPRT(Metric):
         # Results are returned/saved as a dictionary not as a list as in the super-class.
         self.evaluation_scores = {}
 
+        checkpoint = None
+        if self.checkpoint_dir is not None:
+            checkpoint = LayerScoresCheckpoint(
+                self.checkpoint_dir,
+                config={
+                    "metric": self.__class__.__name__,
+                    "layer_order": self.layer_order,
+                    "seed": self.seed,
+                    "skip_layers": self.skip_layers,
+                    "nr_samples": self.nr_samples,
+                    "noise_magnitude": self.noise_magnitude,
+                    "batch_size": batch_size,
+                    "nr_instances": len(x_full_dataset),
+                    "similarity_func": self.similarity_func,
+                    "explain_func": self.explain_func,
+                    "explain_func_kwargs": self.explain_func_kwargs,
+                    "x_batch": array_digest(x_full_dataset),
+                    "y_batch": array_digest(y_full_dataset),
+                    "a_batch": array_digest(a_full_dataset),
+                },
+            )
+
         # Get number of iterations from number of layers.
         n_layers = model.random_layer_generator_length
         pbar = tqdm(
@@ -348,72 +388,41 @@ class SmoothMPRT(Metric):
             self._display_progressbar = False
 
         with pbar as pbar:
+            # Compute the similarity of explanations of the original model. This is done before the
+            # layers are randomised, as they may be randomised in place.
+            self.evaluation_scores["original"] = self.evaluate_model(
+                model=model.get_model(),
+                x_full_dataset=x_full_dataset,
+                y_full_dataset=y_full_dataset,
+                a_full_dataset=a_full_dataset,
+                pbar=pbar,
+                checkpoint=checkpoint,
+                checkpoint_key="original",
+            )
+
             for l_ix, (layer_name, random_layer_model) in enumerate(
-                model.get_random_layer_generator(order=self.layer_order, seed=self.seed)
+                model.get_random_layer_generator(
+                    order=self.layer_order,
+                    seed=self.seed,
+                    in_place=self.randomise_in_place,
+                )
             ):
                 pbar.desc = layer_name
 
-                if l_ix == 0:
-
-                    # Generate explanations on original model in batches.
-                    a_original_generator = self.generate_explanations(
-                        model.get_model(),
-                        x_full_dataset,
-                        y_full_dataset,
-                        **self.explain_func_kwargs,
-                    )
-
-                    # Compute the similarity of explanations of the original model.
-                    self.evaluation_scores["original"] = []
-                    for a_batch, a_batch_original in zip(
-                        self.generate_a_batches(a_full_dataset), a_original_generator
-                    ):
-                        for a_instance, a_instance_original in zip(
-                            a_batch, a_batch_original
-                        ):
-                            score = self.evaluate_instance(
-                                model=model,
-                                x=None,
-                                y=None,
-                                s=None,
-                                a=a_instance,
-                                a_perturbed=a_instance_original,
-                            )
-                            # Save similarity scores in a result dictionary.
-                            self.evaluation_scores["original"].append(score)
-                            pbar.update(1)
-
                 # Skip layers if computing delta.
                 if self.skip_layers and (l_ix + 1) < n_layers:
                     continue
 
-                self.evaluation_scores[layer_name] = []
-
-                # Generate explanations on perturbed model in batches.
-                a_perturbed_generator = self.generate_explanations(
-                    random_layer_model,
-                    x_full_dataset,
-                    y_full_dataset,
-                    **self.explain_func_kwargs,
-                )
-
                 # Compute the similarity of explanations of the perturbed model.
-                for a_batch, a_batch_perturbed in zip(
-                    self.generate_a_batches(a_full_dataset), a_perturbed_generator
-                ):
-                    for a_instance, a_instance_perturbed in zip(
-                        a_batch, a_batch_perturbed
-                    ):
-                        score = self.evaluate_instance(
-                            model=random_layer_model,
-                            x=None,
-                            y=None,
-                            s=None,
-                            a=a_instance,
-                            a_perturbed=a_instance_perturbed,
-                        )
-                        self.evaluation_scores[layer_name].append(score)
-                        pbar.update(1)
+                self.evaluation_scores[layer_name] = self.evaluate_model(
+                    model=random_layer_model,
+                    x_full_dataset=x_full_dataset,
+                    y_full_dataset=y_full_dataset,
+                    a_full_dataset=a_full_dataset,
+                    pbar=pbar,
+                    checkpoint=checkpoint,
+                    checkpoint_key=layer_name,
+                )
 
         if self.return_average_correlation:
             self.evaluation_scores = self.recompute_average_correlation_per_sample()
@@ -522,6 +531,79 @@ class SmoothMPRT(Metric):
         # Compute similarity measure.
         return self.similarity_func(a_perturbed_flat, a_flat)
 
+    def evaluate_model(
+        self,
+        model: ModelInterface,
+        x_full_dataset: np.ndarray,
+        y_full_dataset: np.ndarray,
+        a_full_dataset: np.ndarray,
+        pbar: tqdm,
+        checkpoint: Optional[LayerScoresCheckpoint] = None,
+        checkpoint_key: str = "",
+    ) -> List[float]:
+        """
+        Generate explanations of the model for the full dataset in batches and compare them to the explanations
+        in a_full_dataset. If a checkpoint is given, the scores are saved after every batch and the
+        instances with saved scores are skipped.
+
+        Parameters
+        ----------
+        model: ModelInterface
+            The (randomised) model to generate the explanations with.
+        x_full_dataset: np.ndarray
+            The input data that are explained.
+        y_full_dataset: np.ndarray
+            The output labels that are explained.
+        a_full_dataset: np.ndarray
+            The explanations to compare to.
+        pbar: tqdm
+            The progress bar, updated once an instance is evaluated.
+        checkpoint: LayerScoresCheckpoint, optional
+            The checkpoint to resume from and save to.
+        checkpoint_key: string
+            The key of the scores in the checkpoint.
+
+        Returns
+        -------
+        list
+            The evaluation results, one per instance.
+        """
+        scores: List[float] = []
+        if checkpoint is not None:
+            scores = checkpoint.load(checkpoint_key)
+            pbar.update(len(scores))
+
+        # The saved scores cover whole batches, so the remaining batches are unchanged.
+        nr_done = len(scores)
+        if nr_done == len(x_full_dataset):
+            return scores
+
+        for a_batch, a_batch_perturbed in zip(
+            self.generate_a_batches(a_full_dataset[nr_done:]),
+            self.generate_explanations(
+                model,
+                x_full_dataset[nr_done:],
+                y_full_dataset[nr_done:],
+                **self.explain_func_kwargs,
+            ),
+        ):
+            for a_instance, a_instance_perturbed in zip(a_batch, a_batch_perturbed):
+                score = self.evaluate_instance(
+                    model=model,
+                    x=None,
+                    y=None,
+                    s=None,
+                    a=a_instance,
+                    a_perturbed=a_instance_perturbed,
+                )
+                scores.append(score)
+                pbar.update(1)
+
+            if checkpoint is not None:
+                checkpoint.save(checkpoint_key, scores)
+
+        return scores
+
     def custom_preprocess(
         self,
         model: ModelInterface,
@@ -710,18 +792,36 @@ class SmoothMPRT(Metric):
         a_batch:
             Batch of explanations ready to be evaluated.
         """
+        batch_size = len(x_batch)
+        if self.explain_batch_size is None:
+            nr_samples_per_call = 1
+        else:
+            nr_samples_per_call = max(1, self.explain_batch_size // batch_size)
+
+        # Accumulate the mean over noise samples, without holding the explanations of all samples.
         a_batch_smooth = None
-        for n in range(self.nr_samples):
-            # the last epsilon is defined as zero to compute the true output,
-            # and have SmoothGrad w/ n_iter = 1 === gradient
-            if n == self.nr_samples - 1:
-                epsilon = np.zeros_like(x_batch)
-            else:
-                epsilon = np.random.randn(*x_batch.shape) * std
-            a_batch = quantus.explain(model, x_batch + epsilon, y_batch, **kwargs)
-            if a_batch_smooth is None:
-                a_batch_smooth = a_batch / self.nr_samples
-            else:
-                a_batch_smooth += a_batch / self.nr_samples
+        for n_start in range(0, self.nr_samples, nr_samples_per_call):
+            n_stop = min(n_start + nr_samples_per_call, self.nr_samples)
+
+            # The last epsilon is defined as zero to compute the true output,
+            # and have SmoothGrad w/ n_iter = 1 === gradient.
+            nr_noisy = min(n_stop, self.nr_samples - 1) - n_start
+            epsilon = np.zeros((n_stop - n_start,) + x_batch.shape)
+            if nr_noisy > 0:
+                epsilon[:nr_noisy] = np.random.randn(nr_noisy, *x_batch.shape) * std
+
+            # Stack the noise samples along the batch axis.
+            x_noisy = (x_batch + epsilon).reshape((-1,) + x_batch.shape[1:])
+            y_noisy = np.tile(y_batch, n_stop - n_start)
+            a_batch = quantus.explain(model, x_noisy, y_noisy, **kwargs)
+            a_batch = a_batch.reshape(
+                (n_stop - n_start, batch_size) + a_batch.shape[1:]
+            )
+
+            for a_sample in a_batch:
+                if a_batch_smooth is None:
+                    a_batch_smooth = a_sample / self.nr_samples
+                else:
+                    a_batch_smooth += a_sample / self.nr_samples
 
         return a_batch_smooth
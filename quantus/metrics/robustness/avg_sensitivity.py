@@ -14,7 +14,7 @@ import numpy as np
 from quantus.functions import norm_func
 from quantus.functions.perturb_func import perturb_batch, uniform_noise
 from quantus.functions.similarity_func import difference
-from quantus.helpers import asserts, warn
+from quantus.helpers import asserts, utils, warn
 from quantus.helpers.enums import (
     DataType,
     EvaluationCategory,
@@ -85,6 +85,7 @@ class AvgSensitivity(Metric[List[float]]):
         perturb_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        explain_batch_size: Optional[int] = None,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -125,6 +126,10 @@ class AvgSensitivity(Metric[List[float]]):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        explain_batch_size: integer, optional
+            The maximum number of perturbed inputs that are explained in a single call. If set, several
+            perturbation samples are stacked along the batch axis up to this number. If None, every sample
+            is explained separately, default=None.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
@@ -151,6 +156,7 @@ class AvgSensitivity(Metric[List[float]]):
 
         # Save metric-specific attributes.
         self.nr_samples = nr_samples
+        self.explain_batch_size = explain_batch_size
 
         if similarity_func is None:
             similarity_func = difference
@@ -330,42 +336,63 @@ class AvgSensitivity(Metric[List[float]]):
         batch_size = x_batch.shape[0]
         similarities = np.zeros((batch_size, self.nr_samples)) * np.nan
 
-        for step_id in range(self.nr_samples):
+        # Stack as many perturbation samples along the batch axis as the budget allows.
+        if self.explain_batch_size is None:
+            nr_samples_per_call = 1
+        else:
+            nr_samples_per_call = max(1, self.explain_batch_size // batch_size)
+
+        a_batch_flat = a_batch.reshape(batch_size, -1)
+        denominators = utils.apply_rowwise(self.norm_denominator, a_batch_flat)
+
+        for step_start in range(0, self.nr_samples, nr_samples_per_call):
+            step_ids = np.arange(
+                step_start, min(step_start + nr_samples_per_call, self.nr_samples)
+            )
+
             # Perturb input.
-            x_perturbed = perturb_batch(
-                perturb_func=self.perturb_func,
-                indices=np.tile(np.arange(0, x_batch[0].size), (batch_size, 1)),
-                indexed_axes=np.arange(0, x_batch[0].ndim),
-                arr=x_batch,
+            x_perturbed = np.concatenate(
+                [
+                    perturb_batch(
+                        perturb_func=self.perturb_func,
+                        indices=np.tile(np.arange(0, x_batch[0].size), (batch_size, 1)),
+                        indexed_axes=np.arange(0, x_batch[0].ndim),
+                        arr=x_batch,
+                    )
+                    for _ in step_ids
+                ]
             )
 
             changed_prediction_indices = self.changed_prediction_indices(
                 model, x_batch, x_perturbed
             )
 
-            for x_instance, x_instance_perturbed in zip(x_batch, x_perturbed):
-                warn.warn_perturbation_caused_no_change(
-                    x=x_instance,
-                    x_perturbed=x_instance_perturbed,
-                )
+            self.perturbation_check.batch(
+                x_batch=x_batch, x_perturbed_batch=x_perturbed
+            )
 
             # Generate explanation based on perturbed input x.
-            a_perturbed = self.explain_batch(model, x_perturbed, y_batch)
-
-            # Measure similarity for each instance separately.
-            for instance_id in range(batch_size):
-                if instance_id in changed_prediction_indices:
-                    similarities[instance_id, step_id] = np.nan
-                    continue
-
-                sensitivities = self.similarity_func(
-                    a=a_batch[instance_id].flatten(),
-                    b=a_perturbed[instance_id].flatten(),
-                )
-                numerator = self.norm_numerator(a=sensitivities)
-                denominator = self.norm_denominator(a=a_batch[instance_id].flatten())
-                sensitivities_norm = numerator / denominator
-                similarities[instance_id, step_id] = sensitivities_norm
+            a_perturbed = self.explain_batch(
+                model,
+                x_perturbed,
+                np.tile(y_batch, len(step_ids)),
+                nr_instances=batch_size,
+            )
+
+            # Measure similarity for all instances and samples at once.
+            sensitivities = utils.apply_rowwise(
+                self.similarity_func,
+                np.tile(a_batch_flat, (len(step_ids), 1)),
+                a_perturbed.reshape(len(x_perturbed), -1),
+            )
+            numerators = utils.apply_rowwise(
+                self.norm_numerator, sensitivities.reshape(len(x_perturbed), -1)
+            )
+            sensitivities_norm = numerators / np.tile(denominators, len(step_ids))
+            sensitivities_norm[changed_prediction_indices] = np.nan
+            similarities[:, step_ids] = sensitivities_norm.reshape(
+                len(step_ids), batch_size
+            ).T
 
         return self.mean_func(similarities, axis=1)
 
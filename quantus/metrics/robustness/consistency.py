@@ -67,6 +67,7 @@ class Consistency(Metric[List[float]]):
         normalise_func_kwargs: Optional[Dict[str, Any]] = None,
         return_aggregate: bool = False,
         aggregate_func: Optional[Callable] = None,
+        dataset_level: bool = False,
         default_plot_func: Optional[Callable] = None,
         disable_warnings: bool = False,
         display_progressbar: bool = False,
@@ -89,6 +90,10 @@ class Consistency(Metric[List[float]]):
             Indicates if an aggregated score should be computed over all instances.
         aggregate_func: callable
             Callable that aggregates the scores given an evaluation call.
+        dataset_level: boolean
+            Indicates whether each explanation is compared to the explanations of all instances of the call,
+            instead of only the instances of its batch. The instances are then looked up by their discretised
+            label, so the scores do not depend on batch_size, default=False.
         default_plot_func: callable
             Callable that plots the metrics result.
         disable_warnings: boolean
@@ -115,6 +120,7 @@ class Consistency(Metric[List[float]]):
         if discretise_func is None:
             discretise_func = top_n_sign
         self.discretise_func = discretise_func
+        self.dataset_level = dataset_level
         self.y_pred_classes = None
 
         # Asserts and warnings.
@@ -239,39 +245,73 @@ class Consistency(Metric[List[float]]):
 
     @staticmethod
     def evaluate_instance(
-        a: np.ndarray,
+        a_labels: np.ndarray,
         i: int,
-        a_label: np.ndarray,
         y_pred_classes: np.ndarray,
     ) -> float:
         """
-        Evaluate instance gets model and data for a single instance as input and returns the evaluation result.
+        Evaluate instance gets the discretised attribution labels and class predictions of all instances as input
+        and returns the evaluation result of the instance at index i. It is a thin wrapper around evaluate_groups().
 
         Parameters
         ----------
-        a: np.ndarray
-            The explanation to be evaluated on an instance-basis.
+        a_labels: np.ndarray
+            The discretised attribution labels of all instances.
         i: int
             The index of the current instance.
-        a_label: np.ndarray
-            The discretised attribution labels.
         y_pred_classes: np,ndarray
-            The class predictions of the complete input dataset.
+            The class predictions of all instances.
 
         Returns
         -------
         float
             The evaluation results.
         """
-        # Metric logic.
-        pred_a = y_pred_classes[i]
-        same_a = np.argwhere(a == a_label).flatten()
-        diff_a = same_a[same_a != i]
-        pred_same_a = y_pred_classes[diff_a]
+        return float(Consistency.evaluate_groups(a_labels, y_pred_classes)[i])
+
+    @staticmethod
+    def evaluate_groups(
+        a_labels: np.ndarray,
+        y_pred_classes: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Evaluate all instances at once, by grouping them by their discretised attribution label.
+
+        Each label is mapped to a compact integer id, and the predicted classes are counted per group,
+        such that each score is looked up from the class histogram of its group instead of scanning all labels.
+
+        Parameters
+        ----------
+        a_labels: np.ndarray
+            The discretised attribution labels of all instances.
+        y_pred_classes: np,ndarray
+            The class predictions of all instances.
 
-        if len(same_a) == 0:
-            return 0
-        return np.sum(pred_same_a == pred_a) / len(diff_a)
+        Returns
+        -------
+        np.ndarray
+            The evaluation results, one per instance.
+        """
+        _, label_ids = np.unique(a_labels, return_inverse=True)
+        _, class_ids = np.unique(y_pred_classes, return_inverse=True)
+        label_ids, class_ids = label_ids.reshape(-1), class_ids.reshape(-1)
+
+        # Sparse class histogram of each group, indexed by the (label id, class id) pairs that occur.
+        pair_ids = label_ids * (class_ids.max(initial=0) + 1) + class_ids
+        _, pair_inverse, pair_counts = np.unique(
+            pair_ids, return_inverse=True, return_counts=True
+        )
+        group_sizes = np.bincount(label_ids)
+
+        # Exclude the instance itself from its group.
+        nr_same = pair_counts[pair_inverse.reshape(-1)] - 1
+        nr_neighbours = group_sizes[label_ids] - 1
+        return np.divide(
+            nr_same,
+            nr_neighbours,
+            out=np.zeros(len(label_ids)),
+            where=nr_neighbours > 0,
+        )
 
     def custom_batch_preprocess(
         self, model: ModelInterface, x_batch: np.ndarray, a_batch: np.ndarray, **kwargs
@@ -287,7 +327,6 @@ class Consistency(Metric[List[float]]):
         y_pred_classes = np.argmax(model.predict(x_input), axis=1).flatten()
 
         return {
-            "i_batch": np.arange(x_batch.shape[0]),
             "a_label_batch": a_labels,
             "y_pred_classes": y_pred_classes,
         }
@@ -296,7 +335,6 @@ class Consistency(Metric[List[float]]):
     def evaluate_batch(
         self,
         a_batch: np.ndarray,
-        i_batch: np.ndarray,
         a_label_batch: np.ndarray,
         y_pred_classes: np.ndarray,
         **kwargs,
@@ -309,8 +347,6 @@ class Consistency(Metric[List[float]]):
         ----------
         a_batch:
             Batch of explanation to be evaluated.
-        i_batch:
-            Batch of segmentations to be evaluated.
         a_label_batch:
             Batch of discretised attribution labels.
         y_pred_classes:
@@ -324,7 +360,33 @@ class Consistency(Metric[List[float]]):
             Evaluation results.
         """
 
-        return [
-            self.evaluate_instance(a, i, a_label, y_pred_classes)
-            for a, i, a_label in zip(a_batch, i_batch, a_label_batch)
-        ]
+        if self.dataset_level:
+            # Collect labels and predictions, they are evaluated in custom_postprocess.
+            return [
+                {"a_label": a_label, "y_pred": y_pred}
+                for a_label, y_pred in zip(a_label_batch, y_pred_classes)
+            ]
+
+        return self.evaluate_groups(a_label_batch, y_pred_classes).tolist()
+
+    def custom_postprocess(self, **kwargs) -> None:
+        """
+        Post-process the evaluation results. If dataset_level is set, each explanation is evaluated against
+        the explanations of all instances.
+
+        Parameters
+        ----------
+        kwargs:
+            Unused.
+
+        Returns
+        -------
+        None
+        """
+        if not self.dataset_level:
+            return
+
+        self.evaluation_scores = self.evaluate_groups(
+            np.array([r["a_label"] for r in self.evaluation_scores]),
+            np.array([r["y_pred"] for r in self.evaluation_scores]),
+        ).tolist()
@@ -5,12 +5,12 @@
 # Quantus is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more details.
 # You should have received a copy of the GNU Lesser General Public License along with Quantus. If not, see <https://www.gnu.org/licenses/>.
 # Quantus project URL: <https://github.com/understandable-machine-intelligence-lab/Quantus>.
-import itertools
 import sys
 from typing import Any, Callable, Dict, List, Optional
 
 import numpy as np
 
+from quantus.functions.normalise_func import normalise_by_max
 from quantus.functions.perturb_func import translation_x_direction
 from quantus.functions.similarity_func import lipschitz_constant
 from quantus.helpers import asserts, utils, warn
@@ -303,70 +303,129 @@ class Continuity(Metric[List[float]]):
         """
         results: Dict[int, list] = {k: [] for k in range(self.nr_patches + 1)}
 
-        for step in range(self.nr_steps):
-            # Generate explanation based on perturbed input x.
-            dx_step = (step + 1) * self.dx
-            x_perturbed = self.perturb_func(
-                arr=x,
-                indices=np.arange(0, x.size),
-                indexed_axes=np.arange(0, x.ndim),
-                perturb_dx=dx_step,
-            )
-            x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
+        # Translate the input for all steps, to explain and predict them as one batch.
+        x_perturbed = np.stack(
+            [
+                self.perturb_func(
+                    arr=x,
+                    indices=np.arange(0, x.size),
+                    indexed_axes=np.arange(0, x.ndim),
+                    perturb_dx=(step + 1) * self.dx,
+                )
+                for step in range(self.nr_steps)
+            ]
+        ).reshape((self.nr_steps,) + x.shape)
+        x_input = model.shape_input(
+            x_perturbed, x_perturbed.shape, channel_first=True, batched=True
+        )
+        y_pred_perturbed = model.predict(x_input)
 
-            prediction_changed = (
-                self.return_nan_when_prediction_changes
-                and model.predict(np.expand_dims(x, 0)).argmax(axis=-1)[0]
-                != model.predict(x_input).argmax(axis=-1)[0]
-            )
-            # Taking the first element, since a_perturbed will be expanded to a batch dimension
-            # not expected by the current index management functions.
-            a_perturbed = self.explain_batch(model, x_input, np.expand_dims(y, 0))[0]
+        if self.return_nan_when_prediction_changes:
+            y_pred_label = model.predict(np.expand_dims(x, 0)).argmax(axis=-1)[0]
+            prediction_changed = y_pred_perturbed.argmax(axis=-1) != y_pred_label
+        else:
+            prediction_changed = np.zeros(self.nr_steps, dtype=bool)
 
-            # Store the prediction score as the last element of the sub_self.evaluation_scores dictionary.
-            y_pred = float(model.predict(x_input)[:, y])
+        # Explain each step separately normalised, as if it was explained on its own.
+        a_perturbed = self.explain_batch(
+            model, x_input, np.full(self.nr_steps, y), nr_instances=1
+        )
 
-            results[self.nr_patches].append(y_pred)
+        # Store the prediction score as the last element of the sub_self.evaluation_scores dictionary.
+        results[self.nr_patches].extend(y_pred_perturbed[:, y].astype(float).tolist())
 
-            # Create patches by splitting input into grid. Take x_input[0] to avoid batch axis,
-            # which a_axes is not tuned for
-            axis_iterators = [
-                range(0, x_input[0].shape[axis], self.patch_size)
-                for axis in self.a_axes
-            ]
+        patch_sums = self._get_patch_sums(a_perturbed)
+        patch_sums[prediction_changed] = np.nan
+        for ix_patch in range(patch_sums.shape[1]):
+            results[ix_patch].extend(patch_sums[:, ix_patch].tolist())
 
-            for ix_patch, top_left_coords in enumerate(
-                itertools.product(*axis_iterators)
-            ):
-                if prediction_changed:
-                    results[ix_patch].append(np.nan)
-                    continue
-
-                # Create slice for patch.
-                patch_slice = utils.create_patch_slice(
-                    patch_size=self.patch_size,
-                    coords=top_left_coords,
-                )
+        return results
 
-                a_perturbed_patch = a_perturbed[
-                    utils.expand_indices(a_perturbed, patch_slice, self.a_axes)
-                ]
+    def _get_patch_sums(self, a_batch: np.ndarray) -> np.ndarray:
+        """
+        Sum the attributions of all patches of a grid with stride patch_size, for all explanations at once.
 
-                # Taking the first element, since a_perturbed will be expanded to a batch dimension
-                # not expected by the current index management functions.
-                # a_perturbed = utils.expand_attribution_channel(a_perturbed, x_input)[0]
+        Patches are ordered as the top-left coordinates of the grid are iterated, with the last axis
+        varying fastest. If normalise is set, each patch is normalised before it is summed.
 
-                if self.normalise:
-                    a_perturbed_patch = self.normalise_func(a_perturbed_patch.flatten())
+        Parameters
+        ----------
+        a_batch: np.ndarray
+            The batch of explanations.
 
-                if self.abs:
-                    a_perturbed_patch = np.abs(a_perturbed_patch.flatten())
+        Returns
+        -------
+        np.ndarray
+            The patch sums, with shape (batch_size, nr_patches).
+        """
+        # Pad the patched axes to a multiple of patch_size, patches at the border are cut off.
+        a_axes = [axis + 1 for axis in self.a_axes]
+        pad_width = [
+            (0, -a_batch.shape[axis] % self.patch_size) if axis in a_axes else (0, 0)
+            for axis in range(a_batch.ndim)
+        ]
+        a_patches = self._split_into_patches(np.pad(a_batch, pad_width), a_axes)
+
+        if not self.normalise:
+            if self.abs:
+                a_patches = np.abs(a_patches)
+            return a_patches.sum(axis=-1).astype(float)
+
+        if self.normalise_func is normalise_by_max:
+            # Dividing each patch by its maximum absolute value commutes with the sum.
+            a_max = np.abs(a_patches).max(axis=-1)
+            if self.abs:
+                a_patches = np.abs(a_patches)
+            return np.divide(
+                a_patches.sum(axis=-1).astype(float),
+                a_max,
+                out=np.zeros(a_max.shape),
+                where=a_max != 0,
+            )
 
-                # Sum attributions for patch.
-                patch_sum = float(sum(a_perturbed_patch))
-                results[ix_patch].append(patch_sum)
+        # Other normalisation functions are applied to each patch, without the padding.
+        valid = self._split_into_patches(
+            np.pad(np.ones((1,) + a_batch.shape[1:], dtype=bool), pad_width), a_axes
+        )[0]
+        patch_sums = np.zeros(a_patches.shape[:2])
+        for index in np.ndindex(*patch_sums.shape):
+            a_patch = self.normalise_func(a_patches[index][valid[index[1]]])
+            if self.abs:
+                a_patch = np.abs(a_patch)
+            patch_sums[index] = np.sum(a_patch)
+        return patch_sums
+
+    def _split_into_patches(self, arr: np.ndarray, axes: List[int]) -> np.ndarray:
+        """
+        Split a batch of arrays into non-overlapping patches along the given axes.
 
-        return results
+        Parameters
+        ----------
+        arr: np.ndarray
+            The batch of arrays, the axes need to be multiples of patch_size.
+        axes: list
+            The axes of arr to split into patches.
+
+        Returns
+        -------
+        np.ndarray
+            The flattened patches, with shape (batch_size, nr_patches, patch_elements).
+        """
+        patch_shape = [len(arr)]
+        grid_axes, patch_axes = [], []
+        for axis in range(1, arr.ndim):
+            if axis in axes:
+                grid_axes.append(len(patch_shape))
+                patch_axes.append(len(patch_shape) + 1)
+                patch_shape += [arr.shape[axis] // self.patch_size, self.patch_size]
+            else:
+                patch_axes.append(len(patch_shape))
+                patch_shape.append(arr.shape[axis])
+
+        arr = arr.reshape(patch_shape).transpose([0] + grid_axes + patch_axes)
+        return arr.reshape(
+            len(arr), int(np.prod([patch_shape[axis] for axis in grid_axes])), -1
+        )
 
     def custom_preprocess(
         self,
@@ -347,11 +347,9 @@ class LocalLipschitzEstimate(Metric[List[float]]):
                 model, x_batch, x_perturbed
             )
 
-            for x_instance, x_instance_perturbed in zip(x_batch, x_perturbed):
-                warn.warn_perturbation_caused_no_change(
-                    x=x_instance,
-                    x_perturbed=x_instance_perturbed,
-                )
+            self.perturbation_check.batch(
+                x_batch=x_batch, x_perturbed_batch=x_perturbed
+            )
 
             # Generate explanation based on perturbed input x.
             a_perturbed = self.explain_batch(model, x_perturbed, y_batch)
@@ -337,7 +337,11 @@ class RelativeOutputStability(Metric[List[float]]):
 
             # If perturbed input caused change in prediction, then it's ROS=nan.
             changed_prediction_indices = self.changed_prediction_indices_func(
-                model, x_batch, x_perturbed
+                model,
+                x_batch,
+                x_perturbed,
+                y_pred=logits,
+                y_pred_perturbed=logits_perturbed,
             )
 
             if len(changed_prediction_indices) != 0:
@@ -489,3 +489,151 @@ def test_no_perturbation(
 ):
     out = no_perturbation(arr=data, **params)
     assert (out == data).all() == expected, "Test failed."
+
+
+@pytest.mark.perturb_func
+@pytest.mark.parametrize(
+    "data,params,expected",
+    [
+        (
+            np.full((3, 28, 28), 0.5),
+            {"indices": np.arange(0, 784, 3), "noise": 0.0},
+            0.5,
+        ),
+        (
+            np.full((1, 28, 28), -1.0),
+            {"indices": np.arange(700), "noise": 0.0},
+            -1.0,
+        ),
+        (
+            np.full((3, 20, 12), 2.0),
+            {"indices": [0, 11, 12, 100, 239], "noise": 0.0},
+            2.0,
+        ),
+        (
+            lazy_fixture("input_uniform_mnist"),
+            {"indices": np.array([], dtype=int), "noise": 0.0},
+            None,
+        ),
+    ],
+)
+def test_noisy_linear_imputation(
+    data: np.ndarray, params: dict, expected: Union[float, dict, bool]
+):
+    out = noisy_linear_imputation(arr=data, **params)
+
+    mask = np.zeros(data.shape[1:], dtype=bool).flatten()
+    mask[params["indices"]] = True
+    mask = mask.reshape(data.shape[1:])
+
+    # The elements outside of the mask are kept and a constant input is imputed by the constant.
+    assert np.all(out[:, ~mask] == data[:, ~mask]), "Test failed."
+    if expected is not None:
+        assert np.allclose(out[:, mask], expected), "Test failed."
+
+
+def _lil_matrix_noisy_linear_imputation(arr: np.ndarray, indices: np.ndarray):
+    """The noisy linear imputation (without noise) with the equation system assembled offset by offset."""
+    from scipy.sparse import csc_matrix, lil_matrix
+    from scipy.sparse.linalg import spsolve
+
+    offset_weight = [
+        ((1, 1), 1 / 12),
+        ((0, 1), 1 / 6),
+        ((-1, 1), 1 / 12),
+        ((1, -1), 1 / 12),
+        ((0, -1), 1 / 6),
+        ((-1, -1), 1 / 12),
+        ((1, 0), 1 / 6),
+        ((-1, 0), 1 / 6),
+    ]
+    arr_flat = arr.reshape((arr.shape[0], -1))
+
+    mask = np.ones(arr_flat.shape[1])
+    mask[indices] = 0
+
+    ind_to_var_ids = np.zeros(arr_flat.shape[1], dtype=int)
+    ind_to_var_ids[indices] = np.arange(len(indices))
+
+    a = lil_matrix((len(indices), len(indices)))
+    b = np.zeros((len(indices), arr.shape[0]))
+    sum_neighbors = np.ones(len(indices))
+
+    for offset, weight in offset_weight:
+        off_coords, valid = utils.offset_coordinates(indices, offset, arr.shape)
+        valid_ids = np.argwhere(valid == 1).flatten()
+
+        in_off_coord = off_coords[mask[off_coords] == 1]
+        in_off_coord_ids = valid_ids[mask[off_coords] == 1]
+        b[in_off_coord_ids, :] -= weight * arr_flat[:, in_off_coord].T
+
+        out_off_coord = off_coords[mask[off_coords] != 1]
+        out_off_coord_ids = valid_ids[mask[off_coords] != 1]
+        a[out_off_coord_ids, ind_to_var_ids[out_off_coord]] = weight
+
+        sum_neighbors[np.argwhere(valid == 0).flatten()] -= weight
+
+    a[np.arange(len(indices)), np.arange(len(indices))] = -sum_neighbors
+
+    arr_flat_copy = np.copy(arr_flat)
+    arr_flat_copy[:, indices] = np.transpose(spsolve(csc_matrix(a), b))
+    return arr_flat_copy.reshape(*arr.shape)
+
+
+@pytest.mark.perturb_func
+@pytest.mark.parametrize("shape", [(3, 28, 28), (1, 20, 12)])
+def test_noisy_linear_imputation_lil_matrix(shape: tuple):
+    rng = np.random.default_rng(0)
+    arr = rng.uniform(0, 1, size=shape)
+    indices = np.flatnonzero(rng.uniform(size=shape[1] * shape[2]) < 0.4)
+
+    # The vectorised equation system gives the same imputation as assembling it offset by offset.
+    out = noisy_linear_imputation(arr=arr, indices=indices, noise=0.0)
+    expected = _lil_matrix_noisy_linear_imputation(arr=arr, indices=indices)
+    assert np.allclose(out, expected, rtol=0, atol=1e-12), "Test failed."
+
+
+@pytest.mark.perturb_func
+@pytest.mark.parametrize(
+    "perturb_func,params",
+    [
+        (gaussian_noise, {"indexed_axes": [0, 1, 2], "perturb_std": 0.2}),
+        (uniform_noise, {"indexed_axes": [1, 2], "lower_bound": 0.2}),
+        (
+            uniform_noise,
+            {"indexed_axes": [0, 1, 2], "lower_bound": 0.1, "upper_bound": 0.3},
+        ),
+        (
+            baseline_replacement_by_indices,
+            {"indexed_axes": [1, 2], "perturb_baseline": "mean"},
+        ),
+        (
+            baseline_replacement_by_indices,
+            {"indexed_axes": [0, 1, 2], "perturb_baseline": "uniform"},
+        ),
+        (
+            baseline_replacement_by_indices,
+            {"indexed_axes": [0, 1], "perturb_baseline": 0.5},
+        ),
+        (baseline_replacement_by_shift, {"indexed_axes": [1, 2], "input_shift": -1}),
+    ],
+)
+def test_perturb_batch(perturb_func: Callable, params: dict):
+    arr = np.random.uniform(0, 1, size=(4, 3, 8, 8)).astype(np.float32)
+    nr_indices = int(np.prod([arr.shape[1 + axis] for axis in params["indexed_axes"]]))
+    indices = np.stack(
+        [np.random.permutation(nr_indices)[: nr_indices // 2] for _ in range(len(arr))]
+    )
+
+    # The batch-native implementation matches applying perturb_func to each instance.
+    np.random.seed(42)
+    expected = arr.copy()
+    for i in range(len(arr)):
+        expected[i] = perturb_func(arr=arr[i], indices=indices[i][1:], **params)
+
+    np.random.seed(42)
+    out = perturb_batch(perturb_func=perturb_func, arr=arr, indices=indices, **params)
+
+    assert perturb_func in BATCH_PERTURB_FUNCS, "Test failed."
+    assert out.dtype == arr.dtype, "Test failed."
+    assert np.array_equal(out, expected), "Test failed."
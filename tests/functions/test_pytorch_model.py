@@ -1,3 +1,4 @@
+import copy
 from collections import OrderedDict
 from contextlib import nullcontext
 from typing import Union
@@ -71,6 +72,35 @@ def test_get_softmax_arg_model(
     assert np.allclose(sm_out, softmax(no_sm_out)), "Test failed."
 
 
+@pytest.mark.pytorch_model
+@pytest.mark.parametrize(
+    "model",
+    [
+        lazy_fixture("load_mnist_model"),
+        lazy_fixture("load_mnist_model_softmax_not_last"),
+        lazy_fixture("load_mnist_model_softmax"),
+    ],
+)
+def test_get_softmax_arg_model_cached(model: torch.nn.Module):
+    model.eval()
+    model_wrapped = PyTorchModel(model, softmax=True)
+
+    sm_model = model_wrapped.get_softmax_arg_model()
+    assert model_wrapped.get_softmax_arg_model() is sm_model, "Test failed."
+
+    model_wrapped.softmax = False
+    no_sm_model = model_wrapped.get_softmax_arg_model()
+    assert model_wrapped.get_softmax_arg_model() is no_sm_model, "Test failed."
+
+    model_wrapped.softmax = True
+    assert model_wrapped.get_softmax_arg_model() is sm_model, "Test failed."
+
+    # Replacing the model drops the adjusted models of the previous one.
+    model_wrapped.model = copy.deepcopy(model)
+    assert model_wrapped.get_softmax_arg_model() is not sm_model, "Test failed."
+    assert len(model_wrapped._softmax_arg_models) == 1, "Test failed."
+
+
 @pytest.mark.pytorch_model
 @pytest.mark.parametrize(
     "data,params,expected",
@@ -211,6 +241,36 @@ def test_get_random_layer_generator(load_mnist_model):
         assert layer != new_layer, "Test failed."
 
 
+@pytest.mark.pytorch_model
+@pytest.mark.parametrize("order", ["top_down", "bottom_up", "independent"])
+def test_get_random_layer_generator_in_place(load_mnist_model, order: str):
+    model = PyTorchModel(load_mnist_model, channel_first=True)
+    before = {k: v.clone() for k, v in model.state_dict().items()}
+
+    # The model randomised in place matches the randomised copy after every layer.
+    randomised = [
+        (layer_name, {k: v.clone() for k, v in random_layer_model.state_dict().items()})
+        for layer_name, random_layer_model in model.get_random_layer_generator(
+            order=order
+        )
+    ]
+    for (layer_name, state_dict), (layer_name_in_place, model_in_place) in zip(
+        randomised, model.get_random_layer_generator(order=order, in_place=True)
+    ):
+        assert layer_name == layer_name_in_place, "Test failed."
+        assert model_in_place is model.get_model(), "Test failed."
+        for k, v in model_in_place.state_dict().items():
+            assert torch.equal(v, state_dict[k]), "Test failed."
+
+    # The original parameters are restored, also if the generator is closed early.
+    generator = model.get_random_layer_generator(order=order, in_place=True)
+    next(generator)
+    next(generator)
+    generator.close()
+    for k, v in model.state_dict().items():
+        assert torch.equal(v, before[k]), "Test failed."
+
+
 @pytest.mark.pytorch_model
 @pytest.mark.parametrize(
     "params",
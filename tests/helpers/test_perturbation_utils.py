@@ -0,0 +1,350 @@
+import functools
+import warnings
+from typing import Union
+
+import numpy as np
+import pytest
+
+from quantus.functions.perturb_func import baseline_replacement_by_indices
+from quantus.helpers.perturbation_utils import (
+    PerturbationCheck,
+    generate_cumulative_perturbations,
+    generate_rank_perturbations,
+    get_ordered_patches,
+    make_changed_prediction_indices_func,
+    predict_on_perturbations,
+)
+
+
+@pytest.mark.utils
+@pytest.mark.parametrize(
+    "params,expected",
+    [
+        (
+            {
+                "a": np.array([1.0, 6.0, 0.0, 2.0, 3.0, 0.5]),
+                "patch_size": 2,
+                "indexed_axes": [0],
+                "order": "morf",
+            },
+            {"value": [(slice(1, 3),), (slice(4, 6),), (slice(6, 8),)]},
+        ),
+        (
+            {
+                "a": np.array([1.0, 6.0, 0.0, 2.0, 3.0, 0.5]),
+                "patch_size": 2,
+                "indexed_axes": [0],
+                "order": "lerf",
+                "max_patches": 2,
+            },
+            {"value": [(slice(6, 8),), (slice(3, 5),)]},
+        ),
+        (
+            {
+                "a": np.array([[0.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 9.0]]),
+                "patch_size": 2,
+                "indexed_axes": [0, 1],
+                "order": "morf",
+                "max_patches": 1,
+            },
+            {"value": [(slice(2, 4), slice(2, 4))]},
+        ),
+        (
+            {
+                "a": np.arange(36, dtype=float).reshape(1, 6, 6),
+                "patch_size": 3,
+                "indexed_axes": [1, 2],
+                "order": "morf",
+                "max_patches": 1,
+            },
+            {"value": [(slice(5, 8), slice(5, 8))]},
+        ),
+        (
+            {
+                "a": np.ones((6,)),
+                "patch_size": 2,
+                "indexed_axes": [0],
+                "order": "mofr",
+            },
+            {"exception": ValueError},
+        ),
+    ],
+)
+def test_get_ordered_patches(params: dict, expected: Union[dict, list]):
+    if "exception" in expected:
+        with pytest.raises(expected["exception"]):
+            get_ordered_patches(**params)
+        return
+
+    out = get_ordered_patches(**params)
+    assert out == expected["value"], "Test failed."
+
+
+@pytest.mark.utils
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"shape": (1, 28, 28), "patch_size": 4, "indexed_axes": [1, 2]},
+        {"shape": (3, 20, 17), "patch_size": 5, "indexed_axes": [1, 2]},
+        {"shape": (1, 64), "patch_size": 9, "indexed_axes": [0, 1]},
+        {"shape": (32,), "patch_size": 3, "indexed_axes": [0]},
+    ],
+)
+def test_get_ordered_patches_no_overlap(params: dict):
+    a = np.random.uniform(0, 1, size=params["shape"])
+    pad_width = params["patch_size"] - 1
+    a_pad = np.pad(
+        a,
+        [
+            (pad_width, pad_width) if axis in params["indexed_axes"] else (0, 0)
+            for axis in range(a.ndim)
+        ],
+    )
+
+    out = get_ordered_patches(
+        a=a, patch_size=params["patch_size"], indexed_axes=params["indexed_axes"]
+    )
+
+    # Patches must not overlap and the ordering must be by descending attribution sum.
+    coverage = np.zeros([a_pad.shape[axis] for axis in params["indexed_axes"]])
+    for patch_slice in out:
+        coverage[patch_slice] += 1
+    assert coverage.max() == 1, "Test failed."
+
+    non_indexed_axes = tuple(
+        axis for axis in range(a.ndim) if axis not in params["indexed_axes"]
+    )
+    a_sum = a_pad.sum(axis=non_indexed_axes)
+    sums = [a_sum[patch_slice].sum() for patch_slice in out]
+    assert np.all(np.diff(sums) <= 1e-8), "Test failed."
+
+
+class _CountingModel:
+    def __init__(self):
+        self.inputs = []
+
+    def predict(self, x):
+        self.inputs.append(x)
+        return np.stack([x.reshape(len(x), -1).sum(axis=1), np.zeros(len(x))], axis=1)
+
+    def shape_input(self, x, shape, channel_first, batched):
+        return x
+
+
+@pytest.mark.utils
+def test_changed_prediction_indices_cached():
+    model = _CountingModel()
+    func = make_changed_prediction_indices_func(True)
+    x_batch = np.array([[1.0, 1.0], [1.0, 1.0], [-1.0, 0.0]])
+
+    for _ in range(5):
+        x_perturbed = x_batch.copy()
+        x_perturbed[0] = -1.0
+        assert func(model, x_batch, x_perturbed) == [0], "Test failed."
+
+    # The unperturbed batch is predicted once, the perturbed inputs on every call.
+    assert sum(x is x_batch for x in model.inputs) == 1, "Test failed."
+    assert len(model.inputs) == 6, "Test failed."
+
+    # A new batch, even with equal values, is predicted again.
+    x_batch = x_batch.copy()
+    func(model, x_batch, x_batch + 1.0)
+    assert sum(x is x_batch for x in model.inputs) == 1, "Test failed."
+
+    # Precomputed predictions are used as given.
+    n_calls = len(model.inputs)
+    y_pred = model.predict(x_batch)
+    assert func(
+        model, x_batch, x_batch, y_pred=y_pred, y_pred_perturbed=y_pred[::-1]
+    ) == [0, 2], "Test failed."
+    assert len(model.inputs) == n_calls + 1, "Test failed."
+
+
+@pytest.mark.utils
+@pytest.mark.parametrize("chunk_size", [1, 3, 10])
+def test_generate_rank_perturbations(chunk_size: int):
+    arr = np.random.uniform(0, 1, size=(3, 6, 6)).astype(np.float32)
+    rank_map = np.random.permutation(np.arange(36) % 5).reshape(1, 6, 6)
+
+    expected = list(
+        generate_cumulative_perturbations(
+            perturb_func=functools.partial(
+                baseline_replacement_by_indices, perturb_baseline=0.5
+            ),
+            arr=arr,
+            indices_steps=[np.flatnonzero(rank_map == k) for k in range(5)],
+            indexed_axes=[1, 2],
+        )
+    )
+    chunks = list(
+        generate_rank_perturbations(
+            arr=arr,
+            rank_map=rank_map,
+            fill_values=np.full((3, 1, 1), 0.5),
+            nr_steps=5,
+            chunk_size=chunk_size,
+        )
+    )
+    out = np.concatenate(chunks)
+
+    assert all(len(chunk) <= chunk_size for chunk in chunks), "Test failed."
+    assert len(out) == len(expected), "Test failed."
+    for x_out, x_expected in zip(out, expected):
+        assert x_out.dtype == arr.dtype, "Test failed."
+        assert np.array_equal(x_out, x_expected), "Test failed."
+
+
+def _count_no_change_warnings(func) -> int:
+    with warnings.catch_warnings(record=True) as records:
+        warnings.simplefilter("always")
+        func()
+    return sum("didn't cause change" in str(record.message) for record in records)
+
+
+@pytest.mark.utils
+@pytest.mark.parametrize(
+    "params,expected",
+    [
+        ({"policy": "always"}, {"single": 8, "batch": 1}),
+        ({"policy": "off"}, {"single": 0, "batch": 0}),
+        ({"policy": "first_n", "n": 3}, {"single": 3, "batch": 0}),
+        ({"policy": "first_n", "n": 10}, {"single": 8, "batch": 1}),
+        ({"policy": "sampled", "sample_rate": 0.0}, {"single": 0, "batch": 0}),
+        ({"policy": "sampled", "sample_rate": 1.0}, {"single": 8, "batch": 1}),
+        ({"policy": "sometimes"}, {"exception": ValueError}),
+    ],
+)
+def test_perturbation_check(params: dict, expected: dict):
+    if "exception" in expected:
+        with pytest.raises(expected["exception"]):
+            PerturbationCheck(**params)
+        return
+
+    x_batch = np.random.uniform(0, 1, size=(4, 3, 5))
+    x_perturbed = np.concatenate([x_batch, x_batch + 1.0])
+
+    # Every unchanged input warns when checked one by one, a checked stack warns at most once.
+    check = PerturbationCheck(**params)
+    nr_warnings = _count_no_change_warnings(
+        lambda: [check(x=x_batch[0], x_perturbed=x_batch[0]) for _ in range(8)]
+    )
+    assert nr_warnings == expected["single"], "Test failed."
+    nr_warnings = _count_no_change_warnings(
+        lambda: check.batch(x_batch=x_batch, x_perturbed_batch=x_perturbed)
+    )
+    assert nr_warnings == expected["batch"], "Test failed."
+
+    # A reset check selects the same inputs again.
+    if params["policy"] == "first_n":
+        check.reset()
+        nr_warnings = _count_no_change_warnings(
+            lambda: [check(x=x_batch[0], x_perturbed=x_batch[0]) for _ in range(8)]
+        )
+        assert nr_warnings == expected["single"], "Test failed."
+
+    # Changed inputs never warn.
+    check = PerturbationCheck(**params)
+    nr_warnings = _count_no_change_warnings(
+        lambda: check.batch(x_batch=x_batch, x_perturbed_batch=x_perturbed[4:])
+    )
+    assert nr_warnings == 0, "Test failed."
+
+
+@pytest.mark.utils
+def test_perturbation_check_sampled():
+    x_batch = np.zeros((10, 4))
+    check = PerturbationCheck(policy="sampled", sample_rate=0.2, seed=1)
+
+    # The sample is drawn from the generator of the check, not the global random state.
+    np.random.seed(0)
+    expected = np.random.rand()
+    np.random.seed(0)
+    for _ in range(100):
+        check.batch(x_batch=x_batch, x_perturbed_batch=x_batch + 1.0)
+    assert np.random.rand() == expected, "Test failed."
+    assert 100 < check.nr_checked < 300, "Test failed."
+
+
+@pytest.mark.utils
+@pytest.mark.parametrize(
+    "check_against_previous,expected",
+    [(False, {"nr_warnings": 0}), (True, {"nr_warnings": 2})],
+)
+def test_generate_cumulative_perturbations_check_against_previous(
+    check_against_previous: bool, expected: dict
+):
+    arr = np.random.uniform(1, 2, size=(1, 4))
+
+    # Re-perturbing an already perturbed index leaves the previous step unchanged, but not arr.
+    nr_warnings = _count_no_change_warnings(
+        lambda: list(
+            generate_cumulative_perturbations(
+                perturb_func=functools.partial(
+                    baseline_replacement_by_indices, perturb_baseline=0.0
+                ),
+                arr=arr,
+                indices_steps=[[0], [0], [1], [1]],
+                indexed_axes=[1],
+                perturbation_check=PerturbationCheck(),
+                check_against_previous=check_against_previous,
+            )
+        )
+    )
+    assert nr_warnings == expected["nr_warnings"], "Test failed."
+
+
+@pytest.mark.utils
+@pytest.mark.parametrize(
+    "check_against_previous,expected",
+    [(False, {"nr_warnings": 0}), (True, {"nr_warnings": 2})],
+)
+def test_generate_rank_perturbations_check_against_previous(
+    check_against_previous: bool, expected: dict
+):
+    arr = np.random.uniform(1, 2, size=(1, 4))
+
+    # Ranks without positions leave the previous step unchanged, but not arr.
+    nr_warnings = _count_no_change_warnings(
+        lambda: list(
+            generate_rank_perturbations(
+                arr=arr,
+                rank_map=np.array([[0, 0, 2, 4]]),
+                fill_values=np.zeros((1, 1)),
+                nr_steps=5,
+                chunk_size=3,
+                perturbation_check=PerturbationCheck(),
+                check_against_previous=check_against_previous,
+            )
+        )
+    )
+    assert nr_warnings == expected["nr_warnings"], "Test failed."
+
+
+@pytest.mark.utils
+@pytest.mark.parametrize("predict_batch_size", [1, 4, 7, 100])
+def test_predict_on_perturbations_stacked(predict_batch_size: int):
+    x_perturbed_batch = [
+        np.random.uniform(0, 1, size=(nr_steps, 2, 3)) for nr_steps in [5, 1, 9]
+    ]
+    chunk_sizes = [2, 1, 4]
+
+    expected = predict_on_perturbations(
+        model=_CountingModel(),
+        x_perturbed_batch=x_perturbed_batch,
+        predict_batch_size=predict_batch_size,
+    )
+    model = _CountingModel()
+    out = predict_on_perturbations(
+        model=model,
+        x_perturbed_batch=[
+            np.split(x, np.arange(chunk_size, len(x), chunk_size))
+            for x, chunk_size in zip(x_perturbed_batch, chunk_sizes)
+        ],
+        predict_batch_size=predict_batch_size,
+        stacked=True,
+    )
+
+    assert all(len(x) <= predict_batch_size for x in model.inputs), "Test failed."
+    assert len(model.inputs) == -(-15 // predict_batch_size), "Test failed."
+    for y_out, y_expected in zip(out, expected):
+        assert np.array_equal(y_out, y_expected), "Test failed."
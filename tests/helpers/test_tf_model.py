@@ -1,3 +1,4 @@
+import gc
 from functools import reduce
 from operator import and_
 from typing import Union
@@ -98,6 +99,67 @@ def test_predict(
     assert np.allclose(out, expected), "Test failed."
 
 
+@pytest.mark.tf_model
+@pytest.mark.parametrize(
+    "data,params,expected",
+    [
+        (
+            np.random.uniform(0, 1, size=(4, 28, 28, 1)),
+            {"softmax": False},
+            {"direct_call": True},
+        ),
+        (
+            np.random.uniform(0, 1, size=(4, 28, 28, 1)),
+            {"softmax": True},
+            {"direct_call": True},
+        ),
+        (
+            np.random.uniform(0, 1, size=(100, 28, 28, 1)),
+            {"softmax": False},
+            {"direct_call": False},
+        ),
+        (
+            np.random.uniform(0, 1, size=(4, 28, 28, 1)),
+            {"softmax": False, "model_predict_kwargs": {"batch_size": 2}},
+            {"direct_call": False},
+        ),
+    ],
+)
+def test_predict_direct_call(
+    data: np.ndarray,
+    params: dict,
+    expected: dict,
+    load_mnist_model_tf,
+):
+    model = TensorFlowModel(model=load_mnist_model_tf, **params)
+    out = model.predict(x=data)
+    out_keras = model.get_softmax_arg_model().predict(data, verbose=0)
+
+    assert np.allclose(out, out_keras, atol=1e-6), "Test failed."
+    direct_call = len(model._forward_functions) > 0
+    assert direct_call == expected["direct_call"], "Test failed."
+
+
+@pytest.mark.tf_model
+def test_get_forward_function_weak_reference(load_mnist_model_tf):
+    model = TensorFlowModel(model=load_mnist_model_tf, softmax=True)
+    predict_model = tf.keras.models.clone_model(load_mnist_model_tf)
+    x = np.random.uniform(0, 1, size=(4, 28, 28, 1)).astype(np.float32)
+
+    forward_function = model._get_forward_function(predict_model)
+    assert np.allclose(
+        forward_function(x).numpy(), predict_model(x, training=False).numpy()
+    ), "Test failed."
+    assert (
+        model._get_forward_function(predict_model) is forward_function
+    ), "Test failed."
+
+    # The compiled forward pass is dropped together with its model.
+    del forward_function, predict_model
+    gc.collect()
+    assert len(model._forward_functions) == 0, "Test failed."
+
+
 @pytest.mark.tf_model
 @pytest.mark.parametrize(
     "data,params,expected",
@@ -159,6 +221,45 @@ def test_get_random_layer_generator(load_mnist_model_tf):
     ), "Test failed."
 
 
+@pytest.mark.tf_model
+@pytest.mark.parametrize("order", ["top_down", "bottom_up", "independent"])
+def test_get_random_layer_generator_in_place(load_mnist_model_tf, order: str):
+    model = TensorFlowModel(model=load_mnist_model_tf, channel_first=False)
+    before = model.state_dict()
+
+    # Each layer is randomised from the original weights. In cascading orders, the previously
+    # randomised layers stay randomised.
+    original_weights = {
+        layer.name: layer.get_weights() for layer in load_mnist_model_tf.layers
+    }
+    randomised_layers = []
+    for layer_name, model_in_place in model.get_random_layer_generator(
+        order=order, in_place=True
+    ):
+        assert model_in_place is model.get_model(), "Test failed."
+        if order == "independent":
+            randomised_layers = []
+        randomised_layers.append(layer_name)
+
+        for layer in model_in_place.layers:
+            is_equal = [
+                np.array_equal(x, y)
+                for x, y in zip(layer.get_weights(), original_weights[layer.name])
+            ]
+            if layer.name in randomised_layers:
+                assert not all(is_equal), "Test failed."
+            else:
+                assert all(is_equal), "Test failed."
+
+    # The original weights are restored, also if the generator is closed early.
+    generator = model.get_random_layer_generator(order=order, in_place=True)
+    next(generator)
+    next(generator)
+    generator.close()
+    for x, y in zip(before, model.state_dict()):
+        assert np.array_equal(x, y), "Test failed."
+
+
 @pytest.mark.tf_model
 @pytest.mark.parametrize(
     "params",
@@ -1,3 +1,5 @@
+import warnings
+
 import pytest
 from pytest_lazyfixture import lazy_fixture
 
@@ -144,6 +146,59 @@ def test_get_superpixel_segments(
     assert isinstance(out, expected["type"]), "Test failed."
 
 
+@pytest.mark.utils
+@pytest.mark.parametrize("segmentation_method", ["slic", "felzenszwalb"])
+def test_get_superpixel_segments_cache(
+    segmentation_setup, segmentation_method, tmp_path
+):
+    import quantus.helpers.utils as utils_module
+
+    out = get_superpixel_segments(
+        img=segmentation_setup,
+        segmentation_method=segmentation_method,
+        cache_dir=str(tmp_path),
+    )
+    assert len(list(tmp_path.glob("*.npy"))) == 1, "Test failed."
+
+    # Modifying a returned array must not affect the cache.
+    out_copy = out.copy()
+    out[:] = -1
+    for cache_dir in [None, str(tmp_path)]:
+        cached = get_superpixel_segments(
+            img=segmentation_setup,
+            segmentation_method=segmentation_method,
+            cache_dir=cache_dir,
+        )
+        assert np.array_equal(cached, out_copy), "Test failed."
+
+    # Once evicted from memory, the segments are loaded from disk.
+    utils_module._superpixel_segments_cache.clear()
+    (path,) = tmp_path.glob("*.npy")
+    np.save(path, np.zeros_like(out_copy))
+    cached = get_superpixel_segments(
+        img=segmentation_setup,
+        segmentation_method=segmentation_method,
+        cache_dir=str(tmp_path),
+    )
+    assert np.all(cached == 0), "Test failed."
+
+    # A different image is segmented anew.
+    utils_module._superpixel_segments_cache.clear()
+    out_other = get_superpixel_segments(
+        img=segmentation_setup[::-1],
+        segmentation_method=segmentation_method,
+        cache_dir=str(tmp_path),
+    )
+    assert len(list(tmp_path.glob("*.npy"))) == 2, "Test failed."
+    assert np.array_equal(
+        out_other,
+        get_superpixel_segments(
+            img=np.ascontiguousarray(segmentation_setup[::-1]),
+            segmentation_method=segmentation_method,
+        ),
+    ), "Test failed."
+
+
 @pytest.mark.utils
 @pytest.mark.parametrize(
     "data,shape,expected",
@@ -1095,3 +1150,55 @@ def test_get_leftover_shape(params: dict, expected: Any):
 
     out = get_leftover_shape(**params)
     assert all([np.all(a == b) for a, b in list(zip(out, expected["value"]))])
+
+
+@pytest.mark.utils
+@pytest.mark.parametrize(
+    "func",
+    [
+        norm_func.fro_norm,
+        norm_func.l2_norm,
+        norm_func.linf_norm,
+        lambda a: np.abs(a).sum(),
+    ],
+)
+def test_apply_rowwise_norm(func: Callable):
+    arr = np.random.uniform(-1, 1, size=(5, 12))
+    out = apply_rowwise(func, arr)
+    assert np.allclose(out, [func(a=a) for a in arr]), "Test failed."
+
+
+@pytest.mark.utils
+@pytest.mark.parametrize(
+    "func",
+    [
+        similarity_func.difference,
+        similarity_func.correlation_pearson,
+        similarity_func.correlation_spearman,
+        similarity_func.ssim,
+        lambda a, b: a * b,
+    ],
+)
+def test_apply_rowwise_similarity(func: Callable):
+    a = np.random.uniform(-1, 1, size=(5, 12))
+    b = np.random.uniform(-1, 1, size=(5, 12))
+    # Include ties and a constant row.
+    a[1] = np.round(a[1])
+    b[2] = 0.5
+    out = apply_rowwise(func, a, b)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected = [func(a=x, b=y) for x, y in zip(a, b)]
+    assert np.allclose(out, expected, equal_nan=True), "Test failed."
+
+
+@pytest.mark.utils
+def test_apply_rowwise_positional():
+    a = np.random.uniform(-1, 1, size=(5, 12))
+    b = np.random.uniform(-1, 1, size=(5, 12))
+
+    # The rows are passed positionally, so the parameters can have any name.
+    out = apply_rowwise(lambda x: np.abs(x).sum(), a, positional=True)
+    assert np.allclose(out, np.abs(a).sum(axis=1)), "Test failed."
+    out = apply_rowwise(lambda x, y: (x - y).sum(), a, b, positional=True)
+    assert np.allclose(out, (a - b).sum(axis=1)), "Test failed."
@@ -3,8 +3,11 @@ from typing import Union
 import pytest
 from pytest_lazyfixture import lazy_fixture
 import numpy as np
+import torch
 
 from quantus.functions.explanation_func import explain
+from quantus.functions.perturb_func import baseline_replacement_by_indices
+from quantus.helpers import utils
 from quantus.metrics.axiomatic import Completeness, InputInvariance, NonSensitivity
 
 
@@ -218,6 +221,52 @@ def test_completeness(
     assert scores is not None, "Test failed."
 
 
+@pytest.mark.axiomatic
+@pytest.mark.parametrize("batch_size", [1, 7, 64])
+def test_completeness_batched(load_mnist_model, load_mnist_images, batch_size: int):
+    model = load_mnist_model.eval()
+    x_batch, y_batch = load_mnist_images["x_batch"], load_mnist_images["y_batch"]
+
+    # The sign of the output difference of each instance, predicted one by one.
+    with torch.no_grad():
+        y_pred = model(torch.Tensor(x_batch)).numpy()
+        y_pred_baseline = model(torch.Tensor(np.zeros_like(x_batch))).numpy()
+    signs = np.sign(
+        y_pred[np.arange(len(y_batch)), y_batch]
+        - y_pred_baseline[np.arange(len(y_batch)), y_batch]
+    )
+
+    # Attributions that sum up to the sign of the output difference, except for the first instance.
+    a_batch = np.zeros((len(x_batch), 1, 28, 28))
+    a_batch[:, 0, 0, 0] = signs
+    a_batch[0, 0, 0, 0] = 2.0
+
+    scores = Completeness(
+        perturb_baseline=0.0,
+        output_func=np.sign,
+        normalise=False,
+        disable_warnings=True,
+    )(
+        model=model,
+        x_batch=x_batch,
+        y_batch=y_batch,
+        a_batch=a_batch,
+        softmax=False,
+        batch_size=batch_size,
+    )
+
+    assert scores == [False] + [True] * (len(x_batch) - 1), "Test failed."
+
+    # Evaluating the instances one by one gives the scores of the batch.
+    metric = Completeness(perturb_baseline=0.0, output_func=np.sign)
+    model = utils.get_wrapped_model(model, channel_first=True, softmax=False)
+    scores_instance = [
+        metric.evaluate_instance(model=model, x=x, y=y, a=a)
+        for x, y, a in zip(x_batch, y_batch, a_batch)
+    ]
+    assert scores_instance == scores, "Test failed."
+
+
 @pytest.mark.axiomatic
 @pytest.mark.parametrize(
     "model,data,params,expected",
@@ -386,6 +435,28 @@ def test_completeness(
             },
             1.0,
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "a_batch_generate": True,
+                "init": {
+                    "n_samples": 3,
+                    "features_in_step": 28,
+                    "perturb_baseline": "uniform",
+                    "predict_batch_size": 7,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                },
+            },
+            1.0,
+        ),
     ],
 )
 def test_non_sensitivity(
@@ -426,6 +497,99 @@ def test_non_sensitivity(
     assert scores is not None, "Test failed."
 
 
+@pytest.mark.axiomatic
+@pytest.mark.parametrize(
+    "params,expected",
+    [
+        ({}, {"deterministic": True}),
+        ({"perturb_baseline": "uniform"}, {"deterministic": False}),
+        ({"perturb_baseline": 0.5}, {"deterministic": True}),
+        (
+            {
+                "perturb_func": lambda **kwargs: baseline_replacement_by_indices(
+                    **kwargs
+                )
+            },
+            {"deterministic": False},
+        ),
+    ],
+)
+def test_non_sensitivity_deterministic_perturbation(
+    load_mnist_model, load_mnist_images, params: dict, expected: dict
+):
+    x_batch, y_batch = load_mnist_images["x_batch"], load_mnist_images["y_batch"]
+    a_batch = np.random.uniform(0, 1, size=(len(x_batch), 1, 28, 28))
+    a_batch[a_batch < 0.5] = 0.0
+
+    init_params = {
+        "n_samples": 4,
+        "features_in_step": 28,
+        "disable_warnings": True,
+        **params,
+    }
+    metric = NonSensitivity(**init_params)
+    assert (
+        metric.deterministic_perturbation == expected["deterministic"]
+    ), "Test failed."
+
+    # Predicting each perturbed input once gives the same scores as repeating it n_samples times.
+    if expected["deterministic"]:
+        scores = [
+            NonSensitivity(deterministic_perturbation=deterministic, **init_params)(
+                model=load_mnist_model.eval(),
+                x_batch=x_batch,
+                y_batch=y_batch,
+                a_batch=a_batch,
+            )
+            for deterministic in [True, False]
+        ]
+        assert scores[0] == scores[1], "Test failed."
+
+
+@pytest.mark.axiomatic
+def test_non_sensitivity_evaluate_instance(load_mnist_model, load_mnist_images):
+    x_batch, y_batch = (
+        load_mnist_images["x_batch"][:5],
+        load_mnist_images["y_batch"][:5],
+    )
+    a_batch = np.random.uniform(0, 1, size=(len(x_batch), 1, 28, 28))
+    a_batch[a_batch < 0.5] = 0.0
+
+    metric = NonSensitivity(
+        n_samples=4,
+        features_in_step=28,
+        normalise=False,
+        disable_warnings=True,
+    )
+    scores = metric(
+        model=load_mnist_model.eval(),
+        x_batch=x_batch,
+        y_batch=y_batch,
+        a_batch=a_batch,
+    )
+
+    # Evaluating the instances one by one gives the scores of the batch.
+    model = utils.get_wrapped_model(load_mnist_model, channel_first=True, softmax=True)
+    scores_instance = [
+        metric.evaluate_instance(model=model, x=x, y=y, a=a)
+        for x, y, a in zip(x_batch, y_batch, a_batch)
+    ]
+    assert scores_instance == scores, "Test failed."
+
+
+@pytest.mark.axiomatic
+def test_non_sensitivity_streaming_variances():
+    preds = np.random.uniform(0, 1, size=(5, 20))
+    preds[1] = 0.1
+    out = NonSensitivity._streaming_variances(preds)
+
+    expected = np.array(
+        [[np.var(row[: k + 1]) for k in range(preds.shape[1])] for row in preds]
+    )
+    assert np.allclose(out, expected), "Test failed."
+    assert np.all(out[1] == 0.0), "Test failed."
+
+
 @pytest.mark.axiomatic
 @pytest.mark.parametrize(
     "model,data,params,expected",
@@ -1,3 +1,5 @@
+import itertools
+import warnings
 from typing import Union
 
 import pytest
@@ -5,6 +7,7 @@ from pytest_lazyfixture import lazy_fixture
 import numpy as np
 
 from quantus.functions.explanation_func import explain
+from quantus.functions.normalise_func import normalise_by_negative
 from quantus.functions.perturb_func import (
     baseline_replacement_by_indices,
     noisy_linear_imputation,
@@ -13,6 +16,7 @@ from quantus.functions.similarity_func import (
     correlation_spearman,
     correlation_kendall_tau,
 )
+from quantus.helpers import utils
 from quantus.helpers.model.model_interface import ModelInterface
 from quantus.metrics.faithfulness import (
     FaithfulnessCorrelation,
@@ -28,6 +32,7 @@ from quantus.metrics.faithfulness import (
     SensitivityN,
     Sufficiency,
 )
+from quantus.metrics.faithfulness import road
 
 
 @pytest.mark.faithfulness
@@ -184,6 +189,27 @@ from quantus.metrics.faithfulness import (
             },
             {"min": -1.0, "max": 1.0},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "perturb_func": baseline_replacement_by_indices,
+                    "perturb_baseline": "mean",
+                    "nr_runs": 10,
+                    "similarity_func": correlation_spearman,
+                    "normalise": True,
+                    "subset_size": 100,
+                    "predict_batch_size": 7,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                },
+                "call": {
+                    "explain_func": explain,
+                },
+            },
+            {"min": -1.0, "max": 1.0},
+        ),
         (
             lazy_fixture("load_1d_3ch_conv_model"),
             lazy_fixture("almost_uniform_1d"),
@@ -602,6 +628,126 @@ def test_iterative_removal_of_features(
     ), "Test failed."
 
 
+@pytest.mark.faithfulness
+@pytest.mark.parametrize("segmentation_method", ["slic", "felzenszwalb"])
+def test_iterative_removal_of_features_segmentation_cache(
+    load_mnist_model, load_mnist_images, segmentation_method, tmp_path
+):
+    x_batch, y_batch = load_mnist_images["x_batch"], load_mnist_images["y_batch"]
+    a_batch = explain(
+        model=load_mnist_model, inputs=x_batch, targets=y_batch, method="Saliency"
+    )
+
+    scores = [
+        IROF(
+            segmentation_method=segmentation_method,
+            segmentation_cache_dir=segmentation_cache_dir,
+            disable_warnings=True,
+        )(
+            model=load_mnist_model,
+            x_batch=x_batch,
+            y_batch=y_batch,
+            a_batch=a_batch,
+        )
+        for segmentation_cache_dir in [None, str(tmp_path), str(tmp_path)]
+    ]
+
+    assert len(list(tmp_path.glob("*.npy"))) > 0, "Test failed."
+    assert np.allclose(scores[0], scores[1]), "Test failed."
+    assert np.allclose(scores[0], scores[2]), "Test failed."
+
+
+@pytest.mark.faithfulness
+@pytest.mark.parametrize("perturb_baseline", ["mean", "black", "white", 0.0])
+def test_iterative_removal_of_features_rank_perturbation(
+    load_mnist_model, load_mnist_images, perturb_baseline
+):
+    x_batch, y_batch = load_mnist_images["x_batch"], load_mnist_images["y_batch"]
+    a_batch = explain(
+        model=load_mnist_model, inputs=x_batch, targets=y_batch, method="Saliency"
+    )
+
+    # A wrapped perturb_func is applied step by step, the default one through a rank map of the segments.
+    metrics = [
+        IROF(
+            perturb_baseline=perturb_baseline,
+            return_aggregate=False,
+            disable_warnings=True,
+        ),
+        IROF(
+            perturb_func=lambda **kwargs: baseline_replacement_by_indices(**kwargs),
+            perturb_baseline=perturb_baseline,
+            return_aggregate=False,
+            predict_batch_size=7,
+            disable_warnings=True,
+        ),
+    ]
+    assert metrics[0].rank_perturbation, "Test failed."
+    assert not metrics[1].rank_perturbation, "Test failed."
+
+    scores = [
+        metric(
+            model=load_mnist_model,
+            x_batch=x_batch,
+            y_batch=y_batch,
+            a_batch=a_batch,
+        )
+        for metric in metrics
+    ]
+    assert np.allclose(scores[0], scores[1], rtol=1e-5, atol=1e-5), "Test failed."
+
+    # Both paths remove the segments to the same values, bit for bit.
+    x_perturbed = [
+        np.concatenate(list(metric._generate_perturbations(x_batch[0], a_batch[0])))
+        for metric in metrics
+    ]
+    assert x_perturbed[0].dtype == x_perturbed[1].dtype, "Test failed."
+    assert np.array_equal(x_perturbed[0], x_perturbed[1]), "Test failed."
+
+
+@pytest.mark.faithfulness
+@pytest.mark.parametrize(
+    "params,expected",
+    [
+        ({"perturbation_check": "always"}, {"nr_warnings": 28 * 8}),
+        (
+            {"perturbation_check": "first_n", "perturbation_check_kwargs": {"n": 5}},
+            {"nr_warnings": 5},
+        ),
+        ({"perturbation_check": "off"}, {"nr_warnings": 0}),
+    ],
+)
+def test_pixel_flipping_perturbation_check(
+    load_mnist_model, load_mnist_images, params: dict, expected: dict
+):
+    # Replacing pixels of a black input by black never changes the input.
+    x_batch = np.zeros_like(load_mnist_images["x_batch"][:8])
+    y_batch = load_mnist_images["y_batch"][:8]
+    a_batch = np.random.uniform(0, 1, size=(len(x_batch), 1, 28, 28))
+
+    metric = PixelFlipping(
+        features_in_step=28,
+        perturb_baseline="black",
+        disable_warnings=True,
+        **params,
+    )
+
+    # Every call of the metric checks its perturbed inputs by the same policy.
+    for _ in range(2):
+        with warnings.catch_warnings(record=True) as records:
+            warnings.simplefilter("always")
+            scores = metric(
+                model=load_mnist_model.eval(),
+                x_batch=x_batch,
+                y_batch=y_batch,
+                a_batch=a_batch,
+            )
+
+        nr_warnings = sum("didn't cause change" in str(r.message) for r in records)
+        assert nr_warnings == expected["nr_warnings"], "Test failed."
+        assert len(scores) == len(x_batch), "Test failed."
+
+
 @pytest.mark.faithfulness
 @pytest.mark.parametrize(
     "model,data,params,expected",
@@ -1025,6 +1171,27 @@ def test_monotonicity_correlation(
             },
             {"min": 0.0, "max": 10.0},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "perturb_baseline": "mean",
+                    "features_in_step": 28,
+                    "predict_batch_size": 5,
+                    "normalise": True,
+                    "abs": True,
+                    "disable_warnings": True,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                },
+            },
+            {"min": 0.0, "max": 1.0},
+        ),
     ],
 )
 def test_pixel_flipping(
@@ -1668,6 +1835,31 @@ def test_sensitivity_n(
             },
             {},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "perturb_func": baseline_replacement_by_indices,
+                    "perturb_baseline": "mean",
+                    "perturb_patch_sizes": [4, 7],
+                    "return_aggregate": False,
+                    "normalise": True,
+                    "abs": True,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                    "n_perturb_samples": 2,
+                    "predict_batch_size": 10,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                },
+            },
+            {},
+        ),
         # (
         #   lazy_fixture("load_cifar10_model"),
         #   lazy_fixture("load_cifar10_images"),
@@ -1779,6 +1971,51 @@ def test_infidelity(
             },
             {"min": 0.0, "max": 1.0},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "perturb_func": noisy_linear_imputation,
+                    "normalise": True,
+                    "abs": True,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                    "percentages": [10, 50, 90],
+                    "predict_batch_size": 7,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                },
+            },
+            {"min": 0.0, "max": 1.0},
+        ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "perturb_func": noisy_linear_imputation,
+                    "normalise": True,
+                    "abs": True,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                    "percentages": [10, 50, 90],
+                    "nr_workers": 2,
+                    "seed": 42,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                },
+            },
+            {"min": 0.0, "max": 1.0},
+        ),
     ],
 )
 def test_ROAD(
@@ -1821,6 +2058,101 @@ def test_ROAD(
     ), "Test failed."
 
 
+@pytest.mark.faithfulness
+@pytest.mark.parametrize(
+    "model,data,params",
+    [
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "normalise": True,
+                    "abs": True,
+                    "disable_warnings": True,
+                    "percentages": [5, 30, 60],
+                    "seed": 42,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                    "batch_size": 5,
+                },
+            },
+        ),
+    ],
+)
+def test_ROAD_nr_workers_deterministic(
+    model,
+    data: np.ndarray,
+    params: dict,
+):
+    x_batch, y_batch = (
+        data["x_batch"][:10],
+        data["y_batch"][:10],
+    )
+
+    init_params = params.get("init", {})
+    call_params = params.get("call", {})
+
+    scores = [
+        ROAD(nr_workers=nr_workers, **init_params)(
+            model=model,
+            x_batch=x_batch,
+            y_batch=y_batch,
+            a_batch=None,
+            **call_params,
+        )
+        for nr_workers in [1, 2]
+    ]
+
+    assert scores[0] == scores[1], "Test failed."
+
+
+@pytest.mark.faithfulness
+def test_ROAD_nr_workers_started_once(load_mnist_model, load_mnist_images, monkeypatch):
+    x_batch, y_batch = (
+        load_mnist_images["x_batch"][:10],
+        load_mnist_images["y_batch"][:10],
+    )
+    a_batch = np.random.uniform(0, 1, size=(len(x_batch), 1, 28, 28))
+
+    nr_executors = []
+
+    class CountingProcessPoolExecutor(road.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            nr_executors.append(1)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(road, "ProcessPoolExecutor", CountingProcessPoolExecutor)
+
+    # The workers and shared buffers are created once per call, not once per batch.
+    metric = ROAD(percentages=[5, 30], nr_workers=2, seed=0, disable_warnings=True)
+    for _ in range(2):
+        metric(
+            model=load_mnist_model.eval(),
+            x_batch=x_batch,
+            y_batch=y_batch,
+            a_batch=a_batch,
+            batch_size=3,
+        )
+        assert metric.imputation_executor is None, "Test failed."
+        assert metric.imputation_buffers == [], "Test failed."
+    assert len(nr_executors) == 2, "Test failed."
+
+
+@pytest.mark.faithfulness
+def test_ROAD_perturb_func_rng():
+    # A seeded perturb_func must accept the random number generator.
+    with pytest.raises(ValueError):
+        ROAD(perturb_func=lambda arr, indices, noise: arr, seed=0)
+    ROAD(perturb_func=lambda arr, indices, noise, rng: arr, seed=0)
+    ROAD(perturb_func=lambda arr, indices, **kwargs: arr, nr_workers=2)
+    ROAD(perturb_func=lambda arr, indices, noise: arr)
+
+
 @pytest.mark.faithfulness
 @pytest.mark.parametrize(
     "model,data,params,expected",
@@ -1866,6 +2198,45 @@ def test_ROAD(
             },
             {"min": 0.0, "max": 1.0},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "a_batch_generate": False,
+                "init": {
+                    "threshold": 0.6,
+                    "dataset_level": True,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                    "batch_size": 7,
+                },
+            },
+            {"min": 0.0, "max": 1.0},
+        ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "dataset_level": True,
+                    "normalise_func": normalise_by_negative,
+                    "disable_warnings": True,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                },
+            },
+            {"min": 0.0, "max": 1.0},
+        ),
     ],
 )
 def test_sufficiency(
@@ -1915,3 +2286,272 @@ def test_sufficiency(
         **call_params,
     )[0]
     assert (scores >= expected["min"]) & (scores <= expected["max"]), "Test failed."
+
+
+@pytest.mark.faithfulness
+@pytest.mark.parametrize(
+    "model,data,params",
+    [
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {"threshold": 0.95, "disable_warnings": True},
+        ),
+    ],
+)
+def test_sufficiency_dataset_level(model, data: np.ndarray, params: dict):
+    x_batch, y_batch = (
+        data["x_batch"],
+        data["y_batch"],
+    )
+    a_batch = np.random.uniform(0, 1, size=x_batch.shape)
+
+    # Scores over all instances in one batch match the dataset-level scores with any batch size.
+    scores = Sufficiency(**params)(
+        model=model,
+        x_batch=x_batch,
+        y_batch=y_batch,
+        a_batch=a_batch,
+        batch_size=len(x_batch),
+    )
+    for batch_size, max_distances in [(3, 2**24), (7, 2**24), (7, 100), (7, 0)]:
+        # The distances are computed in chunks of a few rows, of which only some are kept between passes.
+        metric = Sufficiency(dataset_level=True, **params)
+        metric._max_distances_per_chunk = 100
+        metric._max_cached_distances = max_distances
+        scores_dataset_level = metric(
+            model=model,
+            x_batch=x_batch,
+            y_batch=y_batch,
+            a_batch=a_batch,
+            batch_size=batch_size,
+        )
+        assert np.allclose(scores, scores_dataset_level), "Test failed."
+
+
+def _reference_ordered_patches(x, a, patch_size, a_axes, regions_evaluation=None):
+    """The non-overlapping patches of x in descending order of their attribution sum, as computed per instance."""
+    pad_width = patch_size - 1
+    x_pad = utils._pad_array(x, pad_width, mode="constant", padded_axes=a_axes)
+    a_pad = utils._pad_array(a, pad_width, mode="constant", padded_axes=a_axes)
+
+    patches, att_sums = [], []
+    axis_iterators = [
+        range(pad_width, x_pad.shape[axis] - pad_width) for axis in a_axes
+    ]
+    for top_left_coords in itertools.product(*axis_iterators):
+        patch_slice = utils.create_patch_slice(
+            patch_size=patch_size, coords=top_left_coords
+        )
+        att_sums.append(a_pad[utils.expand_indices(a_pad, patch_slice, a_axes)].sum())
+        patches.append(patch_slice)
+
+    blocked_mask = np.zeros(x_pad.shape, dtype=bool)
+    ordered_patches_no_overlap = []
+    for p in np.argsort(att_sums)[::-1]:
+        patch_mask = np.zeros(x_pad.shape, dtype=bool)
+        patch_mask[utils.expand_indices(patch_mask, patches[p], a_axes)] = True
+        if not (blocked_mask & patch_mask).any():
+            ordered_patches_no_overlap.append(patches[p])
+            blocked_mask = blocked_mask | patch_mask
+        if (
+            regions_evaluation is not None
+            and len(ordered_patches_no_overlap) >= regions_evaluation
+        ):
+            break
+    return ordered_patches_no_overlap
+
+
+def _reference_curve(
+    model, x, y, perturb_func, indices_steps, a_axes, pad_width=0, x_start=None
+):
+    """Perturb x cumulatively and predict on every step with a forward pass per step."""
+    x_perturbed = x.copy() if x_start is None else x_start
+    preds = []
+    for indices in indices_steps:
+        if pad_width > 0:
+            x_perturbed_pad = utils._pad_array(
+                x_perturbed, pad_width, mode="edge", padded_axes=a_axes
+            )
+            x_perturbed_pad = perturb_func(
+                arr=x_perturbed_pad, indices=indices, indexed_axes=a_axes
+            )
+            x_perturbed = utils._unpad_array(
+                x_perturbed_pad, pad_width, padded_axes=a_axes
+            )
+        else:
+            x_perturbed = perturb_func(
+                arr=x_perturbed, indices=indices, indexed_axes=a_axes
+            )
+        x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
+        preds.append(float(model.predict(x_input)[:, y]))
+    return preds
+
+
+def _reference_predict(model, x, y):
+    x_input = model.shape_input(x, x.shape, channel_first=True)
+    return float(model.predict(x_input)[:, y])
+
+
+def _reference_pixel_flipping(metric, model, x, y, a):
+    a_indices = np.argsort(-a.flatten())
+    steps = range(0, len(a_indices), metric.features_in_step)
+    indices_steps = [a_indices[i : i + metric.features_in_step] for i in steps]
+    return _reference_curve(
+        model, x, y, metric.perturb_func, indices_steps, metric.a_axes
+    )
+
+
+def _reference_region_perturbation(metric, model, x, y, a):
+    patches = _reference_ordered_patches(
+        x, a, metric.patch_size, metric.a_axes, metric.regions_evaluation
+    )
+    preds = _reference_curve(
+        model,
+        x,
+        y,
+        metric.perturb_func,
+        patches,
+        metric.a_axes,
+        pad_width=metric.patch_size - 1,
+    )
+    y_pred = _reference_predict(model, x, y)
+    return [y_pred - y_pred_perturb for y_pred_perturb in preds]
+
+
+def _reference_selectivity(metric, model, x, y, a):
+    patches = _reference_ordered_patches(x, a, metric.patch_size, metric.a_axes)
+    return _reference_curve(
+        model,
+        x,
+        y,
+        metric.perturb_func,
+        patches,
+        metric.a_axes,
+        pad_width=metric.patch_size - 1,
+    )
+
+
+def _reference_monotonicity(metric, model, x, y, a):
+    a_indices = np.argsort(a.flatten())
+    steps = range(0, len(a_indices), metric.features_in_step)
+    indices_steps = [a_indices[i : i + metric.features_in_step] for i in steps]
+    baseline_value = utils.get_baseline_value(
+        value=metric.perturb_func.keywords["perturb_baseline"],
+        arr=x,
+        return_shape=x.shape,
+    )
+    preds = _reference_curve(
+        model,
+        x,
+        y,
+        metric.perturb_func,
+        indices_steps,
+        metric.a_axes,
+        x_start=np.full(x.shape, baseline_value),
+    )
+    return np.all(np.diff(preds) >= 0)
+
+
+def _reference_irof(metric, model, x, y, a):
+    segments = utils.get_superpixel_segments(
+        img=np.moveaxis(x, 0, -1).astype("double"),
+        segmentation_method=metric.segmentation_method,
+    )
+    nr_segments = len(np.unique(segments))
+    att_segs = np.array([np.mean(a[:, segments == s]) for s in range(nr_segments)])
+    indices_steps = [
+        np.nonzero((segments == s_ix).flatten())[0] for s_ix in np.argsort(-att_segs)
+    ]
+    preds = _reference_curve(
+        model, x, y, metric.perturb_func, indices_steps, metric.a_axes
+    )
+    preds = np.array(preds) / _reference_predict(model, x, y)
+    return len(preds) - utils.calculate_auc(preds)
+
+
+def _reference_road(metric, model, x, y, a):
+    ordered_indices = np.argsort(a, axis=None)[::-1]
+    results = []
+    for p in metric.percentages:
+        x_perturbed = metric.perturb_func(
+            arr=x, indices=ordered_indices[: int(a[0].size * p / 100)]
+        )
+        x_input = model.shape_input(x_perturbed, x.shape, channel_first=True)
+        results.append(int(y == np.argmax(model.predict(x_input))))
+    return results
+
+
+@pytest.mark.faithfulness
+@pytest.mark.parametrize(
+    "metric,reference",
+    [
+        (
+            PixelFlipping(features_in_step=28 * 4, disable_warnings=True),
+            _reference_pixel_flipping,
+        ),
+        (
+            RegionPerturbation(
+                patch_size=7, regions_evaluation=10, disable_warnings=True
+            ),
+            _reference_region_perturbation,
+        ),
+        (Selectivity(patch_size=7, disable_warnings=True), _reference_selectivity),
+        (
+            Monotonicity(features_in_step=28 * 4, disable_warnings=True),
+            _reference_monotonicity,
+        ),
+        (
+            IROF(
+                perturb_baseline="black", return_aggregate=False, disable_warnings=True
+            ),
+            _reference_irof,
+        ),
+        (
+            IROF(
+                perturb_func=lambda **kwargs: baseline_replacement_by_indices(**kwargs),
+                perturb_baseline="mean",
+                return_aggregate=False,
+                disable_warnings=True,
+            ),
+            _reference_irof,
+        ),
+        (ROAD(percentages=[5, 30, 60], disable_warnings=True), _reference_road),
+    ],
+)
+def test_perturbation_curves_match_per_instance_loop(
+    load_mnist_model, load_mnist_images, metric, reference
+):
+    # The batched perturbation curves match a per-instance loop with a forward pass per perturbation step.
+    x_batch = load_mnist_images["x_batch"][:4]
+    y_batch = load_mnist_images["y_batch"][:4]
+    a_batch = np.random.RandomState(0).uniform(0, 1, size=(len(x_batch), 1, 28, 28))
+    metric.normalise, metric.abs = False, False
+
+    np.random.seed(42)
+    scores = metric(
+        model=load_mnist_model.eval(),
+        x_batch=x_batch,
+        y_batch=y_batch,
+        a_batch=a_batch,
+        batch_size=2,
+    )
+
+    model = utils.get_wrapped_model(load_mnist_model, channel_first=True, softmax=True)
+    np.random.seed(42)
+    scores_reference = [
+        reference(metric, model, x, y, a) for x, y, a in zip(x_batch, y_batch, a_batch)
+    ]
+    if isinstance(metric, ROAD):
+        scores_reference = dict(
+            zip(metric.percentages, np.mean(scores_reference, axis=0))
+        )
+        assert scores == scores_reference, "Test failed."
+    else:
+        assert len(scores) == len(scores_reference), "Test failed."
+        for score, score_reference in zip(scores, scores_reference):
+            assert np.allclose(
+                np.array(score, dtype=float),
+                np.array(score_reference, dtype=float),
+                atol=1e-5,
+            ), "Test failed."
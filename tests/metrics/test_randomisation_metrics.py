@@ -3,11 +3,17 @@ from typing import Union
 import pytest
 from pytest_lazyfixture import lazy_fixture
 import numpy as np
+import torch
 from zennit import attribution as zattr
 
 from quantus.functions.explanation_func import explain
 from quantus.functions import complexity_func, n_bins_func
-from quantus.functions.similarity_func import correlation_spearman, correlation_pearson
+from quantus.functions.similarity_func import (
+    correlation_spearman,
+    correlation_pearson,
+    ssim,
+)
+from quantus.helpers.checkpoint_utils import LayerScoresCheckpoint
 from quantus.helpers.model.model_interface import ModelInterface
 from quantus.metrics.randomisation import (
     MPRT,
@@ -67,6 +73,27 @@ def explain_func_stub(*args, **kwargs):
             },
             {"min": -1.0, "max": 1.0},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "layer_order": "independent",
+                    "similarity_func": ssim,
+                    "normalise": True,
+                    "disable_warnings": True,
+                    "display_progressbar": True,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                    "batch_size": 7,
+                },
+            },
+            {"min": -1.0, "max": 1.0},
+        ),
         (
             lazy_fixture("load_1d_3ch_conv_model"),
             lazy_fixture("almost_uniform_1d_no_abatch"),
@@ -494,6 +521,29 @@ def test_model_parameter_randomisation(
             },
             {"min": -1.0, "max": 1.0},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "layer_order": "bottom_up",
+                    "similarity_func": correlation_pearson,
+                    "normalise": True,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                    "nr_samples": 5,
+                    "noise_magnitude": 0.1,
+                    "explain_batch_size": 20,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                },
+            },
+            {"min": -1.0, "max": 1.0},
+        ),
         (
             lazy_fixture("load_mnist_model_tf"),
             lazy_fixture("load_mnist_images_tf"),
@@ -863,6 +913,38 @@ def test_smooth_model_parameter_randomisation(
         ), f"Test failed. Out of range scores: {out_of_range_scores}"
 
 
+@pytest.mark.randomisation
+@pytest.mark.parametrize("explain_batch_size", [6, 20, 100])
+def test_smooth_model_parameter_randomisation_explain_batch_size(
+    explain_batch_size: int, load_mnist_model, load_mnist_images
+):
+    x_batch, y_batch = load_mnist_images["x_batch"], load_mnist_images["y_batch"]
+    call_params = {
+        "model": load_mnist_model,
+        "x_batch": x_batch,
+        "y_batch": y_batch,
+        "a_batch": None,
+        "explain_func": explain,
+        "explain_func_kwargs": {"method": "Saliency"},
+        "batch_size": 4,
+    }
+    init_params = {"nr_samples": 5, "disable_warnings": True}
+
+    # Stacking the noise samples does not change the noise or the scores.
+    np.random.seed(0)
+    scores = SmoothMPRT(**init_params)(**call_params)
+    np.random.seed(0)
+    scores_stacked = SmoothMPRT(explain_batch_size=explain_batch_size, **init_params)(
+        **call_params
+    )
+
+    assert scores_stacked.keys() == scores.keys(), "Test failed."
+    for layer in scores:
+        assert np.allclose(
+            scores_stacked[layer], scores[layer], equal_nan=True
+        ), "Test failed."
+
+
 @pytest.mark.randomisation
 @pytest.mark.parametrize(
     "model,data,params,expected",
@@ -1210,6 +1292,164 @@ def test_efficient_model_parameter_randomisation(
     ), f"Test failed. Out of range scores: {out_of_range_scores}"
 
 
+@pytest.mark.randomisation
+@pytest.mark.parametrize(
+    "metric,params",
+    [
+        (MPRT, {"layer_order": "top_down"}),
+        (MPRT, {"layer_order": "independent", "skip_layers": True}),
+        (SmoothMPRT, {"layer_order": "bottom_up", "nr_samples": 2}),
+        (EfficientMPRT, {"layer_order": "bottom_up", "skip_layers": False}),
+    ],
+)
+def test_randomisation_checkpoint(
+    metric, params: dict, load_mnist_model, load_mnist_images, tmp_path
+):
+    x_batch, y_batch = load_mnist_images["x_batch"], load_mnist_images["y_batch"]
+    a_batch = explain(
+        model=load_mnist_model, inputs=x_batch, targets=y_batch, method="Saliency"
+    )
+    call_params = {
+        "model": load_mnist_model,
+        "x_batch": x_batch,
+        "y_batch": y_batch,
+        "a_batch": a_batch,
+        "explain_func": explain,
+        "explain_func_kwargs": {"method": "Saliency"},
+        "batch_size": 3,
+    }
+
+    def evaluate():
+        np.random.seed(0)
+        return metric(checkpoint_dir=str(tmp_path), disable_warnings=True, **params)(
+            **call_params
+        )
+
+    scores = evaluate()
+    assert (tmp_path / "config.json").exists(), "Test failed."
+
+    # Resuming from a complete checkpoint returns the saved scores.
+    checkpoint_files = sorted(tmp_path.glob("*.npy"))
+    assert checkpoint_files, "Test failed."
+    assert evaluate() == scores, "Test failed."
+
+    # Simulate an interruption after the first batch of the last layer.
+    last_file = checkpoint_files[-1]
+    np.save(last_file, np.load(last_file)[:3])
+    scores_resumed = evaluate()
+    if metric is SmoothMPRT:
+        # The resumed batches use different noise samples.
+        assert np.shape(scores_resumed) == np.shape(scores), "Test failed."
+    elif isinstance(scores, dict):
+        assert scores_resumed.keys() == scores.keys(), "Test failed."
+        for layer in scores:
+            assert np.allclose(scores_resumed[layer], scores[layer]), "Test failed."
+    else:
+        assert np.allclose(scores_resumed, scores), "Test failed."
+
+    # A different configuration or different data does not resume from the checkpoint.
+    with pytest.raises(ValueError):
+        metric(checkpoint_dir=str(tmp_path), disable_warnings=True, seed=1, **params)(
+            **call_params
+        )
+    for changed_params in [
+        {"x_batch": x_batch[::-1].copy()},
+        {"a_batch": a_batch[::-1].copy()},
+        {"explain_func_kwargs": {"method": "Gradient"}},
+    ]:
+        with pytest.raises(ValueError):
+            metric(checkpoint_dir=str(tmp_path), disable_warnings=True, **params)(
+                **{**call_params, **changed_params}
+            )
+    with pytest.raises(ValueError):
+        metric(
+            checkpoint_dir=str(tmp_path),
+            similarity_func=correlation_pearson,
+            disable_warnings=True,
+            **params,
+        )(**call_params)
+
+
+@pytest.mark.randomisation
+def test_layer_scores_checkpoint_keys(tmp_path):
+    checkpoint = LayerScoresCheckpoint(str(tmp_path), config={"seed": 0})
+
+    # Keys that map to the same file name characters are saved to different files.
+    checkpoint.save("a/b", [1.0, 2.0])
+    checkpoint.save("a_b", [3.0])
+    assert checkpoint.load("a/b") == [1.0, 2.0], "Test failed."
+    assert checkpoint.load("a_b") == [3.0], "Test failed."
+    assert checkpoint.load("a.b") == [], "Test failed."
+
+
+@pytest.mark.randomisation
+@pytest.mark.parametrize(
+    "metric,params",
+    [
+        (MPRT, {"layer_order": "top_down"}),
+        (MPRT, {"layer_order": "independent"}),
+        (EfficientMPRT, {"layer_order": "bottom_up", "skip_layers": False}),
+    ],
+)
+def test_randomisation_in_place(
+    metric, params: dict, load_mnist_model, load_mnist_images
+):
+    x_batch, y_batch = load_mnist_images["x_batch"], load_mnist_images["y_batch"]
+    call_params = {
+        "model": load_mnist_model,
+        "x_batch": x_batch,
+        "y_batch": y_batch,
+        "a_batch": None,
+        "explain_func": explain,
+        "explain_func_kwargs": {"method": "Saliency"},
+    }
+    state_dict = {k: v.clone() for k, v in load_mnist_model.state_dict().items()}
+
+    scores = metric(disable_warnings=True, **params)(**call_params)
+    scores_in_place = metric(randomise_in_place=True, disable_warnings=True, **params)(
+        **call_params
+    )
+
+    if isinstance(scores, dict):
+        assert scores_in_place.keys() == scores.keys(), "Test failed."
+        for layer in scores:
+            assert np.allclose(scores_in_place[layer], scores[layer]), "Test failed."
+    else:
+        assert np.allclose(scores_in_place, scores), "Test failed."
+
+    # The model is restored.
+    for k, v in load_mnist_model.state_dict().items():
+        assert torch.equal(v, state_dict[k]), "Test failed."
+
+
+@pytest.mark.randomisation
+def test_model_parameter_randomisation_custom_similarity_func(
+    load_mnist_model, load_mnist_images
+):
+    x_batch, y_batch = load_mnist_images["x_batch"], load_mnist_images["y_batch"]
+    call_params = {
+        "model": load_mnist_model,
+        "x_batch": x_batch,
+        "y_batch": y_batch,
+        "a_batch": None,
+        "explain_func": explain,
+        "explain_func_kwargs": {"method": "Saliency"},
+    }
+
+    # A custom similarity function is called positionally, whatever its parameters are named.
+    scores = [
+        MPRT(similarity_func=similarity_func, disable_warnings=True)(**call_params)
+        for similarity_func in [
+            correlation_pearson,
+            lambda x, y: correlation_pearson(x, y),
+        ]
+    ]
+
+    assert scores[1].keys() == scores[0].keys(), "Test failed."
+    for layer in scores[0]:
+        assert np.allclose(scores[1][layer], scores[0][layer]), "Test failed."
+
+
 @pytest.mark.randomisation
 @pytest.mark.parametrize(
     "model,data,params,expected",
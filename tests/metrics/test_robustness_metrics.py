@@ -2,9 +2,11 @@ from typing import Union, Dict
 from pytest_lazyfixture import lazy_fixture
 import pytest
 import numpy as np
+import torch
 
 from quantus.functions.explanation_func import explain
 from quantus.functions.discretise_func import floating_points, rank, sign, top_n_sign
+from quantus.functions.norm_func import linf_norm
 from quantus.helpers.model.model_interface import ModelInterface
 from quantus.metrics.robustness import (
     AvgSensitivity,
@@ -173,6 +175,28 @@ from quantus.metrics.robustness import (
             },
             {"min": 0.0, "max": 1.0},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "lower_bound": 0.2,
+                    "nr_samples": 10,
+                    "explain_batch_size": 50,
+                    "norm_numerator": linf_norm,
+                    "return_nan_when_prediction_changes": True,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                },
+            },
+            {"min": 0.0, "max": 1.0},
+        ),
     ],
 )
 def test_max_sensitivity(
@@ -503,6 +527,29 @@ def test_local_lipschitz_estimate(
             },
             {"exception": ValueError},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "a_batch_generate": False,
+                "init": {
+                    "nr_steps": 5,
+                    "patch_size": 14,
+                    "normalise": False,
+                    "abs": False,
+                    "return_nan_when_prediction_changes": True,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                },
+            },
+            {"min": 0.0, "max": 1.0},
+        ),
     ],
 )
 def test_continuity(
@@ -698,6 +745,28 @@ def test_continuity(
             },
             {"min": 0.0, "max": 1.0},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "init": {
+                    "lower_bound": 0.2,
+                    "nr_samples": 10,
+                    "explain_batch_size": 50,
+                    "norm_numerator": linf_norm,
+                    "return_nan_when_prediction_changes": True,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                },
+            },
+            {"min": 0.0, "max": 1.0},
+        ),
     ],
 )
 def test_avg_sensitivity(
@@ -842,6 +911,27 @@ def test_avg_sensitivity(
             },
             {"min": 0.0, "max": 1.0},
         ),
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {
+                "a_batch_generate": False,
+                "init": {
+                    "discretise_func": sign,
+                    "dataset_level": True,
+                    "disable_warnings": True,
+                    "display_progressbar": False,
+                },
+                "call": {
+                    "explain_func": explain,
+                    "explain_func_kwargs": {
+                        "method": "Saliency",
+                    },
+                    "batch_size": 7,
+                },
+            },
+            {"min": 0.0, "max": 1.0},
+        ),
     ],
 )
 def test_consistency(
@@ -892,6 +982,92 @@ def test_consistency(
     assert (scores >= expected["min"]) & (scores <= expected["max"]), "Test failed."
 
 
+@pytest.mark.robustness
+@pytest.mark.parametrize(
+    "model,data,params",
+    [
+        (
+            lazy_fixture("load_mnist_model"),
+            lazy_fixture("load_mnist_images"),
+            {"discretise_func": sign, "disable_warnings": True},
+        ),
+    ],
+)
+def test_consistency_dataset_level(model, data: np.ndarray, params: dict):
+    x_batch, y_batch = (
+        data["x_batch"],
+        data["y_batch"],
+    )
+    a_batch = explain(model=model, inputs=x_batch, targets=y_batch, method="Saliency")
+
+    # Scores over all instances in one batch match the dataset-level scores with any batch size.
+    scores = Consistency(**params)(
+        model=model,
+        x_batch=x_batch,
+        y_batch=y_batch,
+        a_batch=a_batch,
+        batch_size=len(x_batch),
+    )
+    for batch_size in [3, 7]:
+        scores_dataset_level = Consistency(dataset_level=True, **params)(
+            model=model,
+            x_batch=x_batch,
+            y_batch=y_batch,
+            a_batch=a_batch,
+            batch_size=batch_size,
+        )
+        assert np.allclose(scores, scores_dataset_level), "Test failed."
+
+
+@pytest.mark.robustness
+@pytest.mark.parametrize(
+    "a_labels,y_pred_classes,expected",
+    [
+        (
+            np.array([5, -3, 5, 5, 7, -3]),
+            np.array([1, 2, 1, 0, 1, 0]),
+            [0.5, 0.0, 0.5, 0.0, 0.0, 0.0],
+        ),
+        (np.array([1, 1, 1]), np.array([4, 4, 4]), [1.0, 1.0, 1.0]),
+        (np.array([1]), np.array([0]), [0.0]),
+    ],
+)
+def test_consistency_evaluate_groups(
+    a_labels: np.ndarray, y_pred_classes: np.ndarray, expected: list
+):
+    scores = Consistency.evaluate_groups(a_labels, y_pred_classes)
+    assert np.allclose(scores, expected), "Test failed."
+
+    scores = [
+        Consistency.evaluate_instance(a_labels, i, y_pred_classes)
+        for i in range(len(a_labels))
+    ]
+    assert np.allclose(scores, expected), "Test failed."
+
+
+@pytest.mark.robustness
+def test_consistency_compares_labels(load_mnist_model, load_mnist_images):
+    x_batch, y_batch = load_mnist_images["x_batch"], load_mnist_images["y_batch"]
+    a_batch = np.random.uniform(0, 1, size=(len(x_batch), 1, 28, 28))
+
+    # With a single discretised label, each instance is compared to all other instances of its batch.
+    scores = Consistency(discretise_func=lambda a: 0, disable_warnings=True)(
+        model=load_mnist_model.eval(),
+        x_batch=x_batch,
+        y_batch=y_batch,
+        a_batch=a_batch,
+        batch_size=len(x_batch),
+    )
+    y_pred_classes = np.argmax(
+        load_mnist_model(torch.Tensor(x_batch)).detach().numpy(), axis=1
+    )
+    expected = [
+        (np.sum(y_pred_classes == y_pred) - 1) / (len(x_batch) - 1)
+        for y_pred in y_pred_classes
+    ]
+    assert np.allclose(scores, expected), "Test failed."
+
+
 @pytest.mark.robustness
 @pytest.mark.parametrize(
     "metric,model,data,params",
@@ -999,3 +1175,54 @@ def test_return_nan_when_prediction_changes_continuity(
         # Last element of scores is output logits, obviously they're not nan.
         for v in values[:-1]:
             assert np.isnan(v).any()
+
+
+@pytest.mark.robustness
+@pytest.mark.parametrize("metric", [AvgSensitivity, MaxSensitivity])
+@pytest.mark.parametrize("explain_batch_size", [8, 50])
+def test_sensitivity_explain_batch_size_normalisation(
+    load_mnist_model, load_mnist_images, metric, explain_batch_size: int
+):
+    x_batch, y_batch = (
+        load_mnist_images["x_batch"][:8],
+        load_mnist_images["y_batch"][:8],
+    )
+    init_params = {
+        "nr_samples": 5,
+        "normalise": True,
+        "disable_warnings": True,
+    }
+    call_params = {
+        "model": load_mnist_model,
+        "x_batch": x_batch,
+        "y_batch": y_batch,
+        "explain_func": explain,
+        "explain_func_kwargs": {"method": "Saliency"},
+    }
+
+    # Stacked perturbation samples are normalised per sample, as if explained one by one.
+    scores = []
+    for batch_size in [1, explain_batch_size]:
+        np.random.seed(42)
+        scores.append(
+            metric(explain_batch_size=batch_size, **init_params)(**call_params)
+        )
+    assert np.allclose(scores[0], scores[1], equal_nan=True), "Test failed."
+
+    metric_instance = metric(explain_batch_size=explain_batch_size, **init_params)
+    metric_instance(**call_params)
+    x_stacked = np.concatenate([x_batch, np.roll(x_batch, 1, axis=0)])
+    y_stacked = np.concatenate([y_batch, np.roll(y_batch, 1)])
+    a_stacked = metric_instance.explain_batch(
+        load_mnist_model, x_stacked, y_stacked, nr_instances=len(x_batch)
+    )
+    a_separate = np.concatenate(
+        [
+            metric_instance.explain_batch(load_mnist_model, x, y)
+            for x, y in [
+                (x_batch, y_batch),
+                (np.roll(x_batch, 1, axis=0), np.roll(y_batch, 1)),
+            ]
+        ]
+    )
+    assert np.allclose(a_stacked, a_separate), "Test failed."